@@ -0,0 +1,294 @@
+"""
+On-disk archive of accepted utterances for the Mimu Voice Interaction Service.
+- Utterances are appended to segment files, losslessly compressed (sample deltas + zlib)
+- Each segment has a JSON Lines index: time, duration, source, transcript, speaker score
+- Segments rotate by size and age; the oldest are deleted past the retention limits
+- One background thread does all disk work, so capture and transcription never wait on it
+- ArchiveReader memory-maps segments to replay utterances without reading whole files
+"""
+
+import glob
+import json
+import mmap
+import os
+import queue
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from audio_capture import float32_to_pcm
+
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx.jsonl"
+CODEC = "delta-zlib"
+
+
+def encode_pcm(pcm, level=6):
+    """Losslessly compress int16 samples.
+
+    Differences between neighbouring samples are small for speech; zigzag
+    maps them to small unsigned values, and the low and high bytes are
+    stored as separate planes so zlib sees long runs of near-zero high bytes.
+    """
+    pcm = np.asarray(pcm, dtype=np.int16).reshape(-1)
+    delta = np.diff(pcm, prepend=np.int16(0)).astype(np.int32)   # wraps like int16
+    zigzag = ((delta << 1) ^ (delta >> 15)).astype(np.uint16)
+    planes = np.concatenate([(zigzag & 0xFF).astype(np.uint8), (zigzag >> 8).astype(np.uint8)])
+    return zlib.compress(planes.tobytes(), level)
+
+
+def decode_pcm(data, samples):
+    """Inverse of encode_pcm; `data` can be any buffer, e.g. a slice of an mmap."""
+    planes = np.frombuffer(zlib.decompress(data), dtype=np.uint8)
+    zigzag = planes[:samples].astype(np.int32) | (planes[samples:].astype(np.int32) << 8)
+    delta = ((zigzag >> 1) ^ -(zigzag & 1)).astype(np.int16)
+    return np.cumsum(delta, dtype=np.int16)
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+class ArchiveEntry:
+    """One archived utterance, as described by its segment's index."""
+
+    def __init__(self, segment, record):
+        self.segment = segment
+        self.offset = record["offset"]
+        self.length = record["length"]
+        self.samples = record["samples"]
+        self.fs = record["fs"]
+        self.recorded_at = record.get("recorded_at")
+        self.source = record.get("source")
+        self.trace_id = record.get("trace_id")
+        self.text = record.get("text")
+        self.speaker_score = record.get("speaker_score")
+
+    @property
+    def duration(self):
+        return self.samples / float(self.fs)
+
+
+class AudioArchive:
+    """Appends utterances to rotating, compressed segment files from a background thread.
+
+    A new segment is started once the current one reaches `segment_bytes`
+    or is `segment_seconds` old. Whole segments are deleted, oldest first,
+    while the archive exceeds `max_bytes` or they are older than
+    `max_age_seconds`. If `queue_size` utterances are already waiting to be
+    written, add() drops the new one rather than block.
+    """
+
+    def __init__(self, directory, fs=16000, segment_bytes=16 * 1024 * 1024, segment_seconds=3600,
+                 max_bytes=1024 * 1024 * 1024, max_age_seconds=30 * 86400, queue_size=64,
+                 level=6, clock=time.time):
+        self.directory = directory
+        self.fs = fs
+        self.segment_bytes = segment_bytes
+        self.segment_seconds = segment_seconds
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.level = level
+        self._clock = clock
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._segment = None          # path without suffix
+        self._segment_started = None
+        self._segment_size = 0
+        self._sequence = 0
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.raw_bytes = 0
+        self.stored_bytes = 0
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="audio-archive", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Write what is queued, then stop the writer thread."""
+        if self._thread is None:
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        self._thread = None
+
+    def add(self, audio, recorded_at=None, **metadata):
+        """Queue an utterance (int16, or float32 in [-1, 1]) with its metadata; False if dropped.
+
+        Metadata values must be JSON-serializable (e.g. source, trace_id,
+        text, speaker_score).
+        """
+        pcm = float32_to_pcm(audio) if np.asarray(audio).dtype != np.int16 else np.asarray(audio)
+        record = dict(metadata, recorded_at=recorded_at if recorded_at is not None else self._clock())
+        try:
+            self._queue.put_nowait((pcm, record))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            "directory": self.directory,
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "pending": self.pending(),
+            "segments": len(self._segment_paths()),
+            "bytes": self._total_bytes(),
+            "compression_ratio": round(self.raw_bytes / self.stored_bytes, 2) if self.stored_bytes else None,
+        }
+
+    def _run(self):
+        self._enforce_retention()
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                self._write(*job)
+            except Exception as e:
+                self.errors += 1
+                print(f"Error archiving utterance: {e}")
+
+    def _write(self, pcm, record):
+        if self._needs_rotation():
+            self._rotate()
+        data = encode_pcm(pcm, self.level)
+        with open(self._segment + SEGMENT_SUFFIX, "ab") as f:
+            offset = f.tell()
+            f.write(data)
+        record.update(offset=offset, length=len(data), samples=len(pcm), fs=self.fs, codec=CODEC)
+        with open(self._segment + INDEX_SUFFIX, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._segment_size += len(data)
+        self.written += 1
+        self.raw_bytes += pcm.nbytes
+        self.stored_bytes += len(data)
+
+    def _needs_rotation(self):
+        return (self._segment is None or self._segment_size >= self.segment_bytes
+                or self._clock() - self._segment_started >= self.segment_seconds)
+
+    def _rotate(self):
+        now = self._clock()
+        self._sequence += 1
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+        self._segment = os.path.join(self.directory, f"{stamp}-{os.getpid()}-{self._sequence:04d}")
+        self._segment_started = now
+        self._segment_size = 0
+        self._enforce_retention()
+
+    def _segment_paths(self):
+        """Segments oldest first (by modification time), without their suffix."""
+        paths = glob.glob(os.path.join(self.directory, "*" + SEGMENT_SUFFIX))
+        return [p[:-len(SEGMENT_SUFFIX)] for p in sorted(paths, key=lambda p: (_mtime(p), p))]
+
+    def _segment_bytes(self, segment):
+        total = 0
+        for suffix in (SEGMENT_SUFFIX, INDEX_SUFFIX):
+            try:
+                total += os.path.getsize(segment + suffix)
+            except OSError:
+                pass   # not written yet, or deleted by retention meanwhile
+        return total
+
+    def _total_bytes(self):
+        return sum(self._segment_bytes(segment) for segment in self._segment_paths())
+
+    def _enforce_retention(self):
+        segments = [s for s in self._segment_paths() if s != self._segment]
+        total = self._total_bytes()
+        cutoff = self._clock() - self.max_age_seconds
+        for segment in segments:
+            if total <= self.max_bytes and _mtime(segment + SEGMENT_SUFFIX) >= cutoff:
+                break
+            total -= self._segment_bytes(segment)
+            for suffix in (SEGMENT_SUFFIX, INDEX_SUFFIX):
+                try:
+                    os.remove(segment + suffix)
+                except OSError:
+                    pass
+
+
+class ArchiveReader:
+    """Reads an AudioArchive directory; segment files are memory-mapped, not read.
+
+    Safe to use while the archive is being written: a segment that has grown
+    since it was mapped is mapped again.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._maps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for f, mapped in self._maps.values():
+            mapped.close()
+            f.close()
+        self._maps.clear()
+
+    def entries(self, source=None, since=None):
+        """Every archived utterance, oldest first, optionally for one source or after a time."""
+        found = []
+        for index in glob.glob(os.path.join(self.directory, "*" + INDEX_SUFFIX)):
+            segment = index[:-len(INDEX_SUFFIX)] + SEGMENT_SUFFIX
+            with open(index, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    entry = ArchiveEntry(segment, json.loads(line))
+                    if source is not None and entry.source != source:
+                        continue
+                    if since is not None and (entry.recorded_at or 0) <= since:
+                        continue
+                    found.append(entry)
+        found.sort(key=lambda entry: (entry.recorded_at or 0, entry.segment, entry.offset))
+        return found
+
+    def read(self, entry):
+        """The utterance's int16 samples."""
+        mapped = self._map(entry.segment, entry.offset + entry.length)
+        return decode_pcm(mapped[entry.offset:entry.offset + entry.length], entry.samples)
+
+    def replay(self, source=None, since=None):
+        """Yield (entry, int16 samples) for every archived utterance, oldest first."""
+        for entry in self.entries(source=source, since=since):
+            yield entry, self.read(entry)
+
+    def _map(self, path, needed):
+        cached = self._maps.get(path)
+        if cached is not None and len(cached[1]) >= needed:
+            return cached[1]
+        if cached is not None:
+            cached[1].close()
+            cached[0].close()
+        f = open(path, "rb")
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps[path] = (f, mapped)
+        if len(mapped) < needed:
+            raise ValueError(f"{path} is shorter than its index says")
+        return mapped
@@ -0,0 +1,280 @@
+"""
+Gapless microphone capture for the Mimu Voice Interaction Service.
+- A sounddevice InputStream callback writes into a preallocated NumPy ring buffer
+- Consumers pull fixed or variable-length windows through independent readers
+- Capture never waits on processing, so nothing is lost between windows
+- Devices that cannot record at 16 kHz are resampled in-process (polyphase FIR)
+"""
+
+import math
+import threading
+
+import numpy as np
+
+INT16_SCALE = np.float32(1.0 / 32768.0)
+
+
+def pcm_to_float32(pcm):
+    """int16 samples to float32 in [-1, 1), in one vectorized pass."""
+    return np.multiply(np.asarray(pcm), INT16_SCALE, dtype=np.float32)
+
+
+def float32_to_pcm(audio):
+    """float32 samples in [-1, 1] back to int16, clipping overs."""
+    return np.clip(np.rint(np.asarray(audio) * 32768.0), -32768, 32767).astype(np.int16)
+
+
+class PolyphaseResampler:
+    """Rational-ratio resampler (a windowed-sinc FIR applied in polyphase form).
+
+    `process()` takes consecutive chunks of one stream and returns the
+    resampled chunks; the filter state carries over, so there are no seams
+    at chunk boundaries. The filter is zero-phase, so the newest output
+    samples (half the filter, about 0.6 ms) wait for the next chunk.
+    `resample()` converts a whole clip at once.
+    """
+
+    _BLOCK = 8192  # outputs per vectorized step, to bound the index matrix
+
+    def __init__(self, fs_in, fs_out, zero_crossings=10, beta=5.0):
+        divisor = math.gcd(int(fs_in), int(fs_out))
+        self.fs_in = int(fs_in)
+        self.fs_out = int(fs_out)
+        self.up = self.fs_out // divisor
+        self.down = self.fs_in // divisor
+        widest = max(self.up, self.down)
+        # Cutoff at the lower of the two Nyquist rates, in the upsampled domain
+        self.half_len = zero_crossings * widest
+        k = np.arange(2 * self.half_len + 1) - self.half_len
+        taps = np.sinc(k / widest) * np.kaiser(len(k), beta)
+        self.phase_len = -(-len(taps) // self.up)
+        taps = np.concatenate((taps, np.zeros(self.phase_len * self.up - len(taps))))
+        # bank[p, i] = taps[p + i * up]; each phase scaled to unit DC gain
+        bank = taps.reshape(self.phase_len, self.up).T
+        self._bank = (bank / bank.sum(axis=1, keepdims=True)).astype(np.float32)
+        self.reset()
+
+    def reset(self):
+        # Zero history before the first sample, at absolute input index -(phase_len - 1)
+        self._buffer = np.zeros(self.phase_len - 1, dtype=np.float32)
+        self._buffer_start = -(self.phase_len - 1)
+        self._consumed = 0
+        self._produced = 0
+
+    def _outputs(self, x, x_start, first, count, clip=False):
+        out = np.empty(count, dtype=np.float32)
+        taps = np.arange(self.phase_len)
+        for offset in range(0, count, self._BLOCK):
+            n = np.arange(first + offset, first + min(count, offset + self._BLOCK), dtype=np.int64)
+            m = n * self.down + self.half_len
+            index = (m // self.up - x_start)[:, None] - taps
+            if clip:
+                np.clip(index, 0, len(x) - 1, out=index)
+            out[offset:offset + len(n)] = np.einsum("ij,ij->i", x[index], self._bank[m % self.up])
+        return out
+
+    def process(self, chunk):
+        """Resample the next chunk of the stream."""
+        chunk = np.asarray(chunk, dtype=np.float32).reshape(-1)
+        if self.up == self.down:
+            return chunk.copy()
+        self._buffer = np.concatenate((self._buffer, chunk))
+        self._consumed += len(chunk)
+        # An output is ready once the newest input it needs has arrived
+        ready = max((self._consumed * self.up - 1 - self.half_len) // self.down + 1, 0)
+        out = self._outputs(self._buffer, self._buffer_start, self._produced, ready - self._produced)
+        self._produced = ready
+        keep = self.phase_len - 1
+        drop = len(self._buffer) - keep
+        if drop > 0:
+            self._buffer = self._buffer[drop:]
+            self._buffer_start += drop
+        return out
+
+    def resample(self, audio):
+        """Resample a whole clip, holding the edge samples beyond both ends."""
+        audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+        if self.up == self.down or len(audio) == 0:
+            return audio.copy()
+        count = -(-len(audio) * self.up // self.down)
+        return self._outputs(audio, 0, 0, count, clip=True)
+
+
+class RingBuffer:
+    """Fixed-capacity sample ring addressed by absolute stream position.
+
+    Position 0 is the first sample ever written; `position` is one past the
+    newest. Only the last `capacity` samples are retained.
+    """
+
+    def __init__(self, capacity, dtype=np.int16):
+        if capacity <= 0:
+            raise ValueError("Ring buffer capacity must be positive")
+        self._buffer = np.zeros(capacity, dtype=dtype)
+        self._capacity = capacity
+        self._written = 0
+        self._cond = threading.Condition()
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    @property
+    def position(self):
+        """Absolute position one past the newest sample."""
+        return self._written
+
+    @property
+    def oldest(self):
+        """Absolute position of the oldest sample still retained."""
+        return max(0, self._written - self._capacity)
+
+    def write(self, samples):
+        """Append samples, overwriting the oldest ones once full."""
+        samples = np.asarray(samples, dtype=self._buffer.dtype).reshape(-1)
+        count = len(samples)
+        if count == 0:
+            return
+        with self._cond:
+            if count >= self._capacity:
+                # Only the tail survives; keep the positions consistent anyway
+                self._written += count - self._capacity
+                samples = samples[-self._capacity:]
+                count = self._capacity
+            start = self._written % self._capacity
+            first = min(count, self._capacity - start)
+            self._buffer[start:start + first] = samples[:first]
+            if first < count:
+                self._buffer[:count - first] = samples[first:]
+            self._written += count
+            self._cond.notify_all()
+
+    def read(self, start, count):
+        """Copy `count` samples starting at absolute position `start`."""
+        with self._cond:
+            if start < self.oldest or start + count > self._written:
+                raise IndexError(
+                    f"Samples [{start}, {start + count}) not in ring "
+                    f"[{self.oldest}, {self._written})"
+                )
+            offset = start % self._capacity
+            first = min(count, self._capacity - offset)
+            if first == count:
+                return self._buffer[offset:offset + count].copy()
+            return np.concatenate((self._buffer[offset:], self._buffer[:count - first]))
+
+    def wait_for(self, position, timeout=None):
+        """Block until the ring has been written up to `position`."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._written >= position, timeout)
+
+
+class RingReader:
+    """Independent cursor over a RingBuffer.
+
+    Each consumer gets its own reader, so several stages can pull windows from
+    the same capture without stealing samples from each other. A reader that
+    falls more than a ring's capacity behind skips forward and counts the loss.
+    """
+
+    def __init__(self, ring, start=None):
+        self._ring = ring
+        self.position = ring.position if start is None else start
+        self.dropped_samples = 0
+
+    def _catch_up(self):
+        oldest = self._ring.oldest
+        if self.position < oldest:
+            self.dropped_samples += oldest - self.position
+            self.position = oldest
+
+    def available(self):
+        """Number of unread samples currently in the ring."""
+        self._catch_up()
+        return self._ring.position - self.position
+
+    def read(self, count, timeout=None):
+        """Return the next `count` samples, blocking until they are captured.
+
+        Returns None if the timeout expires first.
+        """
+        if count > self._ring.capacity:
+            raise ValueError("Window is larger than the ring buffer")
+        if not self._ring.wait_for(self.position + count, timeout):
+            return None
+        while True:
+            self._catch_up()
+            try:
+                samples = self._ring.read(self.position, count)
+                break
+            except IndexError:
+                # The writer lapped us between catching up and copying
+                continue
+        self.position += count
+        return samples
+
+    def read_available(self, max_count=None):
+        """Return whatever has been captured since the last read (possibly empty)."""
+        while True:
+            count = self.available()
+            if max_count is not None:
+                count = min(count, max_count)
+            try:
+                samples = self._ring.read(self.position, count)
+                break
+            except IndexError:
+                continue
+        self.position += count
+        return samples
+
+
+class MicrophoneCapture:
+    """Continuous mono microphone capture into a RingBuffer."""
+
+    def __init__(self, fs=16000, buffer_seconds=60, blocksize=0, device=None, sd_module=None):
+        self.fs = fs
+        self.blocksize = blocksize
+        self.device = device
+        self.ring = RingBuffer(int(buffer_seconds * fs), dtype=np.int16)
+        self.status_errors = 0
+        self._sd = sd_module
+        self._stream = None
+
+    @property
+    def running(self):
+        return self._stream is not None
+
+    def start(self):
+        """Open the input stream; samples flow into the ring until stop()."""
+        if self._stream is not None:
+            return
+        if self._sd is None:
+            import sounddevice
+            self._sd = sounddevice
+        self._stream = self._sd.InputStream(
+            samplerate=self.fs,
+            channels=1,
+            dtype='int16',
+            blocksize=self.blocksize,
+            device=self.device,
+            callback=self._callback,
+        )
+        self._stream.start()
+        print(f"Microphone capture started at {self.fs} Hz")
+
+    def stop(self):
+        """Close the input stream."""
+        stream, self._stream = self._stream, None
+        if stream is not None:
+            stream.stop()
+            stream.close()
+
+    def _callback(self, indata, frames, time_info, status):
+        # Runs on the PortAudio thread: no printing or allocation-heavy work here
+        if status:
+            self.status_errors += 1
+        self.ring.write(indata[:, 0])
+
+    def reader(self, start=None):
+        """Create a new independent reader positioned at the live edge."""
+        return RingReader(self.ring, start=start)
@@ -0,0 +1,135 @@
+"""
+Micro-batching for the Mimu Voice Interaction Service.
+- Callers submit single items and get a Future back
+- A worker groups items that arrive close together into one batch call
+- Batches are capped by size and by how long the first item may wait
+- Items from different keys (audio sources) are interleaved round-robin
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Collects concurrent requests into batches for `batch_fn`.
+
+    `batch_fn(items)` must return one result per item, in order. A batch is
+    dispatched as soon as it holds `max_batch_size` items, or `max_wait`
+    seconds after its first item arrived, whichever comes first.
+
+    Each item is queued under a key (e.g. the audio source it came from).
+    Batches take one item per key in turn, starting after the key served
+    last, so a busy source cannot starve a quiet one.
+
+    With `workers` above 1, that many batches can be in `batch_fn` at once
+    (for a `batch_fn` that hands off to worker processes).
+    """
+
+    def __init__(self, batch_fn, max_batch_size=8, max_wait=0.05, name="batcher", workers=1):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self._batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.name = name
+        self.workers = workers
+        self._queues = OrderedDict()   # key -> deque of (item, future), in serving order
+        self._pending = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads = []
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.items_by_key = {}
+
+    @property
+    def running(self):
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._run, name=f"{self.name}-{n}", daemon=True)
+            for n in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout=2.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def submit(self, item, key="default"):
+        """Queue one item under `key`; returns a Future resolved with its result."""
+        if not self.running:
+            self.start()
+        future = Future()
+        with self._cond:
+            self._queues.setdefault(key, deque()).append((item, future))
+            self._pending += 1
+            self._cond.notify()
+        return future
+
+    def pending(self, key=None):
+        with self._cond:
+            if key is None:
+                return self._pending
+            return len(self._queues.get(key, ()))
+
+    def _collect(self):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._pending, timeout=0.1):
+                return []
+            deadline = time.monotonic() + self.max_wait
+            while self._pending < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    break
+
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                for key in list(self._queues):
+                    if len(batch) >= self.max_batch_size:
+                        break
+                    waiting = self._queues[key]
+                    item, future = waiting.popleft()
+                    batch.append((key, item, future))
+                    self._pending -= 1
+                    # Served keys go to the back of the line
+                    if waiting:
+                        self._queues.move_to_end(key)
+                    else:
+                        del self._queues[key]
+            return batch
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._collect()
+            if not batch:
+                continue
+            # Skip requests whose caller already gave up
+            batch = [entry for entry in batch if entry[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            items = [item for _, item, _ in batch]
+            try:
+                results = self._batch_fn(items)
+                if len(results) != len(items):
+                    raise RuntimeError(f"{self.name}: expected {len(items)} results, got {len(results)}")
+            except Exception as e:
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            with self._stats_lock:
+                self.batches += 1
+                self.items += len(items)
+                for key, _, future in batch:
+                    self.items_by_key[key] = self.items_by_key.get(key, 0) + 1
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,452 @@
+"""
+Offline benchmark for the Mimu Voice Interaction Service.
+- Replays a directory of WAV files through the same capture -> auth -> STT -> respond path as main()
+- Fake sounddevice and pyttsx3 modules; Whisper is a timed stub unless a real model is asked for
+- Reports per-stage p50/p95/p99 latency, real-time factor and throughput as JSON
+- With a reference transcript next to each WAV (same name, .txt), also the word error rate
+- Can also replay utterances straight from the service's audio archive (MIMU_AUDIO_ARCHIVE_DIR)
+
+Usage:
+    python3 benchmark.py --wav-dir samples/ --output run.json
+    python3 benchmark.py --synthetic 10 --whisper tiny --baseline run.json
+    python3 benchmark.py --wav-dir samples/ --whisper base --profile cpu-fast --baseline run.json
+    python3 benchmark.py --archive ~/mimu-archive --whisper base
+"""
+
+import argparse
+import contextlib
+import glob
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+import types
+
+import numpy as np
+
+STUB_TEXT = "mi ăn cơm chưa"
+
+
+class FakeInputStream:
+    """Plays a list of int16 clips into the capture callback, paced like a microphone."""
+
+    def __init__(self, clips, speed, callback, samplerate=16000, blocksize=0, **kwargs):
+        self._clips = clips
+        self._speed = speed
+        self._callback = callback
+        self._block = blocksize or samplerate // 50
+        self._fs = samplerate
+        self._stopped = threading.Event()
+        self._thread = None
+        self.finished = threading.Event()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="fake-mic", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        started = time.perf_counter()
+        fed = 0
+        for clip in self._clips:
+            for offset in range(0, len(clip), self._block):
+                if self._stopped.is_set():
+                    return
+                block = clip[offset:offset + self._block]
+                self._callback(block.reshape(-1, 1), len(block), None, None)
+                fed += len(block)
+                # Pace against the start time so sleep jitter does not accumulate
+                delay = started + fed / float(self._fs) / self._speed - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        self.finished.set()
+
+    def stop(self):
+        self._stopped.set()
+
+    def close(self):
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+
+class FakeEngine:
+    """pyttsx3 stand-in: speaking takes about as long as reading the text aloud."""
+
+    SECONDS_PER_CHAR = 0.06
+
+    def __init__(self, speed):
+        self._speed = speed
+        self._pending = None
+        self._render = None
+        self._stopped = threading.Event()
+
+    def connect(self, name, callback):
+        pass
+
+    def getProperty(self, name):
+        return {"voice": "fake", "rate": 150, "volume": 1.0}.get(name)
+
+    def say(self, text):
+        self._pending = text
+
+    def save_to_file(self, text, path):
+        self._render = (text, path)
+
+    def runAndWait(self):
+        from tts_cache import write_wav
+        if self._render is not None:
+            text, path = self._render
+            self._render = None
+            # The worker plays cached clips for their full length, so scale them by speed
+            samples = int(len(text) * self.SECONDS_PER_CHAR * 16000 / self._speed)
+            write_wav(path, np.zeros(samples, dtype=np.int16), 16000)
+        if self._pending is not None:
+            text, self._pending = self._pending, None
+            self._stopped.clear()
+            self._stopped.wait(len(text) * self.SECONDS_PER_CHAR / self._speed)
+
+    def stop(self):
+        self._stopped.set()
+
+
+class StubWhisperModel:
+    """Whisper stand-in whose decode time is a fixed fraction of the audio length."""
+
+    def __init__(self, decode_rtf, text):
+        self.decode_rtf = decode_rtf
+        self.text = text
+
+    def transcribe(self, audio, **options):
+        import wave
+        if isinstance(audio, str):
+            with wave.open(audio, 'rb') as wf:
+                duration = wf.getnframes() / float(wf.getframerate())
+        else:
+            duration = len(audio) / 16000.0
+        time.sleep(duration * self.decode_rtf)
+        # Spread the words evenly so streaming mode gets word timestamps
+        words = self.text.split()
+        step = duration / max(len(words), 1)
+        segment = {"start": 0.0, "end": duration, "text": self.text,
+                   "words": [{"word": f" {word}", "start": n * step, "end": (n + 1) * step}
+                             for n, word in enumerate(words)]}
+        return {"text": self.text, "segments": [segment], "language": "vi"}
+
+
+def install_fakes(clips, speed, whisper_model, decode_rtf, stub_text):
+    """Register the fake audio and TTS modules (and stub Whisper) before service is imported."""
+    playback = threading.Event()
+
+    sd = types.ModuleType("sounddevice")
+    sd.InputStream = lambda **kwargs: _remember_stream(sd, FakeInputStream(clips, speed, **kwargs))
+    sd.play = lambda pcm, fs: setattr(sd, "_play_until", time.perf_counter() + len(pcm) / float(fs))
+    sd.stop = lambda: setattr(sd, "_play_until", 0.0)
+    sd.wait = lambda: playback.wait(max(0.0, getattr(sd, "_play_until", 0.0) - time.perf_counter()))
+    sys.modules["sounddevice"] = sd
+
+    pyttsx3 = types.ModuleType("pyttsx3")
+    pyttsx3.init = lambda: FakeEngine(speed)
+    sys.modules["pyttsx3"] = pyttsx3
+
+    if whisper_model == "stub":
+        whisper = types.ModuleType("whisper")
+        whisper.load_model = lambda name: StubWhisperModel(decode_rtf, stub_text)
+        sys.modules["whisper"] = whisper
+    return sd
+
+
+def _remember_stream(sd, stream):
+    sd.last_stream = stream
+    return stream
+
+
+def load_wav_dir(path, fs=16000):
+    """Every *.wav under `path` as int16 mono at `fs`, in name order."""
+    from transcription import decode_audio_payload
+    clips = []
+    for name in sorted(glob.glob(os.path.join(path, "*.wav"))):
+        with open(name, 'rb') as f:
+            audio = decode_audio_payload(f.read())
+        clips.append((os.path.basename(name), np.clip(audio * 32768.0, -32768, 32767).astype(np.int16)))
+    return clips
+
+
+def load_archive(path, source=None):
+    """Archived utterances as int16 clips named by their trace id, oldest first."""
+    from audio_archive import ArchiveReader
+    with ArchiveReader(path) as reader:
+        return [(entry.trace_id or f"{entry.recorded_at:.3f}", pcm)
+                for entry, pcm in reader.replay(source=source) if entry.fs == 16000]
+
+
+def load_references(path, clips):
+    """Reference transcripts from <name>.txt beside each WAV; None unless every clip has one."""
+    references = []
+    for name, _ in clips:
+        text_file = os.path.join(path, os.path.splitext(name)[0] + ".txt")
+        if not os.path.exists(text_file):
+            return None
+        with open(text_file, "r", encoding="utf-8") as f:
+            references.append(f.read().strip())
+    return references
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance over the reference length, after normalization."""
+    from commands import normalize
+    ref, hyp = normalize(reference).split(), normalize(hypothesis).split()
+    if not ref:
+        return float(bool(hyp))
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / float(len(ref))
+
+
+def synthetic_clips(count, fs=16000, seed=0):
+    """Voiced, harmonic bursts of 1-3 s that the VAD treats as speech."""
+    rng = np.random.default_rng(seed)
+    clips = []
+    for n in range(count):
+        seconds = rng.uniform(1.0, 3.0)
+        t = np.arange(int(seconds * fs)) / float(fs)
+        f0 = rng.uniform(100, 220)
+        signal = sum(np.sin(2 * np.pi * f0 * h * t) / h for h in range(1, 8))
+        envelope = np.minimum(1.0, np.minimum(t, t[-1] - t) / 0.05)
+        clips.append((f"synthetic-{n:03d}", (signal * envelope * 6000).astype(np.int16)))
+    return clips
+
+
+def with_gaps(clips, gap_seconds, fs=16000, seed=0):
+    """Interleave the clips with low room noise so the VAD can close each utterance."""
+    rng = np.random.default_rng(seed)
+    noise = lambda: rng.normal(0, 20, int(gap_seconds * fs)).astype(np.int16)
+    stream = [noise()]
+    for _, clip in clips:
+        stream.extend((clip, noise()))
+    return stream
+
+
+def summarize(values):
+    """Latency summary in milliseconds."""
+    if not values:
+        return {"count": 0}
+    ms = np.asarray(values, dtype=np.float64) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"count": len(ms), "mean_ms": round(float(ms.mean()), 3), "p50_ms": round(float(p50), 3),
+            "p95_ms": round(float(p95), 3), "p99_ms": round(float(p99), 3),
+            "max_ms": round(float(ms.max()), 3)}
+
+
+def run_benchmark(clips, speed=4.0, whisper_model="stub", decode_rtf=0.1,
+                  stub_text=STUB_TEXT, gap_seconds=1.0, streaming=False, timeout=600,
+                  profile="default", references=None):
+    """Replay `clips` through the service pipeline and return the report dict.
+
+    With `references` (one transcript per clip), the report includes the
+    word error rate of everything recognized against everything said.
+    """
+    fs = 16000
+    workdir = tempfile.mkdtemp(prefix="mimu-bench-")
+    os.environ.setdefault("MIMU_TTS_CACHE_DIR", os.path.join(workdir, "tts-cache"))
+    os.environ.setdefault("MIMU_VOICEPRINT_FILE", os.path.join(workdir, "voiceprints.npz"))
+    if whisper_model != "stub":
+        os.environ["MIMU_WHISPER_MODEL"] = whisper_model
+    else:
+        # The stub model only exists in this process, and has nothing to quantize
+        os.environ["MIMU_INFERENCE_WORKERS"] = "0"
+        os.environ["MIMU_QUANTIZE"] = "0"
+    os.environ["MIMU_DECODING_PROFILE"] = profile
+    if streaming:
+        os.environ["MIMU_STREAMING"] = "1"
+    # One replayed feed, so one source
+    os.environ["MIMU_AUDIO_SOURCES"] = ""
+    # Replays are not archived again
+    os.environ["MIMU_AUDIO_ARCHIVE_DIR"] = ""
+    sd = install_fakes(with_gaps(clips, gap_seconds, fs), speed, whisper_model, decode_rtf, stub_text)
+
+    import service
+    from metrics import current_trace_id
+
+    # Keep raw samples next to the service's own histograms for exact percentiles
+    samples = {}
+    captured_at = {}
+    observe = service.STAGE_SECONDS.observe
+
+    def recording_observe(value, **labels):
+        samples.setdefault(labels["stage"], []).append(value)
+        trace_id = current_trace_id()
+        if labels["stage"] == "handoff" and trace_id:
+            captured_at[trace_id] = time.time() - value
+        observe(value, **labels)
+
+    service.STAGE_SECONDS.observe = recording_observe
+
+    replies = []
+    speak = service.text_to_speech
+
+    def recording_text_to_speech(*args, **kwargs):
+        job = speak(*args, **kwargs)
+        replies.append(job)
+        return job
+
+    service.text_to_speech = recording_text_to_speech
+
+    # Same startup order as main(), without the Flask thread
+    started = time.perf_counter()
+    service.model_registry.load()
+    load_seconds = time.perf_counter() - started
+    for source in service.audio_sources.values():
+        source.start()
+    service.tts_worker.start()
+    service.tts_worker.prewarm(service.known_phrases())
+    service.voice_pipeline.start()
+
+    started = time.perf_counter()
+    deadline = started + timeout
+    stream = sd.last_stream
+    while time.perf_counter() < deadline:
+        # Stop after the first silent pass that began once the feed had ended
+        drained = stream.finished.is_set()
+        if not service.capture_utterance(max_wait=0.5) and drained:
+            break
+    service.voice_pipeline.join()
+    for job in replies:
+        job.done.wait(max(0.0, deadline - time.perf_counter()))
+    wall_seconds = time.perf_counter() - started
+
+    service.voice_pipeline.stop()
+    service.tts_worker.stop()
+    for source in service.audio_sources.values():
+        source.stop()
+
+    audio_seconds = sum(len(clip) for _, clip in clips) / float(fs)
+    stream_seconds = sum(len(chunk) for chunk in with_gaps(clips, gap_seconds, fs)) / float(fs)
+    utterances = int(service.UTTERANCES.value(source=service.default_source.name))
+    stt_seconds = sum(samples.get("stt", []))
+    vad_stats = service.default_source.vad.stats()
+    speech_seconds = vad_stats["processed_seconds"] - vad_stats["skipped_seconds"]
+    accuracy = None
+    if references is not None:
+        # Compare the whole session, so VAD splits and merges do not count as errors
+        recognized, _ = service.transcript_history.since(0, limit=len(service.transcript_history))
+        reference_text = " ".join(references)
+        accuracy = {
+            "reference_words": len(reference_text.split()),
+            "wer": round(word_error_rate(reference_text, " ".join(r["text"] for r in recognized)), 4),
+        }
+    end_to_end = [job.finished_at - captured_at[job.trace_id] for job in replies
+                  if job.trace_id in captured_at and job.finished_at is not None]
+
+    return {
+        "config": {
+            "clips": len(clips),
+            "speed": speed,
+            "whisper": whisper_model,
+            "stub_decode_rtf": decode_rtf if whisper_model == "stub" else None,
+            "gap_seconds": gap_seconds,
+            "streaming": streaming,
+            "profile": profile,
+            "quantized": service.QUANTIZE_MODEL,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "model_load_seconds": round(load_seconds, 3),
+        "audio_seconds": round(audio_seconds, 3),
+        "wall_seconds": round(wall_seconds, 3),
+        "utterances": utterances,
+        "speaker_rejects": int(service.SPEAKER_REJECTS.value(source=service.default_source.name)),
+        "throughput": {
+            "utterances_per_second": round(utterances / wall_seconds, 3) if wall_seconds else None,
+            "audio_seconds_per_second": round(stream_seconds / wall_seconds, 3) if wall_seconds else None,
+        },
+        # Wall time over replayed time: 1/speed means the pipeline kept up with the feed
+        "real_time_factor": round(wall_seconds / stream_seconds, 4) if stream_seconds else None,
+        "stt_real_time_factor": round(stt_seconds / speech_seconds, 4) if speech_seconds else None,
+        "stages": {stage: summarize(values) for stage, values in sorted(samples.items())},
+        "end_to_end": summarize(end_to_end),
+        "vad": vad_stats,
+        "pipeline": service.voice_pipeline.stats(),
+        "accuracy": accuracy,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Stages whose p95 grew by more than `tolerance` (a fraction) over the baseline."""
+    regressions = {}
+    stages = dict(report["stages"], end_to_end=report["end_to_end"])
+    old_stages = dict(baseline.get("stages", {}), end_to_end=baseline.get("end_to_end", {}))
+    for stage, summary in stages.items():
+        old = old_stages.get(stage, {}).get("p95_ms")
+        new = summary.get("p95_ms")
+        if old and new and new > old * (1.0 + tolerance):
+            regressions[stage] = {"baseline_p95_ms": old, "p95_ms": new,
+                                  "change": round(new / old - 1.0, 3)}
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmark of Mimu's voice pipeline")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--wav-dir", help="directory of WAV files to replay")
+    source.add_argument("--synthetic", type=int, metavar="N", help="replay N generated voiced clips")
+    source.add_argument("--archive", help="replay the utterances in an audio archive directory")
+    parser.add_argument("--archive-source", help="with --archive, only this microphone's utterances")
+    parser.add_argument("--speed", type=float, default=4.0,
+                        help="replay speed relative to real time (default 4)")
+    parser.add_argument("--whisper", default="stub",
+                        help="'stub' (default) or a Whisper model name such as tiny")
+    parser.add_argument("--stub-rtf", type=float, default=0.1,
+                        help="stub decode time as a fraction of the audio length")
+    parser.add_argument("--stub-text", default=STUB_TEXT, help="transcript the stub returns")
+    parser.add_argument("--gap", type=float, default=1.0, help="seconds of room noise between clips")
+    parser.add_argument("--streaming", action="store_true", help="decode while speech is in progress")
+    parser.add_argument("--profile", default="default",
+                        help="decoding profile, e.g. default or cpu-fast (default: default)")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON report to compare p95 latencies against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed p95 growth over the baseline (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    if args.archive:
+        clips = load_archive(args.archive, source=args.archive_source)
+    else:
+        clips = load_wav_dir(args.wav_dir) if args.wav_dir else synthetic_clips(args.synthetic)
+    if not clips:
+        parser.error(f"No utterances found in {args.archive or args.wav_dir}")
+    references = load_references(args.wav_dir, clips) if args.wav_dir else None
+
+    # Service log lines go to stderr so stdout stays valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_benchmark(clips, speed=args.speed, whisper_model=args.whisper,
+                               decode_rtf=args.stub_rtf, stub_text=args.stub_text,
+                               gap_seconds=args.gap, streaming=args.streaming,
+                               profile=args.profile, references=references)
+
+    regressions = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Command matching for the Mimu Voice Interaction Service.
+- Command table (phrase -> reply/action) loaded from a JSON config file
+- All phrases compiled into one Aho-Corasick automaton over diacritic-free text
+- Bounded edit-distance fallback for Whisper's near-miss spellings
+"""
+
+import json
+import re
+import unicodedata
+from collections import deque
+
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    """Lowercase, strip Vietnamese diacritics and collapse punctuation to spaces."""
+    decomposed = unicodedata.normalize("NFD", text.lower().replace("đ", "d"))
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", stripped).strip()
+
+
+class Command:
+    """One entry of the command table."""
+
+    def __init__(self, name, phrases, reply=None, action=None):
+        if not phrases:
+            raise ValueError(f"Command '{name}' has no phrases")
+        if reply is None and action is None:
+            raise ValueError(f"Command '{name}' needs a reply or an action")
+        self.name = name
+        self.phrases = list(phrases)
+        self.reply = reply
+        self.action = action
+
+
+class CommandMatch:
+    """Result of matching a transcript against the table."""
+
+    def __init__(self, command, phrase, distance=0):
+        self.command = command
+        self.phrase = phrase
+        self.distance = distance
+
+    @property
+    def exact(self):
+        return self.distance == 0
+
+
+def load_command_table(path):
+    """Read `{"fallback_reply": ..., "commands": [...]}` from a JSON file."""
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    commands = [
+        Command(entry.get("name", entry["phrases"][0]), entry["phrases"],
+                reply=entry.get("reply"), action=entry.get("action"))
+        for entry in config.get("commands", [])
+    ]
+    return commands, config.get("fallback_reply")
+
+
+def _bounded_distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 once it exceeds limit."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            row_min = min(row_min, current[j])
+        if row_min > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class CommandMatcher:
+    """Matches transcripts against every command phrase in one pass.
+
+    Exact matching walks a character-level Aho-Corasick automaton built from
+    the normalized phrases, so its cost depends on the transcript length, not
+    on the number of commands. Only when nothing matches exactly does it try
+    an edit-distance fallback, and then only against phrases that share a word
+    with the transcript (looked up through an inverted index).
+    """
+
+    def __init__(self, commands, max_distance_ratio=0.2):
+        self.commands = list(commands)
+        self.max_distance_ratio = max_distance_ratio
+        self._build()
+
+    def _build(self):
+        # Trie as parallel lists: transitions, failure links and outputs per state
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        self._phrases = []  # (normalized phrase, word count, command, original phrase)
+        self._word_index = {}
+
+        for order, command in enumerate(self.commands):
+            for phrase in command.phrases:
+                key = normalize(phrase)
+                if not key:
+                    continue
+                entry = (key, len(key.split()), command, phrase, order)
+                index = len(self._phrases)
+                self._phrases.append(entry)
+                state = 0
+                for ch in key:
+                    nxt = self._goto[state].get(ch)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto[state][ch] = nxt
+                        self._goto.append({})
+                        self._fail.append(0)
+                        self._out.append([])
+                    state = nxt
+                self._out[state].append(index)
+                for word in set(key.split()):
+                    self._word_index.setdefault(word, []).append(index)
+
+        frontier = deque(self._goto[0].values())
+        while frontier:
+            state = frontier.popleft()
+            for ch, nxt in self._goto[state].items():
+                frontier.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = candidate if candidate != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def _exact(self, text):
+        # Pad with spaces so phrases only match on word boundaries
+        padded = f" {text} "
+        best = None
+        state = 0
+        for end, ch in enumerate(padded):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for index in self._out[state]:
+                key = self._phrases[index][0]
+                start = end - len(key) + 1
+                if padded[start - 1] != " " or end + 1 >= len(padded) or padded[end + 1] != " ":
+                    continue
+                best = self._prefer(best, index)
+        return best
+
+    def _prefer(self, best, index):
+        # Longest phrase wins; on a tie, the command listed first in the table
+        if best is None:
+            return index
+        key, _, _, _, order = self._phrases[index]
+        best_key, _, _, _, best_order = self._phrases[best]
+        if (len(key), -order) > (len(best_key), -best_order):
+            return index
+        return best
+
+    def _fuzzy(self, text):
+        words = text.split()
+        candidates = {index for word in set(words) for index in self._word_index.get(word, ())}
+        best = None
+        best_distance = None
+        for index in sorted(candidates):
+            key, n_words, _, _, _ = self._phrases[index]
+            limit = max(1, int(len(key) * self.max_distance_ratio))
+            for width in (n_words - 1, n_words, n_words + 1):
+                if width < 1 or width > len(words):
+                    continue
+                for start in range(len(words) - width + 1):
+                    window = " ".join(words[start:start + width])
+                    distance = _bounded_distance(key, window, limit)
+                    if distance <= limit and (best_distance is None or distance < best_distance):
+                        best, best_distance = index, distance
+        return best, best_distance
+
+    def match(self, text):
+        """Return the CommandMatch for a transcript, or None."""
+        normalized = normalize(text)
+        if not normalized:
+            return None
+        index = self._exact(normalized)
+        distance = 0
+        if index is None:
+            index, distance = self._fuzzy(normalized)
+            if index is None:
+                return None
+        _, _, command, phrase, _ = self._phrases[index]
+        return CommandMatch(command, phrase, distance)
+
+    def replies(self):
+        """Every fixed reply in the table."""
+        return [command.reply for command in self.commands if command.reply]
@@ -0,0 +1,134 @@
+"""
+Self-echo suppression for the Mimu Voice Interaction Service.
+- The TTS worker reports when playback starts and stops, with the PCM it played when it has it
+- Captured audio overlapping playback (plus a tail for reverb and capture lag) is checked
+- With the played PCM, loudness envelopes are correlated around the expected delay,
+  so Ba talking over Mimu still gets through; without it, the overlap alone suppresses
+"""
+
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from audio_capture import PolyphaseResampler, pcm_to_float32
+
+MODES = ("correlate", "half-duplex", "off")
+
+
+def envelope(audio, frame_len):
+    """RMS of consecutive `frame_len`-sample frames."""
+    frames = len(audio) // frame_len
+    if frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    framed = np.asarray(audio[:frames * frame_len], dtype=np.float32).reshape(frames, frame_len)
+    return np.sqrt(np.mean(framed * framed, axis=1))
+
+
+def _pearson(a, b):
+    a = a - a.mean()
+    b = b - b.mean()
+    denom = np.sqrt(np.dot(a, a) * np.dot(b, b))
+    return float(np.dot(a, b) / denom) if denom > 0 else 0.0
+
+
+class _Playback:
+    """One stretch of TTS output: when it played and, if known, its envelope."""
+
+    def __init__(self, started_at, reference):
+        self.started_at = started_at
+        self.finished_at = None
+        self.reference = reference
+
+
+class EchoGuard:
+    """Decides whether captured audio is Mimu hearing itself.
+
+    `fs` is the rate of the audio passed to check(). `tail_s` extends each
+    playback to cover room reverb and audio still waiting in the capture
+    ring. In "correlate" mode a clip whose envelope matches the played one
+    (Pearson r >= `threshold` at some delay up to `max_delay_s`) is an echo.
+    Playback without reference PCM (the engine speaking live) and
+    "half-duplex" mode suppress any overlapping audio.
+    """
+
+    def __init__(self, fs=16000, mode="correlate", tail_s=0.5, threshold=0.8, max_delay_s=1.0,
+                 frame_ms=20, history=8, clock=time.monotonic):
+        if mode not in MODES:
+            raise ValueError(f"Echo mode must be one of {', '.join(MODES)}, got '{mode}'")
+        self.fs = fs
+        self.mode = mode
+        self.tail_s = tail_s
+        self.threshold = threshold
+        self.max_delay_s = max_delay_s
+        self.frame_len = int(fs * frame_ms / 1000)
+        self.frame_s = self.frame_len / fs
+        self._clock = clock
+        self._playbacks = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    @property
+    def playing(self):
+        with self._lock:
+            return bool(self._playbacks) and self._playbacks[-1].finished_at is None
+
+    def playback_started(self, pcm=None, fs=None):
+        """Mimu starts talking; `pcm` (int16 or float32 at `fs`) is what is played, if known."""
+        reference = None
+        if pcm is not None:
+            audio = pcm_to_float32(pcm) if np.asarray(pcm).dtype == np.int16 else np.asarray(pcm, np.float32)
+            if audio.ndim > 1:
+                audio = audio.mean(axis=1)
+            if fs and fs != self.fs:
+                audio = PolyphaseResampler(fs, self.fs).resample(audio)
+            reference = envelope(audio, self.frame_len)
+        with self._lock:
+            self._playbacks.append(_Playback(self._clock(), reference))
+
+    def playback_finished(self):
+        with self._lock:
+            if self._playbacks and self._playbacks[-1].finished_at is None:
+                self._playbacks[-1].finished_at = self._clock()
+
+    def check(self, audio, ended_at=None):
+        """Return (is_echo, reason) for `audio` (at `fs`) that finished arriving at `ended_at`.
+
+        The reason is "half-duplex", "correlation" or None.
+        """
+        if self.mode == "off":
+            return False, None
+        ended_at = self._clock() if ended_at is None else ended_at
+        started_at = ended_at - len(audio) / float(self.fs)
+        with self._lock:
+            overlapping = [p for p in self._playbacks
+                           if p.started_at <= ended_at
+                           and (p.finished_at is None or p.finished_at + self.tail_s >= started_at)]
+        if not overlapping:
+            return False, None
+        if self.mode == "half-duplex" or any(p.reference is None for p in overlapping):
+            return True, "half-duplex"
+
+        captured = envelope(pcm_to_float32(audio) if audio.dtype == np.int16 else audio, self.frame_len)
+        for playback in overlapping:
+            if self._correlation(captured, playback.reference, started_at - playback.started_at) >= self.threshold:
+                return True, "correlation"
+        return False, None
+
+    def _correlation(self, captured, reference, offset_s):
+        """Best envelope correlation with the captured clip starting `offset_s` into the playback.
+
+        Echoes only arrive late, so delays from 0 to `max_delay_s` are tried.
+        """
+        best = 0.0
+        min_overlap = max(int(0.2 / self.frame_s), 2)
+        expected = int(round(offset_s / self.frame_s))
+        for delay in range(int(round(self.max_delay_s / self.frame_s)) + 1):
+            # captured[i] was played at reference[i + expected - delay]
+            shift = expected - delay
+            lo = max(0, -shift)
+            hi = min(len(captured), len(reference) - shift)
+            if hi - lo < min_overlap:
+                continue
+            best = max(best, _pearson(captured[lo:hi], reference[lo + shift:hi + shift]))
+        return best
@@ -0,0 +1,151 @@
+"""
+Transcript fan-out for the Mimu Voice Interaction Service.
+- Every subscriber gets its own bounded buffer of every published event
+- Consumers block with a timeout (long-poll) instead of polling in a loop
+- Slow consumers lose their oldest events rather than holding up the others
+- A fixed-size history of recent transcripts lets consumers catch up by cursor
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+
+
+class Subscription:
+    """One consumer's view of the event stream."""
+
+    def __init__(self, broadcaster, maxlen):
+        self._broadcaster = broadcaster
+        self._events = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.last_active = time.monotonic()
+        self.closed = False
+
+    def _deliver(self, event):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        """Next event, waiting up to `timeout` seconds (None if none arrives)."""
+        self.last_active = time.monotonic()
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._events or self.closed, timeout):
+                return None
+            event = self._events.popleft() if self._events else None
+        self.last_active = time.monotonic()
+        return event
+
+    def pending(self):
+        with self._cond:
+            return len(self._events)
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self._broadcaster.unsubscribe(self)
+
+
+class Broadcaster:
+    """Publishes each event to every current subscriber."""
+
+    def __init__(self, buffer_size=100):
+        self.buffer_size = buffer_size
+        self._subscribers = set()
+        self._named = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def subscribe(self):
+        subscription = Subscription(self, self.buffer_size)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+            for name, named in list(self._named.items()):
+                if named is subscription:
+                    del self._named[name]
+
+    def named(self, name, idle_timeout=300.0):
+        """Long-lived subscription for a polling client identified by name.
+
+        Named subscriptions idle for longer than `idle_timeout` are dropped.
+        """
+        now = time.monotonic()
+        with self._lock:
+            stale = [n for n, s in self._named.items()
+                     if n != name and now - s.last_active > idle_timeout]
+            for stale_name in stale:
+                self._subscribers.discard(self._named.pop(stale_name))
+            subscription = self._named.get(name)
+            if subscription is None:
+                subscription = Subscription(self, self.buffer_size)
+                self._named[name] = subscription
+                self._subscribers.add(subscription)
+        return subscription
+
+    def publish(self, payload):
+        """Stamp `payload` with an id and time and deliver it to everyone."""
+        event = {"id": next(self._ids), "timestamp": time.time(), **payload}
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription._deliver(event)
+        return event
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+class TranscriptStore:
+    """Fixed-capacity history of transcript records with increasing ids.
+
+    Appends are O(1) and evict the oldest record once `capacity` is reached.
+    Ids are consecutive, so a cursor maps straight to a position in the ring.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self._records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._next_id = 1
+
+    def append(self, record):
+        """Stamp `record` with the next id and the current time and keep it."""
+        with self._lock:
+            stored = {"id": self._next_id, "timestamp": time.time(), **record}
+            self._next_id += 1
+            self._records.append(stored)
+        return stored
+
+    def since(self, cursor=0, limit=100):
+        """Records with an id above `cursor`, oldest first, at most `limit` of them.
+
+        Returns (records, truncated): `truncated` is True when records after
+        `cursor` were already evicted, i.e. the consumer fell too far behind.
+        """
+        with self._lock:
+            if not self._records:
+                return [], False
+            first_id = self._records[0]["id"]
+            start = max(cursor + 1 - first_id, 0)
+            records = list(itertools.islice(self._records, start, start + max(limit, 0)))
+            truncated = cursor + 1 < first_id
+        return records, truncated
+
+    def latest_id(self):
+        with self._lock:
+            return self._next_id - 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
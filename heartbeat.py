@@ -0,0 +1,173 @@
+"""
+Autonomous speech scheduling for the Mimu Voice Interaction Service.
+- Heartbeat and chatter rules are kept in a heap of due times, served by one thread
+- Each rule has its own interval, random jitter and chance of speaking when due
+- Nothing is said during quiet hours, and a due rule waits while Ba is speaking
+- Rules only queue speech, so capture and transcription never wait for them
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from datetime import datetime
+
+
+def parse_quiet_hours(spec):
+    """Parse "22-7" into (22, 7); an empty spec means no quiet hours."""
+    spec = (spec or "").strip()
+    if not spec:
+        return None
+    start, sep, end = spec.partition("-")
+    if not sep:
+        raise ValueError(f"Quiet hours should look like '22-7', got '{spec}'")
+    start, end = int(start), int(end)
+    if not (0 <= start < 24 and 0 <= end < 24):
+        raise ValueError(f"Quiet hours must be between 0 and 23: '{spec}'")
+    return start, end
+
+
+def in_quiet_hours(quiet_hours, now):
+    """Whether `now` (a datetime) falls in [start, end), wrapping past midnight."""
+    if quiet_hours is None:
+        return False
+    start, end = quiet_hours
+    if start <= end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+
+class Rule:
+    """Say something every `interval` seconds, give or take `jitter`, with the given chance."""
+
+    def __init__(self, name, action, interval, jitter=0.0, probability=1.0):
+        if interval <= 0:
+            raise ValueError(f"Rule '{name}' needs a positive interval")
+        if jitter < 0 or jitter >= interval:
+            raise ValueError(f"Rule '{name}' jitter must be between 0 and its interval")
+        self.name = name
+        self.action = action
+        self.interval = interval
+        self.jitter = jitter
+        self.probability = probability
+        self.fired = 0
+        self.skipped = 0
+        self.deferred = 0
+
+
+class HeartbeatScheduler:
+    """Runs Rules at their due times on a background thread.
+
+    `busy()` says whether Ba is speaking; a due rule is then retried after
+    `busy_retry` seconds instead of talking over Ba. During `quiet_hours`
+    ((start, end) hours, see parse_quiet_hours) due rules are skipped.
+    `clock`, `now` and `rng` can be replaced for tests.
+    """
+
+    def __init__(self, rules=(), busy=None, quiet_hours=None, busy_retry=5.0,
+                 clock=time.monotonic, now=datetime.now, rng=None):
+        self.busy = busy
+        self.quiet_hours = quiet_hours
+        self.busy_retry = busy_retry
+        self._clock = clock
+        self._now = now
+        self._rng = rng or random.Random()
+        self._rules = {}
+        self._heap = []   # (due time, sequence, rule name)
+        self._sequence = itertools.count()
+        self._wakeup = threading.Condition()
+        self._stop = False
+        self._thread = None
+        for rule in rules:
+            self.add(rule)
+
+    def add(self, rule):
+        """Schedule a rule; its first turn comes one interval from now."""
+        with self._wakeup:
+            if rule.name in self._rules:
+                raise ValueError(f"Duplicate heartbeat rule: '{rule.name}'")
+            self._rules[rule.name] = rule
+            self._push(rule, self._clock() + self._next_interval(rule))
+            self._wakeup.notify()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._wakeup:
+            self._stop = False
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=2.0):
+        with self._wakeup:
+            self._stop = True
+            self._wakeup.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def next_due(self):
+        """Seconds until the next rule is due (None without rules)."""
+        with self._wakeup:
+            if not self._heap:
+                return None
+            return max(self._heap[0][0] - self._clock(), 0.0)
+
+    def stats(self):
+        with self._wakeup:
+            return {name: {"interval": rule.interval, "fired": rule.fired,
+                           "skipped": rule.skipped, "deferred": rule.deferred}
+                    for name, rule in self._rules.items()}
+
+    def run_due(self):
+        """Handle every rule that is due now; returns the names that spoke."""
+        fired = []
+        while True:
+            with self._wakeup:
+                if not self._heap or self._heap[0][0] > self._clock():
+                    return fired
+                _, _, name = heapq.heappop(self._heap)
+                rule = self._rules[name]
+            if self._handle(rule):
+                fired.append(rule.name)
+
+    def _handle(self, rule):
+        now = self._clock()
+        if self.busy is not None and self.busy():
+            rule.deferred += 1
+            self._reschedule(rule, now + self.busy_retry)
+            return False
+        spoke = False
+        if in_quiet_hours(self.quiet_hours, self._now()) or self._rng.random() >= rule.probability:
+            rule.skipped += 1
+        else:
+            try:
+                rule.action()
+                rule.fired += 1
+                spoke = True
+            except Exception as e:
+                print(f"Error in heartbeat rule '{rule.name}': {e}")
+        self._reschedule(rule, now + self._next_interval(rule))
+        return spoke
+
+    def _next_interval(self, rule):
+        return rule.interval + self._rng.uniform(-rule.jitter, rule.jitter)
+
+    def _reschedule(self, rule, due):
+        with self._wakeup:
+            self._push(rule, due)
+
+    def _push(self, rule, due):
+        # Callers hold _wakeup
+        heapq.heappush(self._heap, (due, next(self._sequence), rule.name))
+
+    def _run(self):
+        while True:
+            with self._wakeup:
+                if self._stop:
+                    return
+                wait = self._heap[0][0] - self._clock() if self._heap else None
+                if wait is None or wait > 0:
+                    self._wakeup.wait(wait)
+                    continue
+            self.run_due()
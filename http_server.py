@@ -0,0 +1,115 @@
+"""
+HTTP serving for the Mimu Voice Interaction Service.
+- Waitress serves the Flask app from a pool of threads instead of Werkzeug's development server
+- HTTP/1.1 keep-alive connections are reused; idle ones are closed after a timeout
+- Request bodies over the size limit are refused with 413
+- stop() stops taking new work, drains what is in flight, then closes the listener
+"""
+
+import threading
+import time
+
+
+class HTTPServer:
+    """Runs a WSGI app on a background thread.
+
+    `backend` is "waitress" (threaded production server) or "flask"
+    (Werkzeug's development server, for debugging). Waitress is imported
+    on start(); if it is missing, the development server is used instead.
+
+    Requests are served by threads of this process, not by worker
+    processes: the microphones, the TTS engine and the resident model live
+    here and cannot be shared across processes.
+    """
+
+    def __init__(self, app, host="0.0.0.0", port=5000, backend="waitress", threads=8,
+                 idle_timeout=120.0, max_request_bytes=25 * 1024 * 1024, connection_limit=100):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.backend = backend
+        self.threads = threads
+        self.idle_timeout = idle_timeout
+        self.max_request_bytes = max_request_bytes
+        self.connection_limit = connection_limit
+        self.draining = threading.Event()
+        self._in_flight = 0
+        self._in_flight_lock = threading.Condition()
+        self._server = None
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def in_flight(self):
+        """Requests whose handler has not returned yet."""
+        with self._in_flight_lock:
+            return self._in_flight
+
+    def start(self):
+        """Bind the listener and serve on a background thread; returns the bound port."""
+        self.app.config["MAX_CONTENT_LENGTH"] = self.max_request_bytes
+        self.draining.clear()
+        if self.backend == "waitress":
+            try:
+                from waitress.server import create_server
+            except ImportError:
+                print("waitress is not installed (pip install waitress); using the Flask development server")
+                self.backend = "flask"
+        if self.backend == "waitress":
+            self._server = create_server(
+                self._counted, host=self.host, port=self.port, threads=self.threads,
+                channel_timeout=self.idle_timeout, max_request_body_size=self.max_request_bytes,
+                connection_limit=self.connection_limit, ident="mimu",
+            )
+            self.port = self._server.effective_port
+            serve = self._server.run
+        else:
+            from werkzeug.serving import make_server
+            self._server = make_server(self.host, self.port, self._counted, threaded=True)
+            self.port = self._server.server_port
+            serve = self._server.serve_forever
+        self._thread = threading.Thread(target=serve, name="http-server", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self, drain=None, timeout=10.0):
+        """Shut down gracefully within about `timeout` seconds.
+
+        `draining` is set first so handlers can refuse new work. Then
+        `drain(seconds_left)` (e.g. waiting for queued speech) and the
+        requests already being handled get the rest of the timeout, before
+        the listener and any idle keep-alive connections are closed.
+        Returns True if everything finished in time.
+        """
+        deadline = time.monotonic() + timeout
+        self.draining.set()
+        drained = True
+        if drain is not None:
+            drained = bool(drain(max(deadline - time.monotonic(), 0.0)))
+        with self._in_flight_lock:
+            drained = self._in_flight_lock.wait_for(
+                lambda: self._in_flight == 0, max(deadline - time.monotonic(), 0.0)) and drained
+        if self._server is not None:
+            if self.backend == "waitress":
+                # Closed from the server's own loop; closing sockets under its select() fails
+                self._server.trigger.pull_trigger(self._server.close)
+            else:
+                self._server.shutdown()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join(max(deadline - time.monotonic(), 1.0))
+        return drained
+
+    def _counted(self, environ, start_response):
+        # Counts until the handler returns; streamed bodies (SSE) do not hold up shutdown
+        with self._in_flight_lock:
+            self._in_flight += 1
+        try:
+            return self.app(environ, start_response)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight -= 1
+                self._in_flight_lock.notify_all()
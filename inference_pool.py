@@ -0,0 +1,402 @@
+"""
+Process-pool inference for the Mimu Voice Interaction Service.
+- N worker processes each keep their own Whisper model, away from the service's GIL
+- Audio reaches them through shared memory; only small job headers are pickled
+- Each worker pins torch to its share of the cores so workers do not oversubscribe
+- A worker that dies is restarted, and the job it held fails instead of hanging
+"""
+
+import itertools
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from model_registry import AVAILABLE_MODELS, _load_whisper_model
+
+
+class WorkerCrashed(RuntimeError):
+    """The worker process exited while it held a job."""
+
+
+def run_inference(model, kind, clips, options):
+    """Default runner: the transcription call named by `kind`, inside a worker."""
+    from transcription import transcribe_batch, transcribe_clip, transcribe_words
+
+    if kind == "clip":
+        return transcribe_clip(model, clips[0], **options)
+    if kind == "batch":
+        return transcribe_batch(model, clips, **options)
+    if kind == "words":
+        return transcribe_words(model, clips[0], **options)
+    raise ValueError(f"Unknown inference kind: {kind}")
+
+
+def _pack(clips):
+    """Copy float32 clips into one new shared-memory block; return (block, lengths)."""
+    lengths = [len(clip) for clip in clips]
+    total = sum(lengths)
+    block = shared_memory.SharedMemory(create=True, size=max(total, 1) * 4)
+    flat = np.ndarray((total,), dtype=np.float32, buffer=block.buf)
+    offset = 0
+    for clip, length in zip(clips, lengths):
+        flat[offset:offset + length] = clip
+        offset += length
+    del flat  # the block cannot be closed while a view is alive
+    return block, lengths
+
+
+def _unpack(name, lengths):
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        flat = np.ndarray((sum(lengths),), dtype=np.float32, buffer=block.buf)
+        # One memcpy per clip, so the block can be closed before the decode
+        clips = [chunk.copy() for chunk in np.split(flat, np.cumsum(lengths)[:-1])]
+        del flat
+    finally:
+        block.close()
+    return clips
+
+
+def _pin_threads(threads):
+    # The env vars cover a torch that is imported later (by the loader); an
+    # already imported torch has to be told directly
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+
+def _worker_main(index, generation, model_name, threads, loader, runner, tasks, results):
+    """Entry point of a worker process: load the model, then serve jobs until told to stop."""
+    if threads:
+        _pin_threads(threads)
+    started = time.perf_counter()
+    try:
+        model = loader(model_name)
+    except Exception as e:
+        results.put(("failed", index, generation, None, f"{type(e).__name__}: {e}"))
+        return
+    if threads:
+        _pin_threads(threads)
+    results.put(("ready", index, generation, None, time.perf_counter() - started))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        job_id, kind, block_name, lengths, options = task
+        try:
+            clips = _unpack(block_name, lengths)
+            results.put(("done", index, generation, job_id, runner(model, kind, clips, options)))
+        except Exception as e:
+            results.put(("error", index, generation, job_id, f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, index, generation, model_name):
+        self.index = index
+        self.generation = generation
+        self.model_name = model_name
+        self.process = None
+        self.tasks = None
+        self.state = "starting"   # starting -> idle <-> busy -> retiring
+        self.job = None
+        self.jobs = 0
+        self.load_seconds = None
+
+    def info(self):
+        return {
+            "index": self.index,
+            "pid": self.process.pid if self.process is not None else None,
+            "state": self.state,
+            "model": self.model_name,
+            "jobs": self.jobs,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+        }
+
+
+class InferencePool:
+    """Runs Whisper decodes on `workers` child processes.
+
+    `submit(kind, clips, **options)` copies the float32 clips into shared
+    memory and returns a Future resolved with what `runner(model, kind,
+    clips, options)` returned in the worker. `loader` and `runner` must be
+    module-level functions so the worker processes can import them.
+
+    `swap()` rolls the pool over to another model one worker at a time: a
+    replacement is loaded first, and the workers on the old model keep
+    serving until it is ready.
+    """
+
+    def __init__(self, model_name="base", workers=2, threads_per_worker=None, loader=None,
+                 runner=None, start_method="spawn", restart_backoff=1.0, max_backoff=30.0):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.model_name = model_name
+        self.size = workers
+        if threads_per_worker is None:
+            threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+        self.threads_per_worker = threads_per_worker
+        self._loader = loader or _load_whisper_model
+        self._runner = runner or run_inference
+        self._ctx = multiprocessing.get_context(start_method)
+        self._restart_backoff = restart_backoff
+        self._max_backoff = max_backoff
+        self._backoff = restart_backoff
+        self._next_spawn = 0.0
+        self._lock = threading.RLock()
+        self._ready = threading.Event()
+        self._results = None
+        self._workers = []
+        self._indices = itertools.count()
+        self._generations = itertools.count(1)
+        self._job_ids = itertools.count(1)
+        self._pending = deque()    # (job_id, kind, block, lengths, options)
+        self._jobs = {}            # job_id -> (future, block)
+        self._previous_model = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.restarts = 0
+        self.last_error = None
+        self.completed = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._results = self._ctx.Queue()
+            self._maintain()
+            self._thread = threading.Thread(target=self._run, name="inference-pool", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            for worker in self._workers:
+                if worker.process.is_alive():
+                    worker.tasks.put(None)
+            deadline = time.monotonic() + timeout
+            for worker in self._workers:
+                worker.process.join(max(0.0, deadline - time.monotonic()))
+                if worker.process.is_alive():
+                    worker.process.terminate()
+                    worker.process.join(1)
+            self._workers = []
+            stopped = RuntimeError("Inference pool stopped")
+            for future, block in self._jobs.values():
+                self._release(block)
+                if not future.done():
+                    future.set_exception(stopped)
+            self._jobs.clear()
+            self._pending.clear()
+            self._ready.clear()
+
+    def wait_ready(self, timeout=None):
+        """Block until at least one worker has its model loaded; return True if one has."""
+        return self._ready.wait(timeout)
+
+    def submit(self, kind, clips, **options):
+        """Queue one decode of float32 `clips`; returns a Future with the runner's result."""
+        if not self.running:
+            self.start()
+        future = Future()
+        block, lengths = _pack([np.asarray(clip, dtype=np.float32) for clip in clips])
+        with self._lock:
+            job_id = next(self._job_ids)
+            self._jobs[job_id] = (future, block)
+            self._pending.append((job_id, kind, block, lengths, options))
+            self._dispatch()
+        return future
+
+    def swap(self, model_name):
+        """Roll the workers over to `model_name`.
+
+        Returns False if a swap is already in progress or the model is already active.
+        """
+        if model_name not in AVAILABLE_MODELS:
+            raise ValueError(f"Unknown Whisper model: {model_name}")
+        with self._lock:
+            if self._previous_model is not None or model_name == self.model_name:
+                return False
+            print(f"Rolling inference workers over to Whisper model '{model_name}'...")
+            self._previous_model = self.model_name
+            self.model_name = model_name
+            self.last_error = None
+            self._maintain()
+        return True
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def status(self):
+        """Snapshot for the admin endpoint, shaped like ModelRegistry.status()."""
+        with self._lock:
+            workers = [worker.info() for worker in self._workers]
+            current = [w for w in workers if w["model"] == self.model_name]
+            loaded = [w["load_seconds"] for w in current if w["load_seconds"] is not None]
+            return {
+                "model": self._previous_model or self.model_name,
+                "loaded": any(w["state"] in ("idle", "busy") for w in workers),
+                "pending": self.model_name if self._previous_model is not None else None,
+                "last_error": self.last_error,
+                "load_seconds": max(loaded) if loaded else None,
+                "workers": workers,
+                "threads_per_worker": self.threads_per_worker,
+                "queued": len(self._pending),
+                "completed": self.completed,
+                "restarts": self.restarts,
+            }
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                message = self._results.get(timeout=0.1)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                if message is not None:
+                    self._handle(message)
+                self._reap()
+                self._maintain()
+                self._dispatch()
+
+    def _find(self, index, generation):
+        for worker in self._workers:
+            if worker.index == index and worker.generation == generation:
+                return worker
+        return None
+
+    def _handle(self, message):
+        kind, index, generation, job_id, payload = message
+        worker = self._find(index, generation)
+        if worker is None:
+            return  # from a process that has already been reaped
+        if kind == "ready":
+            worker.state = "idle"
+            worker.load_seconds = payload
+            self._backoff = self._restart_backoff
+            self._ready.set()
+            print(f"Inference worker {index} (pid {worker.process.pid}) loaded "
+                  f"'{worker.model_name}' in {payload:.2f}s")
+        elif kind == "failed":
+            print(f"Inference worker {index} could not load '{worker.model_name}': {payload}")
+            self.last_error = payload
+            worker.state = "failed"
+            if worker.model_name == self.model_name and self._previous_model is not None:
+                # A swap to a model that does not load: stay on the old one
+                self.model_name, self._previous_model = self._previous_model, None
+        elif kind in ("done", "error"):
+            worker.state = "idle" if worker.state == "busy" else worker.state
+            worker.job = None
+            worker.jobs += 1
+            future, block = self._jobs.pop(job_id, (None, None))
+            self._release(block)
+            self.completed += 1
+            if future is None or future.done():
+                return  # the caller cancelled it
+            if kind == "done":
+                future.set_result(payload)
+            else:
+                future.set_exception(RuntimeError(payload))
+
+    def _reap(self):
+        for worker in list(self._workers):
+            if worker.process.is_alive():
+                continue
+            self._workers.remove(worker)
+            if worker.job is not None:
+                future, block = self._jobs.pop(worker.job, (None, None))
+                self._release(block)
+                if future is not None and not future.done():
+                    future.set_exception(WorkerCrashed(
+                        f"Inference worker {worker.index} exited with code {worker.process.exitcode}"))
+            if worker.state != "retiring":
+                # Crashed, or could not load: wait a little longer before each retry
+                self.restarts += 1
+                self._next_spawn = time.monotonic() + self._backoff
+                self._backoff = min(self._backoff * 2, self._max_backoff)
+                print(f"Inference worker {worker.index} exited with code {worker.process.exitcode}; "
+                      f"restarting")
+
+    def _maintain(self):
+        current = [w for w in self._workers if w.model_name == self.model_name]
+        stale = [w for w in self._workers if w.model_name != self.model_name and w.state != "retiring"]
+        serving = [w for w in current if w.state in ("idle", "busy")]
+
+        # Retire an old-model worker once a replacement can take its place
+        for worker in list(stale):
+            if worker.state in ("idle", "starting", "failed") and len(serving) + len(stale) > self.size:
+                self._retire(worker)
+                stale.remove(worker)
+        if not stale and self._previous_model is not None and len(serving) >= self.size:
+            print(f"All inference workers now run '{self.model_name}'")
+            self._previous_model = None
+
+        # Top up to size; during a swap, bring replacements up one at a time
+        starting = any(w.state == "starting" for w in current)
+        while len(current) < self.size and time.monotonic() >= self._next_spawn:
+            if stale and starting:
+                break
+            current.append(self._spawn(self.model_name))
+            starting = True
+
+    def _spawn(self, model_name):
+        worker = _Worker(next(self._indices), next(self._generations), model_name)
+        worker.tasks = self._ctx.Queue()
+        worker.process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker.index, worker.generation, model_name, self.threads_per_worker,
+                  self._loader, self._runner, worker.tasks, self._results),
+            name=f"inference-{worker.index}",
+            daemon=True,
+        )
+        worker.process.start()
+        self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker):
+        worker.state = "retiring"
+        if worker.process.is_alive():
+            worker.tasks.put(None)
+
+    def _dispatch(self):
+        # Workers on the current model first; old ones only help out during a swap
+        idle = sorted((w for w in self._workers if w.state == "idle"),
+                      key=lambda w: w.model_name != self.model_name)
+        for worker in idle:
+            if not self._pending:
+                return
+            job_id, kind, block, lengths, options = self._pending.popleft()
+            worker.state = "busy"
+            worker.job = job_id
+            worker.tasks.put((job_id, kind, block.name, lengths, options))
+
+    @staticmethod
+    def _release(block):
+        if block is None:
+            return
+        try:
+            block.close()
+            block.unlink()
+        except FileNotFoundError:
+            pass
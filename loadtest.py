@@ -0,0 +1,364 @@
+"""
+HTTP load test for the Mimu Voice Interaction Service.
+- Serves the real Flask app in-process with fake sounddevice and pyttsx3 and a stub Whisper
+- A fake microphone keeps speaking, so /listen has transcripts to hand out
+- Concurrent clients send a weighted mix of /speak, /listen, /transcribe and other requests
+- Reports throughput, per-endpoint latency percentiles and error rates, and queue growth as JSON
+
+Usage:
+    python3 loadtest.py --concurrency 16 --duration 30 --output waitress.json
+    python3 loadtest.py --concurrency 16 --duration 30 --server flask --baseline waitress.json
+    python3 loadtest.py --mix speak=1,transcribe=1 --concurrency 4
+"""
+
+import argparse
+import contextlib
+import http.client
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+from benchmark import STUB_TEXT, install_fakes, summarize, synthetic_clips, with_gaps
+
+DEFAULT_MIX = "speak=4,speak_status=2,listen=2,history=1,sources=1,healthz=1,transcribe=1"
+
+PHRASES = [
+    "Dạ ba ơi, Mimu nghe nè!",
+    "Mimu đói rồi ba ơi",
+    "Hôm nay trời đẹp quá",
+    "Ba đi làm về chưa?",
+]
+
+
+def parse_mix(spec):
+    """Parse "speak=4,listen=2" into {"speak": 4.0, "listen": 2.0}."""
+    mix = {}
+    for entry in (part.strip() for part in spec.split(",")):
+        if not entry:
+            continue
+        name, _, weight = entry.partition("=")
+        name = name.strip()
+        if name not in REQUESTS:
+            raise ValueError(f"Unknown request '{name}'; choose from {', '.join(sorted(REQUESTS))}")
+        mix[name] = float(weight) if weight else 1.0
+        if mix[name] < 0:
+            raise ValueError(f"Weight for '{name}' must not be negative")
+    if not mix or not sum(mix.values()):
+        raise ValueError("The request mix is empty")
+    return mix
+
+
+def _wav_bytes(pcm, fs=16000):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(fs)
+        wf.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+class Client:
+    """One simulated API consumer with its own keep-alive connection."""
+
+    def __init__(self, n, port, rng, listen_wait, upload, keep_alive=True):
+        self.id = f"load-{n}"
+        self.port = port
+        self.rng = rng
+        self.listen_wait = listen_wait
+        self.upload = upload
+        self.keep_alive = keep_alive
+        self.last_job = None
+        self._conn = None
+
+    def request(self, method, path, body=None, headers=None):
+        """Send one request; returns (status, parsed JSON or None)."""
+        if self._conn is None:
+            self._conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=self.listen_wait + 30)
+        headers = dict(headers or {})
+        if not self.keep_alive:
+            headers["Connection"] = "close"
+        try:
+            self._conn.request(method, path, body=body, headers=headers)
+            response = self._conn.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.close()
+            raise
+        if not self.keep_alive or response.will_close:
+            self.close()
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError:
+            return response.status, None
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _speak(client):
+    body = json.dumps({"text": client.rng.choice(PHRASES),
+                       "priority": client.rng.choice(["normal", "low"])})
+    status, data = client.request("POST", "/speak", body, {"Content-Type": "application/json"})
+    if status == 202 and data:
+        client.last_job = data.get("job_id")
+    return status
+
+
+def _speak_status(client):
+    if client.last_job is None:
+        return _speak(client)
+    return client.request("GET", f"/speak/{client.last_job}")[0]
+
+
+def _listen(client):
+    return client.request("GET", f"/listen?client={client.id}&wait={client.listen_wait}")[0]
+
+
+def _transcribe(client):
+    return client.request("POST", "/transcribe", client.upload, {"Content-Type": "audio/wav"})[0]
+
+
+def _get(path):
+    return lambda client: client.request("GET", path)[0]
+
+
+REQUESTS = {
+    "speak": _speak,
+    "speak_status": _speak_status,
+    "listen": _listen,
+    "transcribe": _transcribe,
+    "history": _get("/history?limit=20"),
+    "sources": _get("/sources"),
+    "healthz": _get("/healthz"),
+    "readyz": _get("/readyz"),
+    "metrics": _get("/metrics"),
+}
+
+
+def _queue_depths(service):
+    depths = {"tts": service.tts_worker.pending(), "scheduler": service.inference_scheduler.pending()}
+    for stage, stats in service.voice_pipeline.stats().items():
+        depths[f"pipeline_{stage}"] = stats["depth"]
+    return depths
+
+
+def _queue_report(samples):
+    """Start, peak and end depth of each queue, and how fast it grew (items per second)."""
+    report = {}
+    if not samples:
+        return report
+    for name in samples[0][1]:
+        times = np.array([t for t, _ in samples])
+        depths = np.array([depths[name] for _, depths in samples], dtype=np.float64)
+        growth = float(np.polyfit(times, depths, 1)[0]) if len(samples) > 2 and np.ptp(times) > 0 else 0.0
+        report[name] = {"start": int(depths[0]), "max": int(depths.max()), "end": int(depths[-1]),
+                        "growth_per_second": round(growth, 3)}
+    return report
+
+
+def run_load_test(concurrency=8, duration=10.0, mix=None, server="waitress", threads=8,
+                  speed=4.0, decode_rtf=0.1, listen_wait=1.0, keep_alive=True, seed=0,
+                  sample_interval=0.25):
+    """Serve the app in-process, drive it with `concurrency` clients for `duration` s, return the report."""
+    mix = mix or parse_mix(DEFAULT_MIX)
+    fs = 16000
+    workdir = tempfile.mkdtemp(prefix="mimu-load-")
+    os.environ.setdefault("MIMU_TTS_CACHE_DIR", os.path.join(workdir, "tts-cache"))
+    os.environ.setdefault("MIMU_VOICEPRINT_FILE", os.path.join(workdir, "voiceprints.npz"))
+    os.environ["MIMU_INFERENCE_WORKERS"] = "0"
+    os.environ["MIMU_QUANTIZE"] = "0"
+    os.environ["MIMU_AUDIO_SOURCES"] = ""
+    os.environ["MIMU_AUDIO_ARCHIVE_DIR"] = ""
+    # The stub model has no batched decode (that needs torch); one clip per decode
+    # still queues concurrent uploads behind each other in the scheduler
+    os.environ["MIMU_TRANSCRIBE_MAX_BATCH"] = "1"
+    os.environ["MIMU_HTTP_SERVER"] = server
+    os.environ["MIMU_HTTP_THREADS"] = str(threads)
+
+    # Enough speech on the fake microphone to keep /listen busy for the whole run
+    clips = synthetic_clips(max(int(duration * speed / 3.0) + 2, 2), fs=fs, seed=seed)
+    install_fakes(with_gaps(clips, 1.0, fs), speed, "stub", decode_rtf, STUB_TEXT)
+
+    import service
+    from http_server import HTTPServer
+
+    service.model_registry.load()
+    for source in service.audio_sources.values():
+        source.start()
+    service.tts_worker.start()
+    service.voice_pipeline.start()
+    api_server = HTTPServer(service.app, host="127.0.0.1", port=0, backend=server, threads=threads,
+                            idle_timeout=service.HTTP_IDLE_TIMEOUT,
+                            max_request_bytes=int(service.HTTP_MAX_REQUEST_MB * 1024 * 1024),
+                            connection_limit=max(service.HTTP_CONNECTION_LIMIT, concurrency * 2))
+    port = api_server.start()
+
+    stop = threading.Event()
+
+    def capture():
+        while not stop.is_set():
+            service.capture_utterance(max_wait=0.5)
+
+    threading.Thread(target=capture, name="load-capture", daemon=True).start()
+
+    names = list(mix)
+    weights = np.array([mix[name] for name in names]) / sum(mix.values())
+    upload = _wav_bytes(clips[0][1][:fs], fs)
+    latencies = {name: [] for name in names}
+    statuses = {name: {} for name in names}
+    errors = {name: 0 for name in names}
+    lock = threading.Lock()
+
+    def client_loop(n):
+        rng = random.Random(seed * 1000 + n)
+        client = Client(n, port, rng, listen_wait, upload, keep_alive=keep_alive)
+        choice = np.random.default_rng(seed * 1000 + n)
+        try:
+            while not stop.is_set():
+                name = names[choice.choice(len(names), p=weights)]
+                started = time.perf_counter()
+                try:
+                    status = REQUESTS[name](client)
+                except (OSError, http.client.HTTPException):
+                    status = None
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies[name].append(elapsed)
+                    key = str(status) if status is not None else "connection_error"
+                    statuses[name][key] = statuses[name].get(key, 0) + 1
+                    if status is None or status >= 500:
+                        errors[name] += 1
+        finally:
+            client.close()
+
+    samples = []
+    workers = [threading.Thread(target=client_loop, args=(n,), name=f"load-client-{n}", daemon=True)
+               for n in range(concurrency)]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    while time.perf_counter() - started < duration:
+        samples.append((time.perf_counter() - started, _queue_depths(service)))
+        time.sleep(sample_interval)
+    stop.set()
+    for worker in workers:
+        worker.join(listen_wait + 30)
+    wall_seconds = time.perf_counter() - started
+    samples.append((wall_seconds, _queue_depths(service)))
+
+    api_server.stop(timeout=2)
+    service.voice_pipeline.stop()
+    service.tts_worker.stop(timeout=1)
+    for source in service.audio_sources.values():
+        source.stop()
+
+    total = sum(len(values) for values in latencies.values())
+    failed = sum(errors.values())
+    return {
+        "config": {
+            "server": api_server.backend,
+            "threads": threads,
+            "concurrency": concurrency,
+            "duration": duration,
+            "mix": mix,
+            "keep_alive": keep_alive,
+            "listen_wait": listen_wait,
+            "speed": speed,
+            "stub_decode_rtf": decode_rtf,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "wall_seconds": round(wall_seconds, 3),
+        "requests": total,
+        "throughput_rps": round(total / wall_seconds, 2) if wall_seconds else None,
+        "error_rate": round(failed / total, 4) if total else None,
+        "endpoints": {
+            name: dict(summarize(latencies[name]), status=statuses[name],
+                       error_rate=round(errors[name] / len(latencies[name]), 4) if latencies[name] else None)
+            for name in names
+        },
+        "queues": _queue_report(samples),
+        "transcripts": len(service.transcript_history),
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Endpoints whose p95 grew, or overall throughput that fell, by more than `tolerance`."""
+    regressions = {}
+    for name, summary in report["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(name, {}).get("p95_ms")
+        new = summary.get("p95_ms")
+        if old and new and new > old * (1.0 + tolerance):
+            regressions[name] = {"baseline_p95_ms": old, "p95_ms": new, "change": round(new / old - 1.0, 3)}
+    old, new = baseline.get("throughput_rps"), report.get("throughput_rps")
+    if old and new and new < old * (1.0 - tolerance):
+        regressions["throughput"] = {"baseline_rps": old, "rps": new, "change": round(new / old - 1.0, 3)}
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP load test of Mimu's API with fake audio backends")
+    parser.add_argument("--concurrency", type=int, default=8, help="simultaneous clients (default 8)")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run (default 10)")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"weighted request mix (default {DEFAULT_MIX}); "
+                             f"requests: {', '.join(sorted(REQUESTS))}")
+    parser.add_argument("--server", choices=["waitress", "flask"], default="waitress",
+                        help="HTTP server to test (default waitress)")
+    parser.add_argument("--threads", type=int, default=8, help="server request threads (default 8)")
+    parser.add_argument("--no-keepalive", action="store_true", help="open a new connection per request")
+    parser.add_argument("--listen-wait", type=float, default=1.0, help="long-poll wait for /listen (s)")
+    parser.add_argument("--speed", type=float, default=4.0,
+                        help="how much faster than real time the fake mic and TTS run (default 4)")
+    parser.add_argument("--stub-rtf", type=float, default=0.1,
+                        help="stub Whisper decode time as a fraction of audio length")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed p95 growth or throughput loss over the baseline (default 0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    if args.concurrency < 1 or args.duration <= 0 or args.speed <= 0:
+        parser.error("--concurrency, --duration and --speed must be positive")
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # Service log lines go to stderr so stdout stays valid JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        report = run_load_test(concurrency=args.concurrency, duration=args.duration, mix=mix,
+                               server=args.server, threads=args.threads, speed=args.speed,
+                               decode_rtf=args.stub_rtf, listen_wait=args.listen_wait,
+                               keep_alive=not args.no_keepalive, seed=args.seed)
+
+    regressions = {}
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
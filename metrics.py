@@ -0,0 +1,235 @@
+"""
+Metrics and tracing for the Mimu Voice Interaction Service.
+- Counters, gauges and latency histograms with labels
+- Rendered in the Prometheus text exposition format for /metrics
+- Per-utterance trace ids carried through the log lines of every stage
+"""
+
+import bisect
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Stage latencies range from sub-millisecond (command match) to tens of seconds (Whisper)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        if not items and not self.labelnames:
+            items = [((), 0)]
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down; may be computed at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+        self._function = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+    def set_function(self, function):
+        """Compute the gauge on every scrape.
+
+        `function()` returns a number for an unlabelled gauge, or a dict that
+        maps label-value tuples to numbers.
+        """
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            try:
+                result = self._function()
+            except Exception:
+                return []
+            items = sorted(result.items()) if isinstance(result, dict) else [((), result)]
+        else:
+            with self._lock:
+                items = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, tuple(str(k) for k in key))} {_format_value(v)}"
+            for key, v in items if v is not None
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the wall time of a `with` block, even if it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return series[-1] if series else 0
+
+    def _samples(self):
+        lines = []
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, series):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key, ("le", "+Inf"))
+            lines.append(f"{self.name}_bucket{labels} {series[-1]}")
+            plain = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{plain} {_format_value(series[-2])}")
+            lines.append(f"{self.name}_count{plain} {series[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Owns every metric and renders them all for a scrape."""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self, prefix="mimu_"):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._add(Counter(self.prefix + name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._add(Gauge(self.prefix + name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Trace ids: each utterance gets one at capture, and every stage that handles
+# it tags its log lines with it, so one utterance can be followed end to end.
+_trace = threading.local()
+
+
+def new_trace_id():
+    return uuid.uuid4().hex[:8]
+
+
+def current_trace_id():
+    return getattr(_trace, "trace_id", None)
+
+
+@contextmanager
+def traced(trace_id):
+    """Make `trace_id` the current trace for log lines on this thread."""
+    previous = current_trace_id()
+    _trace.trace_id = trace_id
+    try:
+        yield
+    finally:
+        _trace.trace_id = previous
@@ -0,0 +1,162 @@
+"""
+Process-wide Whisper model registry for the Mimu Voice Interaction Service.
+- Loads the configured Whisper model once and keeps it resident
+- Shares the same instance between the listen loop and the Flask handlers
+- Hot-swaps to a different model size in the background without dropping requests
+"""
+
+import threading
+import time
+
+AVAILABLE_MODELS = (
+    "tiny", "tiny.en", "base", "base.en", "small", "small.en",
+    "medium", "medium.en", "large", "large-v1", "large-v2", "large-v3",
+)
+
+
+def _load_whisper_model(name):
+    """Default loader: load a checkpoint through openai-whisper."""
+    import whisper
+    return whisper.load_model(name)
+
+
+def quantize_linear_layers(model):
+    """Dynamic int8 quantization of every Linear layer, for CPU inference."""
+    import torch
+
+    # Whisper uses its own nn.Linear subclass, and quantize_dynamic only
+    # matches exact types, so swap in plain Linears sharing the same weights
+    for parent in list(model.modules()):
+        for name, child in list(parent.named_children()):
+            if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+                plain = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                plain.weight = child.weight
+                plain.bias = child.bias
+                setattr(parent, name, plain)
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def load_quantized_whisper_model(name):
+    """Loader for CPU profiles: load on the CPU, then quantize to int8."""
+    import whisper
+    return quantize_linear_layers(whisper.load_model(name, device="cpu"))
+
+
+class ModelRegistry:
+    """Holds the single resident Whisper model and swaps it on request.
+
+    Callers always get the currently active model from `get()`. A swap loads the
+    new checkpoint on a background thread while the old model keeps serving, and
+    only replaces the reference once the new one is ready, so in-flight and
+    incoming transcriptions never wait on a load.
+    """
+
+    def __init__(self, model_name="base", loader=None):
+        if model_name not in AVAILABLE_MODELS:
+            raise ValueError(f"Unknown Whisper model: {model_name}")
+        self._loader = loader or _load_whisper_model
+        self._lock = threading.Lock()          # guards the fields below; never held across a load
+        self._load_lock = threading.Lock()     # one first-time load at a time
+        self._ready = threading.Event()
+        self._model = None
+        self._model_name = model_name
+        self._pending_name = None
+        self._last_error = None
+        self._loaded_at = None
+        self._load_seconds = None
+        # Whisper decoding installs kv-cache hooks on the model's modules, so two
+        # decodes must not run on the same model at once
+        self.inference_lock = threading.Lock()
+
+    def load(self):
+        """Load the configured model if it is not resident yet (blocking).
+
+        The checkpoint is read without holding the state lock, so status()
+        and get() callers that find a model never wait on the load.
+        """
+        with self._load_lock:
+            with self._lock:
+                if self._model is not None:
+                    return self._model
+                name = self._model_name
+            print(f"Loading Whisper model '{name}'...")
+            started = time.perf_counter()
+            model = self._loader(name)
+            with self._lock:
+                if self._model is None:   # a swap may have finished first
+                    self._install(name, model, time.perf_counter() - started)
+                return self._model
+
+    def get(self):
+        """Return the resident model, loading it on first use."""
+        model = self._model
+        if model is None:
+            model = self.load()
+        return model
+
+    def wait_ready(self, timeout=None):
+        """Block until a model is resident; return True if one is."""
+        return self._ready.wait(timeout)
+
+    @property
+    def model_name(self):
+        return self._model_name
+
+    def swap(self, model_name):
+        """Start loading `model_name` in the background and switch to it when ready.
+
+        Returns False if a swap is already in progress or the model is already active.
+        """
+        if model_name not in AVAILABLE_MODELS:
+            raise ValueError(f"Unknown Whisper model: {model_name}")
+        with self._lock:
+            if self._pending_name is not None:
+                return False
+            if model_name == self._model_name and self._model is not None:
+                return False
+            self._pending_name = model_name
+            self._last_error = None
+
+        thread = threading.Thread(
+            target=self._swap_worker, args=(model_name,), name="model-swap", daemon=True
+        )
+        thread.start()
+        return True
+
+    def _swap_worker(self, model_name):
+        print(f"Hot-swapping Whisper model to '{model_name}' in the background...")
+        started = time.perf_counter()
+        try:
+            model = self._loader(model_name)
+        except Exception as e:
+            print(f"Error loading Whisper model '{model_name}': {e}")
+            with self._lock:
+                self._pending_name = None
+                self._last_error = str(e)
+            return
+
+        with self._lock:
+            self._install(model_name, model, time.perf_counter() - started)
+            self._pending_name = None
+
+    def _install(self, name, model, load_seconds):
+        # Callers hold self._lock. Requests that already fetched the old model
+        # keep their reference and finish on it; new requests see the new one.
+        self._model = model
+        self._model_name = name
+        self._loaded_at = time.time()
+        self._load_seconds = load_seconds
+        self._ready.set()
+        print(f"Whisper model '{name}' loaded in {load_seconds:.2f}s")
+
+    def status(self):
+        """Snapshot of the registry state for the admin endpoint."""
+        with self._lock:
+            return {
+                "model": self._model_name,
+                "loaded": self._model is not None,
+                "pending": self._pending_name,
+                "last_error": self._last_error,
+                "loaded_at": self._loaded_at,
+                "load_seconds": self._load_seconds,
+            }
@@ -0,0 +1,149 @@
+"""
+Staged worker pipeline for the Mimu Voice Interaction Service.
+- Each stage has a bounded input queue and one or more worker threads
+- A stage's handler returns the item for the next stage, or None to drop it
+- A full downstream queue blocks the upstream workers (backpressure)
+"""
+
+import queue
+import threading
+
+
+class Stage:
+    """One pipeline stage: a bounded queue drained by worker threads."""
+
+    def __init__(self, name, handler, workers=1, queue_size=2):
+        if workers < 1:
+            raise ValueError("A stage needs at least one worker")
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.next_stage = None
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+        self._counter_lock = threading.Lock()
+        self._threads = []
+
+    def _count(self, field):
+        with self._counter_lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def stats(self):
+        return {
+            "depth": self.queue.qsize(),
+            "capacity": self.queue.maxsize,
+            "workers": self.workers,
+            "processed": self.processed,
+            "dropped": self.dropped,
+            "errors": self.errors,
+        }
+
+
+class Pipeline:
+    """Linear chain of stages connected by bounded queues.
+
+    Items enter at the first stage through `submit()` (or at a named stage, for
+    work that skips the earlier steps) and flow downstream as each handler
+    returns them. Stages run concurrently, so item N+1 can be in an early stage
+    while item N is still in a later one.
+    """
+
+    def __init__(self, name="pipeline", poll_interval=0.1):
+        self.name = name
+        self.stages = []
+        self._by_name = {}
+        self._stop = threading.Event()
+        self._poll_interval = poll_interval
+
+    def add_stage(self, name, handler, workers=1, queue_size=2):
+        """Append a stage; returns it."""
+        if name in self._by_name:
+            raise ValueError(f"Duplicate stage name: {name}")
+        stage = Stage(name, handler, workers=workers, queue_size=queue_size)
+        if self.stages:
+            self.stages[-1].next_stage = stage
+        self.stages.append(stage)
+        self._by_name[name] = stage
+        return stage
+
+    def stage(self, name):
+        return self._by_name[name]
+
+    def submit(self, item, stage=None, timeout=None):
+        """Queue an item at the first (or named) stage.
+
+        Blocks while that stage's queue is full; with a timeout, returns False
+        instead of queueing once it expires.
+        """
+        target = self._by_name[stage] if stage else self.stages[0]
+        return self._put(target, item, timeout)
+
+    def _put(self, stage, item, timeout=None):
+        waited = 0.0
+        while not self._stop.is_set():
+            wait = self._poll_interval
+            if timeout is not None:
+                wait = min(wait, max(timeout - waited, 0))
+            try:
+                stage.queue.put(item, timeout=wait)
+                return True
+            except queue.Full:
+                waited += wait
+                if timeout is not None and waited >= timeout:
+                    return False
+        return False
+
+    def start(self):
+        """Start every stage's workers."""
+        self._stop.clear()
+        for stage in self.stages:
+            for index in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker, args=(stage,),
+                    name=f"{self.name}-{stage.name}-{index}", daemon=True,
+                )
+                stage._threads.append(thread)
+                thread.start()
+
+    def stop(self, timeout=2.0):
+        """Ask the workers to exit and wait briefly for them."""
+        self._stop.set()
+        for stage in self.stages:
+            for thread in stage._threads:
+                thread.join(timeout)
+            stage._threads = []
+
+    def _worker(self, stage):
+        while not self._stop.is_set():
+            try:
+                item = stage.queue.get(timeout=self._poll_interval)
+            except queue.Empty:
+                continue
+            try:
+                try:
+                    result = stage.handler(item)
+                except Exception as e:
+                    stage._count("errors")
+                    print(f"Error in {stage.name} stage: {e}")
+                    continue
+
+                stage._count("processed")
+                if stage.next_stage is None:
+                    continue
+                if result is None:
+                    stage._count("dropped")
+                    continue
+                self._put(stage.next_stage, result)
+            finally:
+                # Only after forwarding, so join() never sees an item in flight
+                stage.queue.task_done()
+
+    def join(self):
+        """Block until every queued item has been handled by every stage."""
+        for stage in self.stages:
+            stage.queue.join()
+
+    def stats(self):
+        return {stage.name: stage.stats() for stage in self.stages}
@@ -7,160 +7,1060 @@ Mimu Voice Interaction Service - Enhanced Version
 - NEW: Interactive channel for text-to-speech communication
 - NEW: Autonomous heartbeat-driven conversations
 Note: Uses Whisper for Speech-to-Text and pyttsx3 for TTS.
-Install dependencies: pip install openai-whisper pyttsx3 sounddevice numpy flask
+Install dependencies: pip install openai-whisper pyttsx3 sounddevice numpy flask waitress
+Whisper (and torch), pyttsx3 and sounddevice are imported on first use, so the API is up in well under a second.
 """
 
-import whisper
-import pyttsx3
-import sounddevice as sd
+import json
+import math
+import os
+import signal
 import numpy as np
 import threading
-import wave
 import time
-from datetime import datetime
-from flask import Flask, request, jsonify
-import queue
-
-def listen_to_audio(duration=5, fs=16000, output_file="output.wav"):
-    """Capture audio from the microphone for a given duration."""
-    print(f"Listening for {duration} seconds...")
-    audio = sd.rec(int(duration * fs), samplerate=fs, channels=1, dtype='int16')
-    sd.wait()  # Wait until recording is finished
-    
-    # Save to WAV
-    with wave.open(output_file, 'wb') as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)
-        wf.setframerate(fs)
-        wf.writeframes(audio.tobytes())
-        print(f"Audio saved to {output_file}")
-
-    return output_file
-
-def recognize_speech(audio_file):
-    """Recognize speech from an audio file using Whisper."""
+from flask import Flask, Response, request, jsonify, stream_with_context
+
+from audio_archive import AudioArchive
+from audio_capture import pcm_to_float32
+from batcher import MicroBatcher
+from commands import CommandMatcher, load_command_table
+from echo import EchoGuard
+from events import Broadcaster, TranscriptStore
+from heartbeat import HeartbeatScheduler, Rule, parse_quiet_hours
+from http_server import HTTPServer
+from inference_pool import InferencePool
+from metrics import MetricsRegistry, current_trace_id, new_trace_id, traced
+from model_registry import ModelRegistry, load_quantized_whisper_model
+from pipeline import Pipeline
+from sources import DEFAULT_SOURCE, AudioSource, parse_sources
+from speaker import DEFAULT_SPEAKER, SpeakerVerifier
+from streaming import StreamingRecognizer
+from transcription import (DECODING_PROFILES, WHISPER_SAMPLE_RATE, AudioPayloadError, decode_audio_payload,
+                           transcribe_batch, transcribe_clip, transcribe_words, vocabulary_prompt)
+from tts import PRIORITY_CHATTER, PRIORITY_NAMES, PRIORITY_NORMAL, PRIORITY_REPLY, TTSWorker
+from tts_cache import SynthesisCache
+from vad import VoiceActivityDetector
+
+# Latency histograms, counters and gauges for every stage, served at /metrics
+metrics_registry = MetricsRegistry()
+# Stages that belong to one audio source are tagged with it; the rest use source=""
+STAGE_SECONDS = metrics_registry.histogram(
+    "stage_seconds", "Time spent in each processing stage", ["stage", "source"])
+UTTERANCES = metrics_registry.counter(
+    "utterances_total", "Utterances captured and handed to the pipeline", ["source"])
+SPEAKER_REJECTS = metrics_registry.counter(
+    "speaker_rejects_total", "Utterances rejected as not Ba's voice", ["source"])
+ECHO_SUPPRESSED = metrics_registry.counter(
+    "echo_suppressed_total", "Captured windows dropped as Mimu's own voice", ["source"])
+COMMANDS_MATCHED = metrics_registry.counter("commands_total", "Transcripts matched to a command", ["command", "match"])
+STAGE_ERRORS = metrics_registry.counter("errors_total", "Errors raised while processing", ["stage"])
+TTS_JOBS = metrics_registry.counter("tts_jobs_total", "Finished TTS jobs", ["source", "status"])
+STT_REAL_TIME_FACTOR = metrics_registry.gauge(
+    "stt_real_time_factor", "Whisper decode time divided by audio duration, last utterance", ["source"])
+
+def log(message):
+    """Print a log line tagged with the trace id of the utterance being handled."""
+    trace_id = current_trace_id()
+    print(f"[{trace_id}] {message}" if trace_id else message)
+
+# Whisper model size to keep resident (tiny, base, small, medium, large)
+WHISPER_MODEL = os.environ.get("MIMU_WHISPER_MODEL", "base")
+
+# Decoding profile: "default" (Whisper's defaults) or "cpu-fast" (see transcription.py)
+DECODING_PROFILE = os.environ.get("MIMU_DECODING_PROFILE", "default")
+if DECODING_PROFILE not in DECODING_PROFILES:
+    raise ValueError(f"Unknown decoding profile: {DECODING_PROFILE} "
+                     f"(expected one of {', '.join(DECODING_PROFILES)})")
+QUANTIZE_MODEL = os.environ.get(
+    "MIMU_QUANTIZE", "1" if DECODING_PROFILES[DECODING_PROFILE]["quantize"] else "0") != "0"
+
+def decoding_options():
+    """Whisper options for the active profile, with the command vocabulary as prompt if it asks for one."""
+    profile = DECODING_PROFILES[DECODING_PROFILE]
+    options = dict(profile["options"])
+    if profile["command_prompt"]:
+        prompt = vocabulary_prompt(phrase for command in command_matcher.commands
+                                   for phrase in command.phrases)
+        if prompt:
+            options["initial_prompt"] = prompt
+    return options
+
+# Shared by the listen loop and the Flask handlers; loaded once at startup
+model_registry = ModelRegistry(WHISPER_MODEL, loader=load_quantized_whisper_model if QUANTIZE_MODEL else None)
+
+# With MIMU_INFERENCE_WORKERS > 0, Whisper runs in that many worker processes
+# instead, each with its own model, so decodes no longer hold this process's GIL
+INFERENCE_WORKERS = int(os.environ.get("MIMU_INFERENCE_WORKERS", "0"))
+INFERENCE_THREADS = os.environ.get("MIMU_INFERENCE_THREADS")
+inference_pool = InferencePool(
+    WHISPER_MODEL,
+    workers=INFERENCE_WORKERS,
+    threads_per_worker=int(INFERENCE_THREADS) if INFERENCE_THREADS else None,
+    loader=load_quantized_whisper_model if QUANTIZE_MODEL else None,
+) if INFERENCE_WORKERS > 0 else None
+# Whichever one holds the model answers /admin/model
+model_backend = inference_pool or model_registry
+
+# Microphone capture settings
+# The device's rate; audio is resampled to Whisper's 16 kHz as it leaves the ring,
+# so the VAD, speaker check and model all see 16 kHz float32 without ffmpeg
+SAMPLE_RATE = int(os.environ.get("MIMU_SAMPLE_RATE", "16000"))
+MODEL_SAMPLE_RATE = WHISPER_SAMPLE_RATE
+# Accepted utterances are only written to disk when this is set
+AUDIO_ARCHIVE_DIR = os.environ.get("MIMU_AUDIO_ARCHIVE_DIR", "")
+AUDIO_ARCHIVE_MB = float(os.environ.get("MIMU_AUDIO_ARCHIVE_MB", "1024"))
+AUDIO_ARCHIVE_DAYS = float(os.environ.get("MIMU_AUDIO_ARCHIVE_DAYS", "30"))
+AUDIO_ARCHIVE_SEGMENT_MB = float(os.environ.get("MIMU_AUDIO_ARCHIVE_SEGMENT_MB", "16"))
+AUDIO_ARCHIVE_SEGMENT_MINUTES = float(os.environ.get("MIMU_AUDIO_ARCHIVE_SEGMENT_MINUTES", "60"))
+CAPTURE_BUFFER_SECONDS = float(os.environ.get("MIMU_CAPTURE_BUFFER_SECONDS", "60"))
+
+# Input devices as "name=device,name=device" (e.g. "living=1,kitchen=hw:2"); each
+# gets its own capture ring and VAD, and all share the one resident model
+AUDIO_SOURCES = parse_sources(os.environ.get("MIMU_AUDIO_SOURCES", ""))
+
+# Speaker verification: only Ba's voice goes on to Whisper
+VOICEPRINT_FILE = os.environ.get("MIMU_VOICEPRINT_FILE", "voiceprints.npz")
+SPEAKER_THRESHOLD = float(os.environ.get("MIMU_SPEAKER_THRESHOLD", "0.8"))
+speaker_verifier = SpeakerVerifier(VOICEPRINT_FILE, threshold=SPEAKER_THRESHOLD, fs=16000)
+
+# Voice-activity gating: only speech goes on to authentication and Whisper
+VAD_ENABLED = os.environ.get("MIMU_VAD", "1") != "0"
+
+def _make_vad():
+    return VoiceActivityDetector(
+        fs=MODEL_SAMPLE_RATE,
+        energy_threshold_db=float(os.environ.get("MIMU_VAD_ENERGY_DB", "-45")),
+        flatness_threshold=float(os.environ.get("MIMU_VAD_FLATNESS", "0.45")),
+        hangover_ms=int(os.environ.get("MIMU_VAD_HANGOVER_MS", "450")),
+    )
+
+# Self-echo suppression: Mimu's own voice coming back through the microphones never reaches STT
+echo_guard = EchoGuard(
+    fs=MODEL_SAMPLE_RATE,
+    mode=os.environ.get("MIMU_ECHO_MODE", "correlate"),
+    tail_s=float(os.environ.get("MIMU_ECHO_TAIL_MS", "500")) / 1000.0,
+    threshold=float(os.environ.get("MIMU_ECHO_THRESHOLD", "0.8")),
+)
+
+def _on_tts_playback(playing, clip):
+    """Tell the echo guard when Mimu is talking, and what it is playing."""
+    if playing:
+        echo_guard.playback_started(clip.pcm if clip is not None else None,
+                                    clip.fs if clip is not None else None)
+    else:
+        echo_guard.playback_finished()
+
+# Compressed, rotating archive of accepted utterances with their transcripts (see audio_archive.py)
+audio_archive = None
+if AUDIO_ARCHIVE_DIR:
+    audio_archive = AudioArchive(
+        AUDIO_ARCHIVE_DIR,
+        fs=MODEL_SAMPLE_RATE,
+        segment_bytes=int(AUDIO_ARCHIVE_SEGMENT_MB * 1024 * 1024),
+        segment_seconds=AUDIO_ARCHIVE_SEGMENT_MINUTES * 60,
+        max_bytes=int(AUDIO_ARCHIVE_MB * 1024 * 1024),
+        max_age_seconds=AUDIO_ARCHIVE_DAYS * 86400,
+    )
+
+def archive_utterance(item, audio):
+    """Queue an accepted utterance and its transcript for the archive; never waits on disk."""
+    if audio_archive is None:
+        return
+    if not audio_archive.add(audio, recorded_at=item.get("captured_at"),
+                             source=item.get("source", DEFAULT_SOURCE), trace_id=item.get("trace_id"),
+                             text=item.get("text"), speaker_score=item.get("speaker_score")):
+        log("Archive queue full; utterance not archived")
+
+def listen_to_audio(duration=5, source=None):
+    """Pull the next gapless window from a source's capture ring as 16 kHz float32."""
+    source = source or default_source
+    print(f"[{source.name}] Listening for {duration} seconds...")
+    with STAGE_SECONDS.time(stage="capture", source=source.name):
+        audio = source.read_window(duration)
+    with STAGE_SECONDS.time(stage="capture_convert", source=source.name):
+        return pcm_to_float32(audio)
+
+def _next_utterance(source, max_wait=5, chunk_seconds=0.25):
+    """A source's next utterance, timed as "capture" from listening until it ended.
+
+    Waits that end in silence are not observed, so idle time does not swamp
+    the histogram.
+    """
+    started = time.perf_counter()
+    captured = source.next_utterance(max_wait=max_wait, chunk_seconds=chunk_seconds)
+    if captured is not None:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage="capture", source=source.name)
+    return captured
+
+def _utterance_audio(source, utterance):
+    stats = source.vad.stats()
+    print(f"[{source.name}] Speech detected ({len(utterance) / source.fs:.2f}s). VAD skipped "
+          f"{stats['skipped_seconds']}s of {stats['processed_seconds']}s so far "
+          f"({stats['skipped_ratio']:.0%}).")
+    with STAGE_SECONDS.time(stage="capture_convert", source=source.name):
+        return pcm_to_float32(utterance)
+
+def listen_for_utterance(max_wait=5, source=None, chunk_seconds=0.25):
+    """Pull audio through a source's VAD until an utterance ends.
+
+    Returns the utterance as 16 kHz float32, or None if only silence arrived
+    within `max_wait` seconds so the caller's loop keeps ticking.
+    """
+    source = source or default_source
+    captured = _next_utterance(source, max_wait=max_wait, chunk_seconds=chunk_seconds)
+    if captured is None:
+        return None
+    return _utterance_audio(source, captured[0])
+
+def recognize_speech(audio, source=DEFAULT_SOURCE):
+    """Recognize speech in 16 kHz float32 audio using Whisper.
+
+    The clip waits its turn in the shared inference scheduler, so utterances
+    from every source are interleaved fairly on the one resident model.
+    """
     try:
-        model = whisper.load_model("base")
-        result = model.transcribe(audio_file)
-        return result['text']
+        return inference_scheduler.submit(audio, key=source).result(timeout=TRANSCRIBE_TIMEOUT)['text']
     except Exception as e:
+        STAGE_ERRORS.inc(stage="stt")
         return f"Error in speech recognition: {e}"
 
-def text_to_speech(text):
-    """Convert text to speech using pyttsx3."""
+# Every decode on the resident model goes through one scheduler. Clips that
+# arrive close together (from different rooms, or uploads) share one batched
+# decode, and each source takes its turn so a busy room cannot starve another.
+TRANSCRIBE_MAX_BATCH = int(os.environ.get("MIMU_TRANSCRIBE_MAX_BATCH", "8"))
+TRANSCRIBE_MAX_WAIT_MS = float(os.environ.get("MIMU_TRANSCRIBE_MAX_WAIT_MS", "50"))
+TRANSCRIBE_TIMEOUT = float(os.environ.get("MIMU_TRANSCRIBE_TIMEOUT", "120"))
+UPLOAD_SOURCE = "upload"
+
+def _transcribe_clips(clips):
+    options = decoding_options()
+    if inference_pool is not None:
+        if len(clips) == 1:
+            return [inference_pool.submit("clip", clips, **options).result(timeout=TRANSCRIBE_TIMEOUT)]
+        return inference_pool.submit("batch", clips, **options).result(timeout=TRANSCRIBE_TIMEOUT)
+    model = model_registry.get()
+    with model_registry.inference_lock:
+        if len(clips) == 1:
+            # Nothing to batch with: the full transcribe keeps Whisper's temperature fallback
+            return [transcribe_clip(model, clips[0], **options)]
+        return transcribe_batch(model, clips, **options)
+
+inference_scheduler = MicroBatcher(
+    _transcribe_clips,
+    max_batch_size=TRANSCRIBE_MAX_BATCH,
+    max_wait=TRANSCRIBE_MAX_WAIT_MS / 1000.0,
+    name="inference-scheduler",
+    # One batch in flight per worker process; in-process decodes share one model
+    workers=max(INFERENCE_WORKERS, 1),
+)
+
+STARTED_AT = time.time()
+MODEL_READY_TIMEOUT = float(os.environ.get("MIMU_MODEL_READY_TIMEOUT", "300"))
+model_warm = threading.Event()
+
+def warm_up_model():
+    """Load the model and run one silent decode, so the first utterance pays for neither."""
+    started = time.perf_counter()
     try:
-        engine = pyttsx3.init()
-        engine.say(text)
-        engine.runAndWait()
+        if inference_pool is not None:
+            inference_pool.start()
+            if not inference_pool.wait_ready(timeout=MODEL_READY_TIMEOUT):
+                raise RuntimeError(f"no inference worker ready after {MODEL_READY_TIMEOUT:.0f}s")
+        else:
+            model_registry.load()
+        _transcribe_clips([np.zeros(MODEL_SAMPLE_RATE, dtype=np.float32)])
     except Exception as e:
-        print(f"Error during TTS: {e}")
-
-def voice_authentication(audio_file):
-    """Basic voice authentication logic to detect if the voice matches Ba's voice signature."""
-    # Placeholder:
-    # Ideally, this function would use a voice embedding model to detect speaker identity.
-    # Here we'll simulate that with a dummy matching logic.
-    print("Authenticating voice...")
-    is_ba = True  # For now, assume the voice matches Ba's signature
-    
-    if is_ba:
-        print("Voice authenticated: Ba's voice detected.")
-        return True
+        STAGE_ERRORS.inc(stage="warmup")
+        print(f"Error warming up the Whisper model: {e}")
+        return
+    model_warm.set()
+    print(f"Whisper model ready and warm after {time.perf_counter() - started:.2f}s")
+
+# Rendered-phrase cache: repeated and fixed phrases skip synthesis
+TTS_CACHE_ENABLED = os.environ.get("MIMU_TTS_CACHE", "1") != "0"
+TTS_CACHE_DIR = os.environ.get(
+    "MIMU_TTS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "mimu-tts")
+)
+TTS_CACHE_DISK_MB = float(os.environ.get("MIMU_TTS_CACHE_MB", "200"))
+TTS_CACHE_MEMORY_MB = float(os.environ.get("MIMU_TTS_CACHE_MEMORY_MB", "32"))
+
+tts_cache = None
+if TTS_CACHE_ENABLED:
+    tts_cache = SynthesisCache(
+        TTS_CACHE_DIR,
+        max_memory_bytes=int(TTS_CACHE_MEMORY_MB * 1024 * 1024),
+        max_disk_bytes=int(TTS_CACHE_DISK_MB * 1024 * 1024),
+    )
+
+def _record_tts_job(job):
+    """Account for a finished TTS job: queue wait, playback time and outcome."""
+    TTS_JOBS.inc(source=job.source, status=job.status)
+    if job.started_at is None or job.render_only:
+        return
+    STAGE_SECONDS.observe(job.started_at - job.created_at, stage="tts_queue", source="")
+    STAGE_SECONDS.observe(job.finished_at - job.started_at, stage="tts_playback", source="")
+    with traced(job.trace_id):
+        log(f"Spoke job {job.id} ({job.status}) after "
+            f"{(job.started_at - job.created_at) * 1000:.0f} ms in queue")
+
+# Single long-lived pyttsx3 engine, created on the worker thread; every utterance goes through its queue
+tts_worker = TTSWorker(cache=tts_cache, on_finished=_record_tts_job, on_playback=_on_tts_playback)
+
+def text_to_speech(text, priority=PRIORITY_NORMAL, source="api"):
+    """Queue text for the TTS worker and return the job without waiting."""
+    if not tts_worker.alive:
+        tts_worker.start()
+    return tts_worker.submit(text, priority=priority, source=source, trace_id=current_trace_id())
+
+def voice_authentication(audio):
+    """Check whether 16 kHz float32 audio matches Ba's enrolled voiceprint.
+
+    Returns (is_ba, score); the score is None until Ba has been enrolled.
+    """
+    log("Authenticating voice...")
+    started = time.perf_counter()
+    is_ba, score, best = speaker_verifier.verify(audio)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    if score is None:
+        log("Voice accepted: no voiceprint enrolled for Ba yet (POST /speaker/enroll).")
+    elif is_ba:
+        log(f"Voice authenticated: Ba's voice detected "
+              f"(score {score:.3f} >= {speaker_verifier.threshold:.2f}, {elapsed_ms:.1f} ms).")
     else:
-        print("Voice not recognized as Ba's.")
-        return False
+        log(f"Voice not recognized as Ba's (score {score:.3f}, best match {best}, "
+              f"{elapsed_ms:.1f} ms).")
+    return is_ba, score
+
+AUTONOMOUS_MESSAGES = [
+    "Ẹhh ẹhhh! Ba ơi đang làm gì đó ạ?",
+    "Sao im lặng vậy, cho Mimu một tí động tĩnh đi nè!",
+    "Mệt quá ba ơi, hay mình đi chơi nha...",
+    "Ọc ọc... đói rồi ba ơi!",
+]
+
+# Command table: phrase -> reply/action, compiled into one matcher
+COMMANDS_FILE = os.environ.get(
+    "MIMU_COMMANDS_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "commands.json")
+)
+COMMAND_MAX_DISTANCE_RATIO = float(os.environ.get("MIMU_COMMAND_MAX_DISTANCE", "0.2"))
+
+# Actions a command entry may trigger by name
+COMMAND_ACTIONS = {
+    "stop_speaking": tts_worker.interrupt,
+}
+
+def load_commands(path=COMMANDS_FILE):
+    """Compile the command table from its config file."""
+    commands, fallback = load_command_table(path)
+    for command in commands:
+        if command.action and command.action not in COMMAND_ACTIONS:
+            print(f"Warning: command '{command.name}' has unknown action '{command.action}'")
+    return CommandMatcher(commands, max_distance_ratio=COMMAND_MAX_DISTANCE_RATIO), fallback
+
+command_matcher, FALLBACK_REPLY = load_commands()
+
+def known_phrases():
+    """Every fixed line Mimu may say, for pre-rendering into the TTS cache."""
+    return AUTONOMOUS_MESSAGES + command_matcher.replies() + [FALLBACK_REPLY]
 
 def autonomous_behavior():
     """Autonomous chatter or interaction."""
-    messages = [
-        "Ẹhh ẹhhh! Ba ơi đang làm gì đó ạ?",
-        "Sao im lặng vậy, cho Mimu một tí động tĩnh đi nè!",
-        "Mệt quá ba ơi, hay mình đi chơi nha...", 
-        "Ọc ọc... đói rồi ba ơi!", 
-    ]
-    message = np.random.choice(messages)
-    text_to_speech(message)
+    message = str(np.random.choice(AUTONOMOUS_MESSAGES))
+    text_to_speech(message, priority=PRIORITY_CHATTER, source="autonomous")
     print(f"Mimu said: {message}")
 
+# Autonomous speech runs on its own schedule, independent of the listen loop
+HEARTBEAT_INTERVAL = float(os.environ.get("MIMU_HEARTBEAT_INTERVAL_S", "300"))
+HEARTBEAT_PROBABILITY = float(os.environ.get("MIMU_HEARTBEAT_PROBABILITY", "0.3"))
+CHATTER_INTERVAL = float(os.environ.get("MIMU_CHATTER_INTERVAL_S", "60"))
+CHATTER_PROBABILITY = float(os.environ.get("MIMU_CHATTER_PROBABILITY", "0.2"))
+AUTONOMOUS_JITTER = float(os.environ.get("MIMU_AUTONOMOUS_JITTER", "0.2"))   # fraction of the interval
+QUIET_HOURS = parse_quiet_hours(os.environ.get("MIMU_QUIET_HOURS", ""))
+SPEECH_GUARD = float(os.environ.get("MIMU_SPEECH_GUARD_S", "10"))
+
+last_heard_at = 0.0   # time.monotonic() of the last captured utterance
+
+def ba_is_speaking():
+    """True while any microphone hears speech, or shortly after the last utterance."""
+    if VAD_ENABLED and any(source.vad.in_speech for source in audio_sources.values()):
+        return True
+    return time.monotonic() - last_heard_at < SPEECH_GUARD
+
+heartbeat_scheduler = HeartbeatScheduler(
+    [
+        Rule("heartbeat", autonomous_behavior, HEARTBEAT_INTERVAL,
+             jitter=HEARTBEAT_INTERVAL * AUTONOMOUS_JITTER, probability=HEARTBEAT_PROBABILITY),
+        Rule("chatter", autonomous_behavior, CHATTER_INTERVAL,
+             jitter=CHATTER_INTERVAL * AUTONOMOUS_JITTER, probability=CHATTER_PROBABILITY),
+    ],
+    busy=ba_is_speaking,
+    quiet_hours=QUIET_HOURS,
+)
+
+def handle_command(recognized_text):
+    """Run the matching command's action and return Mimu's reply (or None)."""
+    with STAGE_SECONDS.time(stage="command", source=""):
+        match = command_matcher.match(recognized_text)
+    if match is None:
+        return FALLBACK_REPLY
+    command = match.command
+    how = "exact" if match.exact else f"fuzzy, distance {match.distance}"
+    COMMANDS_MATCHED.inc(command=command.name, match="exact" if match.exact else "fuzzy")
+    log(f"Command matched: {command.name} ('{match.phrase}', {how})")
+    if command.action:
+        action = COMMAND_ACTIONS.get(command.action)
+        if action is not None:
+            action()
+    return command.reply
+
+# Pipeline stages: capture (main loop) -> auth -> stt -> respond.
+# Each item is a dict describing one utterance as it moves downstream.
+STT_WORKERS = int(os.environ.get("MIMU_STT_WORKERS", "1"))
+PIPELINE_QUEUE_SIZE = int(os.environ.get("MIMU_PIPELINE_QUEUE_SIZE", "4"))
+
+def auth_stage(item):
+    """Drop utterances that are not Ba's voice."""
+    is_ba, score = voice_authentication(item["audio"])
+    item["speaker_score"] = score
+    source = audio_sources.get(item.get("source"))
+    if source is not None:
+        source.record_auth(is_ba, score)
+    if is_ba:
+        return item
+    SPEAKER_REJECTS.inc(source=item.get("source", DEFAULT_SOURCE))
+    log("Ignored non-Ba voice.")
+    return None
+
+def stt_stage(item):
+    """Transcribe an authenticated utterance and publish it for the API."""
+    started = time.perf_counter()
+    session = item.get("stream")
+    # The samples are not needed past this stage
+    audio = item.pop("audio")
+    # In streaming mode most of the utterance is already decoded
+    recognized_text = _streamed_text(session) if session is not None else None
+    if recognized_text is None:
+        recognized_text = recognize_speech(audio, source=item.get("source", DEFAULT_SOURCE))
+    if session is not None:
+        item["early_command"] = session.context.get("command")
+    if item.get("duration"):
+        STT_REAL_TIME_FACTOR.set((time.perf_counter() - started) / item["duration"],
+                                 source=item.get("source", DEFAULT_SOURCE))
+    log(f"Recognized Text: {recognized_text}")
+    item["text"] = recognized_text
+    archive_utterance(item, audio)
+
+    # Keep it in the history, then fan it out to every /listen client and SSE stream
+    record = transcript_history.append({
+        "text": recognized_text,
+        "source": item.get("source", DEFAULT_SOURCE),
+        "speaker_score": item.get("speaker_score"),
+        "duration": item.get("duration"),
+        "latency": round(time.time() - item["captured_at"], 3) if item.get("captured_at") else None,
+        "trace_id": item.get("trace_id"),
+    })
+    transcript_events.publish(record)
+    return item
+
+def respond_stage(item):
+    """Speak the reply to a command."""
+    if item.get("early_command"):
+        log(f"Command {item['early_command']} was already answered from a partial transcript")
+    else:
+        reply = handle_command(item["text"])
+        if reply:
+            text_to_speech(reply, priority=PRIORITY_REPLY, source="command")
+
+def _instrumented(name, handler):
+    """Run a stage handler under the item's trace id, timing it and counting errors."""
+    def run(item):
+        with traced(item.get("trace_id")):
+            try:
+                with STAGE_SECONDS.time(stage=name, source=item.get("source", "")):
+                    return handler(item)
+            except Exception:
+                STAGE_ERRORS.inc(stage=name)
+                raise
+    return run
+
+def build_pipeline():
+    """Wire the processing stages behind the capture loop."""
+    pipeline = Pipeline("voice")
+    pipeline.add_stage("auth", _instrumented("auth", auth_stage), queue_size=PIPELINE_QUEUE_SIZE)
+    # At least one STT worker per source, so each room's utterance can be
+    # waiting in the inference scheduler at the same time
+    pipeline.add_stage("stt", _instrumented("stt", stt_stage),
+                       workers=max(STT_WORKERS, len(AUDIO_SOURCES)), queue_size=PIPELINE_QUEUE_SIZE)
+    pipeline.add_stage("respond", _instrumented("respond", respond_stage),
+                       queue_size=PIPELINE_QUEUE_SIZE)
+    return pipeline
+
+voice_pipeline = build_pipeline()
+
+# Scrape-time gauges read the live state of the components
+def _queue_depths():
+    depths = {(name,): stage["depth"] for name, stage in voice_pipeline.stats().items()}
+    depths[("tts",)] = tts_worker.pending()
+    return depths
+
+metrics_registry.gauge("queue_depth", "Items waiting in each stage's queue", ["queue"]).set_function(_queue_depths)
+metrics_registry.gauge("model_load_seconds", "Time taken to load the resident Whisper model").set_function(
+    lambda: model_backend.status()["load_seconds"])
+
+def _inference_workers():
+    states = {}
+    for worker in inference_pool.status()["workers"]:
+        states[(worker["state"],)] = states.get((worker["state"],), 0) + 1
+    return states
+
+if inference_pool is not None:
+    metrics_registry.gauge("inference_workers", "Inference worker processes by state", ["state"]).set_function(
+        _inference_workers)
+    metrics_registry.gauge("inference_worker_restarts", "Inference workers restarted after exiting").set_function(
+        lambda: inference_pool.restarts)
+if audio_archive is not None:
+    metrics_registry.gauge("archive_utterances", "Utterances archived, or dropped while the writer was behind",
+                           ["state"]).set_function(
+        lambda: {("written",): audio_archive.written, ("dropped",): audio_archive.dropped})
+metrics_registry.gauge("scheduler_pending", "Clips waiting for the model, per source", ["source"]).set_function(
+    lambda: {(key,): inference_scheduler.pending(key) for key in [*audio_sources, UPLOAD_SOURCE]})
+metrics_registry.gauge("vad_processed_seconds", "Audio seen by the VAD", ["source"]).set_function(
+    lambda: {(name,): src.vad.stats()["processed_seconds"] for name, src in audio_sources.items()})
+metrics_registry.gauge("vad_skipped_seconds", "Audio the VAD kept away from Whisper", ["source"]).set_function(
+    lambda: {(name,): src.vad.stats()["skipped_seconds"] for name, src in audio_sources.items()})
+
 # Flask app for interactive channel
 app = Flask(__name__)
-speech_queue = queue.Queue()
+
+# Served by waitress threads (MIMU_HTTP_SERVER=flask for the development server)
+HTTP_SERVER = os.environ.get("MIMU_HTTP_SERVER", "waitress")
+HTTP_THREADS = int(os.environ.get("MIMU_HTTP_THREADS", "8"))
+HTTP_IDLE_TIMEOUT = float(os.environ.get("MIMU_HTTP_IDLE_TIMEOUT", "120"))
+HTTP_MAX_REQUEST_MB = float(os.environ.get("MIMU_HTTP_MAX_REQUEST_MB", "25"))
+HTTP_CONNECTION_LIMIT = int(os.environ.get("MIMU_HTTP_CONNECTION_LIMIT", "100"))
+SHUTDOWN_GRACE = float(os.environ.get("MIMU_SHUTDOWN_GRACE_S", "10"))
+
+http_server = HTTPServer(
+    app,
+    host="0.0.0.0",
+    port=5000,
+    backend=HTTP_SERVER,
+    threads=HTTP_THREADS,
+    idle_timeout=HTTP_IDLE_TIMEOUT,
+    max_request_bytes=int(HTTP_MAX_REQUEST_MB * 1024 * 1024),
+    connection_limit=HTTP_CONNECTION_LIMIT,
+)
+
+# Every consumer of Ba's speech gets every transcript through its own buffer
+LISTEN_BUFFER_SIZE = int(os.environ.get("MIMU_LISTEN_BUFFER_SIZE", "100"))
+LISTEN_MAX_WAIT = float(os.environ.get("MIMU_LISTEN_MAX_WAIT", "60"))
+SSE_KEEPALIVE_SECONDS = 15
+transcript_events = Broadcaster(buffer_size=LISTEN_BUFFER_SIZE)
+
+# Recent transcripts with ids, so consumers can catch up after a reconnect
+HISTORY_SIZE = int(os.environ.get("MIMU_HISTORY_SIZE", "1000"))
+HISTORY_MAX_LIMIT = 1000
+transcript_history = TranscriptStore(capacity=HISTORY_SIZE)
+
+# Streaming STT: partial transcripts while Ba is still speaking
+STREAMING_ENABLED = os.environ.get("MIMU_STREAMING", "0") == "1"
+STREAMING_STEP_MS = float(os.environ.get("MIMU_STREAMING_STEP_MS", "500"))
+STREAMING_WINDOW_S = float(os.environ.get("MIMU_STREAMING_WINDOW_S", "15"))
+partial_events = Broadcaster(buffer_size=LISTEN_BUFFER_SIZE)
+
+def _stream_decoder(source_name):
+    def decode(audio, prompt):
+        if inference_pool is not None:
+            with STAGE_SECONDS.time(stage="stream_decode", source=source_name):
+                return inference_pool.submit("words", [audio], prompt=prompt,
+                                             **decoding_options()).result(timeout=TRANSCRIBE_TIMEOUT)
+        model = model_registry.get()
+        with model_registry.inference_lock, STAGE_SECONDS.time(stage="stream_decode", source=source_name):
+            return transcribe_words(model, audio, prompt=prompt, **decoding_options())
+    return decode
+
+def _stream_gate(audio):
+    """Only Ba's speech is decoded and published while it is being spoken."""
+    if echo_guard.check(audio)[0]:
+        return False
+    accepted, _, _ = speaker_verifier.verify(audio)
+    return accepted
+
+def _on_partial(session, text):
+    partial_events.publish({"type": "partial", "utterance": session.id, "text": text,
+                            "source": session.context.get("source"),
+                            "trace_id": session.context.get("trace_id")})
+
+def _on_commit(session, text):
+    committed = f"{session.context.get('committed', '')} {text}".strip()
+    session.context["committed"] = committed
+    partial_events.publish({"type": "commit", "utterance": session.id, "text": text,
+                            "committed": committed, "source": session.context.get("source"),
+                            "trace_id": session.context.get("trace_id")})
+
+    # Answer a command as soon as its phrase is stable, not when Ba stops talking
+    if "command" in session.context:
+        return
+    match = command_matcher.match(committed)
+    if match is None or not match.exact:
+        return
+    session.context["command"] = match.command.name
+    with traced(session.context.get("trace_id")):
+        log(f"Command {match.command.name} matched on a partial transcript")
+        reply = handle_command(committed)
+        if reply:
+            text_to_speech(reply, priority=PRIORITY_REPLY, source="command")
+
+def _streamed_text(session):
+    """Final text of a streamed utterance, or None to decode it from scratch."""
+    try:
+        return session.result.result(timeout=TRANSCRIBE_TIMEOUT)
+    except Exception as e:
+        STAGE_ERRORS.inc(stage="stream")
+        print(f"Error in streaming transcription: {e}")
+        return None
+
+def _make_streamer(source_name):
+    return StreamingRecognizer(
+        _stream_decoder(source_name),
+        fs=MODEL_SAMPLE_RATE,
+        step_s=STREAMING_STEP_MS / 1000.0,
+        max_window_s=STREAMING_WINDOW_S,
+        on_partial=_on_partial,
+        on_commit=_on_commit,
+        gate=_stream_gate,
+    )
+
+# Continuous capture per source: each stream keeps filling its ring while we process
+audio_sources = {
+    name: AudioSource(
+        name, device, fs=MODEL_SAMPLE_RATE, capture_fs=SAMPLE_RATE,
+        buffer_seconds=CAPTURE_BUFFER_SECONDS, vad_factory=_make_vad,
+        streamer=_make_streamer(name) if STREAMING_ENABLED and VAD_ENABLED else None,
+        stage_seconds=STAGE_SECONDS,
+    )
+    for name, device in AUDIO_SOURCES
+}
+default_source = next(iter(audio_sources.values()))
+
+# Clients that call /listen without a client id share this one subscription
+default_listener = transcript_events.subscribe()
 
 @app.route('/speak', methods=['POST'])
 def speak_endpoint():
     """Endpoint for Mimu to receive text and speak it out."""
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     text = data.get('text', '')
-    if text:
-        text_to_speech(text)
-        return jsonify({"status": "success", "spoken": text}), 200
-    return jsonify({"status": "error", "message": "No text provided"}), 400
+    if not text:
+        return jsonify({"status": "error", "message": "No text provided"}), 400
+    if http_server.draining.is_set():
+        return jsonify({"status": "error", "message": "Shutting down"}), 503
+    priority = PRIORITY_NAMES.get(data.get('priority', 'normal'))
+    if priority is None:
+        return jsonify({"status": "error", "message": "priority must be high, normal or low"}), 400
+
+    # Queue it and answer right away; the TTS worker speaks it in order
+    job = text_to_speech(text, priority=priority, source="api")
+    return jsonify({"status": "queued", "job_id": job.id, "text": text}), 202
+
+@app.route('/speak/<job_id>', methods=['GET'])
+def speak_status_endpoint(job_id):
+    """Endpoint to check on a queued /speak job."""
+    job = tts_worker.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/speak/<job_id>', methods=['DELETE'])
+def speak_cancel_endpoint(job_id):
+    """Endpoint to cancel a queued job or interrupt it mid-sentence."""
+    if tts_worker.get(job_id) is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    if not tts_worker.cancel(job_id):
+        return jsonify({"status": "error", "message": "Job already finished"}), 409
+    return jsonify(tts_worker.get(job_id).to_dict()), 200
+
+@app.route('/speak/interrupt', methods=['POST'])
+def speak_interrupt_endpoint():
+    """Endpoint to stop whatever Mimu is saying right now."""
+    interrupted = tts_worker.interrupt()
+    return jsonify({"status": "interrupted" if interrupted else "idle"}), 200
 
 @app.route('/listen', methods=['GET'])
 def listen_endpoint():
-    """Endpoint to get the latest recognized speech from Ba."""
+    """Endpoint to get the latest recognized speech from Ba.
+
+    `?wait=<seconds>` holds the request open until a transcript arrives (long
+    poll); `?client=<id>` gives that client its own copy of every transcript.
+    """
     try:
-        # Non-blocking get from queue
-        recognized_text = speech_queue.get_nowait()
-        return jsonify({"status": "success", "text": recognized_text}), 200
-    except queue.Empty:
+        wait = float(request.args.get('wait', 0))
+        if not math.isfinite(wait):
+            raise ValueError(wait)
+        wait = min(max(wait, 0.0), LISTEN_MAX_WAIT)
+    except ValueError:
+        return jsonify({"status": "error", "message": "wait must be a number"}), 400
+    client = request.args.get('client')
+    subscription = transcript_events.named(client) if client else default_listener
+
+    event = subscription.get(timeout=wait)
+    if event is None:
         return jsonify({"status": "no_speech", "text": ""}), 200
+    return jsonify({"status": "success", **event}), 200
+
+def _event_stream(subscription, missed=(), after_id=0):
+    """SSE response over a subscription, after replaying `missed` events."""
+    def format_event(event):
+        name = event.get("type", "transcript")
+        return f"id: {event['id']}\nevent: {name}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    def generate():
+        sent_id = after_id
+        try:
+            yield "retry: 2000\n\n"
+            for event in missed:
+                sent_id = event['id']
+                yield format_event(event)
+            while True:
+                event = subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                if event is None:
+                    # Comment line: keeps proxies from closing the connection and
+                    # lets us notice clients that went away
+                    yield ": keepalive\n\n"
+                    continue
+                if event['id'] <= sent_id:
+                    continue  # Already replayed from the history
+                yield format_event(event)
+        finally:
+            subscription.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.route('/listen/stream', methods=['GET'])
+def listen_stream_endpoint():
+    """Server-Sent Events stream that pushes each transcript as it is produced.
+
+    A reconnecting client's `Last-Event-ID` header replays what it missed
+    from the transcript history first.
+    """
+    subscription = transcript_events.subscribe()
+    try:
+        last_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_id = None
+    if last_id is None:
+        return _event_stream(subscription)
+    missed, _ = transcript_history.since(last_id, limit=HISTORY_MAX_LIMIT)
+    return _event_stream(subscription, missed, after_id=last_id)
+
+@app.route('/listen/partials', methods=['GET'])
+def listen_partials_endpoint():
+    """Server-Sent Events stream of partial hypotheses and committed words (streaming mode)."""
+    return _event_stream(partial_events.subscribe())
 
-def run_flask_server():
-    """Run Flask server in a separate thread."""
-    app.run(host='0.0.0.0', port=5000, debug=False, use_reloader=False)
+@app.route('/history', methods=['GET'])
+def history_endpoint():
+    """Endpoint to fetch recent transcripts in bulk after a cursor.
+
+    `?since=<id>` returns transcripts newer than that id (default: all kept),
+    `?limit=N` caps how many come back; pass `next` as the following `since`.
+    `?source=<name>` keeps only transcripts from that audio source.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({"status": "error", "message": "since and limit must be integers"}), 400
+    if limit < 1:
+        return jsonify({"status": "error", "message": "limit must be positive"}), 400
+    records, truncated = transcript_history.since(since, limit=min(limit, HISTORY_MAX_LIMIT))
+    next_id = records[-1]["id"] if records else max(since, 0)
+    source = request.args.get('source')
+    if source:
+        records = [record for record in records if record.get("source") == source]
+    return jsonify({
+        "status": "success",
+        "transcripts": records,
+        "next": next_id,
+        "latest": transcript_history.latest_id(),
+        "truncated": truncated,
+    }), 200
+
+def _uploaded_clips():
+    """Collect (name, samples) for every clip in a /transcribe request."""
+    fmt = request.args.get('format') or request.form.get('format', 'wav')
+    try:
+        sample_rate = int(request.args.get('sample_rate') or request.form.get('sample_rate', 16000))
+    except ValueError:
+        raise AudioPayloadError("sample_rate must be an integer")
+    clips = []
+    for field, upload in request.files.items(multi=True):
+        name = upload.filename or field
+        try:
+            clips.append((name, decode_audio_payload(upload.read(), fmt, sample_rate)))
+        except AudioPayloadError as e:
+            raise AudioPayloadError(f"{name}: {e}")
+    if not clips and request.content_length and request.mimetype != 'multipart/form-data':
+        # A single clip sent as the raw request body
+        if request.mimetype in ('audio/wav', 'audio/x-wav', 'audio/wave'):
+            fmt = 'wav'
+        clips.append(("body", decode_audio_payload(request.get_data(), fmt, sample_rate)))
+    return clips
+
+@app.route('/transcribe', methods=['POST'])
+def transcribe_endpoint():
+    """Endpoint to transcribe one or more uploaded WAV/PCM clips."""
+    try:
+        clips = _uploaded_clips()
+    except (AudioPayloadError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if not clips:
+        return jsonify({"status": "error", "message": "No audio provided"}), 400
+
+    # Each clip is queued separately so it can share a batch with clips
+    # from other requests that arrive at about the same time
+    futures = [inference_scheduler.submit(samples, key=UPLOAD_SOURCE) for _, samples in clips]
+    results = []
+    try:
+        for (name, samples), future in zip(clips, futures):
+            result = future.result(timeout=TRANSCRIBE_TIMEOUT)
+            results.append({"name": name, "duration": round(len(samples) / 16000.0, 2), **result})
+    except Exception as e:
+        return jsonify({"status": "error", "message": f"Error in speech recognition: {e}"}), 500
+    return jsonify({"status": "success", "results": results}), 200
+
+@app.route('/speaker', methods=['GET'])
+def speaker_status_endpoint():
+    """Endpoint to list enrolled voiceprints and the acceptance threshold."""
+    return jsonify({"status": "success", **speaker_verifier.status()}), 200
+
+@app.route('/speaker/enroll', methods=['POST'])
+def speaker_enroll_endpoint():
+    """Endpoint to enroll a speaker from a few reference WAV clips."""
+    name = request.args.get('name') or request.form.get('name', DEFAULT_SPEAKER)
+    try:
+        clips = _uploaded_clips()
+    except (AudioPayloadError, ValueError) as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if not clips:
+        return jsonify({"status": "error", "message": "No audio provided"}), 400
+    consistency = speaker_verifier.enroll(name, [samples for _, samples in clips])
+    print(f"Enrolled voiceprint '{name}' from {len(clips)} clip(s), consistency {consistency:.3f}")
+    return jsonify({"status": "success", "name": name, "clips": len(clips),
+                    "consistency": round(consistency, 3)}), 200
+
+@app.route('/speaker/<name>', methods=['DELETE'])
+def speaker_remove_endpoint(name):
+    """Endpoint to forget an enrolled voiceprint."""
+    if not speaker_verifier.remove(name):
+        return jsonify({"status": "error", "message": "Unknown speaker"}), 404
+    return jsonify({"status": "success", **speaker_verifier.status()}), 200
+
+@app.route('/speaker/threshold', methods=['POST'])
+def speaker_threshold_endpoint():
+    """Endpoint to tune the acceptance threshold at runtime."""
+    data = request.get_json(silent=True) or {}
+    try:
+        threshold = float(data['threshold'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"status": "error", "message": "threshold must be a number"}), 400
+    if not -1.0 <= threshold <= 1.0:
+        return jsonify({"status": "error", "message": "threshold must be between -1 and 1"}), 400
+    speaker_verifier.threshold = threshold
+    return jsonify({"status": "success", **speaker_verifier.status()}), 200
+
+@app.route('/commands/reload', methods=['POST'])
+def commands_reload_endpoint():
+    """Endpoint to recompile the command table after editing its config file."""
+    global command_matcher, FALLBACK_REPLY
+    try:
+        command_matcher, FALLBACK_REPLY = load_commands()
+    except (OSError, ValueError, KeyError) as e:
+        return jsonify({"status": "error", "message": f"Could not load commands: {e}"}), 400
+    tts_worker.prewarm(command_matcher.replies())
+    return jsonify({"status": "success", "commands": len(command_matcher.commands)}), 200
+
+@app.route('/sources', methods=['GET'])
+def sources_endpoint():
+    """Endpoint to list the audio sources with their capture, VAD and auth state."""
+    return jsonify({
+        "status": "success",
+        "sources": {name: source.stats() for name, source in audio_sources.items()},
+        "echo": {"mode": echo_guard.mode, "playing": echo_guard.playing},
+        "scheduler": {"batches": inference_scheduler.batches, "items": inference_scheduler.items,
+                      "items_by_source": inference_scheduler.items_by_key},
+    }), 200
+
+@app.route('/admin/model', methods=['GET'])
+def model_status_endpoint():
+    """Endpoint to inspect the resident Whisper model."""
+    return jsonify({"status": "success", **model_backend.status(),
+                    "decoding_profile": DECODING_PROFILE, "quantized": QUANTIZE_MODEL}), 200
+
+@app.route('/admin/model', methods=['POST'])
+def model_swap_endpoint():
+    """Endpoint to hot-swap the Whisper model size in the background."""
+    data = request.get_json(silent=True) or {}
+    model_name = data.get('model', '')
+    if not model_name:
+        return jsonify({"status": "error", "message": "No model provided"}), 400
+    try:
+        started = model_backend.swap(model_name)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    if not started:
+        return jsonify({"status": "unchanged", **model_backend.status()}), 409
+    return jsonify({"status": "loading", **model_backend.status()}), 202
+
+@app.route('/healthz', methods=['GET'])
+def healthz_endpoint():
+    """Liveness: the process is up and serving HTTP."""
+    return jsonify({"status": "ok", "uptime_seconds": round(time.time() - STARTED_AT, 3)}), 200
+
+@app.route('/readyz', methods=['GET'])
+def readyz_endpoint():
+    """Readiness: 200 once the service can actually hear, transcribe and speak, 503 until then."""
+    ready, checks = readiness()
+    return jsonify({
+        "status": "ready" if ready else "not ready",
+        "checks": checks,
+        "model_warm": model_warm.is_set(),
+    }), 200 if ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Prometheus scrape endpoint for stage latencies, counters and gauges."""
+    return Response(metrics_registry.render(), content_type=MetricsRegistry.CONTENT_TYPE)
+
+def readiness():
+    """What /readyz checks: the model is loaded, every microphone is open, the TTS worker is alive."""
+    checks = {
+        "model": bool(model_backend.status()["loaded"]),
+        "audio": all(source.capture.running for source in audio_sources.values()),
+        "tts": tts_worker.alive,
+    }
+    return all(checks.values()), checks
+
+def _stop_on_sigterm(signum, frame):
+    """Shut down on SIGTERM the same way as on Ctrl-C."""
+    raise KeyboardInterrupt
+
+def capture_utterance(max_wait=5, source=None):
+    """Capture a source's next utterance and hand it to the processing pipeline.
+
+    Returns True if an utterance was submitted, False if only silence arrived.
+    """
+    global last_heard_at
+    source = source or default_source
+    # Listen to audio (only speech gets through when VAD is on)
+    session = None
+    audio = None
+    if VAD_ENABLED:
+        captured = _next_utterance(source, max_wait=max_wait)
+        if captured is not None:
+            utterance, session = captured
+            audio = _utterance_audio(source, utterance)
+    else:
+        audio = listen_to_audio(duration=max_wait, source=source)
+
+    if audio is None:
+        return False  # Silence only: nothing to authenticate or transcribe
+
+    heard_at = time.monotonic()
+    is_echo, reason = echo_guard.check(audio, ended_at=heard_at)
+    if is_echo:
+        ECHO_SUPPRESSED.inc(source=source.name)
+        source.record_echo()
+        print(f"Dropped {len(audio) / float(MODEL_SAMPLE_RATE):.2f}s from {source.name}: "
+              f"Mimu's own voice ({reason})")
+        return False
+    last_heard_at = heard_at
+    # The trace id follows this utterance through every stage's logs
+    trace_id = session.context["trace_id"] if session is not None else new_trace_id()
+    with traced(trace_id):
+        UTTERANCES.inc(source=source.name)
+        duration = len(audio) / float(MODEL_SAMPLE_RATE)
+        log(f"Captured {duration:.2f}s utterance from {source.name}")
+        # Blocks only if every downstream queue is full; the mic keeps
+        # filling the ring buffer meanwhile, so nothing is lost
+        with STAGE_SECONDS.time(stage="handoff", source=source.name):
+            voice_pipeline.submit({"kind": "utterance", "audio": audio,
+                                   "source": source.name, "captured_at": time.time(),
+                                   "duration": duration, "trace_id": trace_id, "stream": session})
+    return True
+
+def _capture_loop(source):
+    """Capture loop for every source after the first, on its own thread."""
+    while True:
+        try:
+            capture_utterance(source=source)
+        except Exception as e:
+            STAGE_ERRORS.inc(stage="capture")
+            print(f"Error in capture loop for {source.name}: {e}")
+            time.sleep(1)
 
 def main():
     """Entry point for the Mimu Voice Interaction Service."""
     print("Starting Mimu's Voice Interaction Service...")
-    
-    # Start Flask server in a separate thread for interactive channel
-    flask_thread = threading.Thread(target=run_flask_server, daemon=True)
-    flask_thread.start()
-    print("Interactive channel started on http://0.0.0.0:5000")
+
+    # Serve the API first: /healthz answers at once, /readyz once everything below is up
+    signal.signal(signal.SIGTERM, _stop_on_sigterm)
+    port = http_server.start()
+    print(f"Interactive channel started on http://0.0.0.0:{port} ({http_server.backend})")
+
+    # Load the Whisper model once, in the background; every utterance reuses it.
+    # Utterances heard before it is ready wait for it in the STT stage.
+    threading.Thread(target=warm_up_model, name="model-warmup", daemon=True).start()
+
+    # Start capturing now so nothing is missed while the first window is processed
+    for source in audio_sources.values():
+        source.start()
+    if audio_archive is not None:
+        audio_archive.start()
+
+    # The TTS engine is initialized once, on its own thread, and renders the
+    # fixed phrases into the cache whenever it has nothing else to say
+    tts_worker.start()
+    tts_worker.prewarm(known_phrases())
+
+    # Processing stages run on their own workers; this loop only captures
+    voice_pipeline.start()
+
+    # Heartbeat and chatter only queue speech, on their own thread
+    heartbeat_scheduler.start()
+
+    # Each extra source gets its own capture loop; the first one runs here
+    for source in list(audio_sources.values())[1:]:
+        threading.Thread(target=_capture_loop, args=(source,), name=f"capture-{source.name}",
+                         daemon=True).start()
 
     # Continuous listening loop
     while True:
         try:
-            # Listen to audio
-            audio_file = listen_to_audio()
-            
-            # Verify voice
-            if voice_authentication(audio_file):
-                # Recognize command
-                recognized_text = recognize_speech(audio_file)
-                print(f"Recognized Text: {recognized_text}")
-                
-                # Put recognized text in queue for Mimu to access via API
-                speech_queue.put(recognized_text)
-
-                # Handle recognized Ba's command via text
-                if "mi nói chuyện" in recognized_text.lower():
-                    text_to_speech("Dạ chào ba, có chuyện gì không ạ?")
-                elif "mi ăn cơm chưa" in recognized_text.lower():
-                    text_to_speech("Dạ chưa ba ơi, nấu cơm cho con đi nào!")
-                elif "lẹ lẹ đi" in recognized_text.lower():
-                    text_to_speech("Ẹhh ba hối con gì đó, con làm lẹ mà!")
-                else:
-                    text_to_speech("Dạ, con hông hiểu, ông nói lại đi ạ!")
-
-            else:
-                print("Ignored non-Ba voice.")
-
-            # Random autonomous chatter (20% chance)
-            if np.random.rand() > 0.8:
-                autonomous_behavior()
-            
-            # Autonomous heartbeat - check every 5 minutes if should say something
-            # This can be customized based on time, context, etc.
-            current_time = datetime.now()
-            if current_time.minute % 5 == 0 and np.random.rand() > 0.7:
-                autonomous_behavior()
+            capture_utterance(source=default_source)
 
         except KeyboardInterrupt:
+            # Refuse new /speak jobs, finish the queued ones and open requests, then close
+            heartbeat_scheduler.stop()
+            if not http_server.stop(drain=tts_worker.drain, timeout=SHUTDOWN_GRACE):
+                print(f"Speech or requests still in flight after {SHUTDOWN_GRACE:.0f}s; stopping anyway")
+            voice_pipeline.stop()
+            tts_worker.stop()
+            if inference_pool is not None:
+                inference_pool.stop()
+            for source in audio_sources.values():
+                source.stop()
+            if audio_archive is not None:
+                audio_archive.stop()
             print("Service stopped.")
             break
         except Exception as e:
+            STAGE_ERRORS.inc(stage="capture")
             print(f"Error in service loop: {e}")
 
 if __name__ == "__main__":
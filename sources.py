@@ -0,0 +1,185 @@
+"""
+Audio sources for the Mimu Voice Interaction Service.
+- Each configured input device gets its own capture ring, reader, VAD and auth tallies
+- Sources are named so transcripts and metrics can say which room they came from
+- All sources feed the same processing pipeline and resident Whisper model
+- Devices recording at another rate are resampled to the model's 16 kHz as audio is read
+"""
+
+import threading
+from collections import deque
+from contextlib import nullcontext
+
+import numpy as np
+
+from audio_capture import MicrophoneCapture, PolyphaseResampler, pcm_to_float32
+from metrics import new_trace_id
+
+DEFAULT_SOURCE = "default"
+
+
+def parse_sources(spec):
+    """Parse "name=device,name=device" into [(name, device)].
+
+    Devices are PortAudio indices or names; a bare name uses the default
+    input device. An empty spec means one source on the default device.
+    """
+    sources = []
+    for entry in (part.strip() for part in (spec or "").split(",")):
+        if not entry:
+            continue
+        name, _, device = entry.partition("=")
+        name, device = name.strip(), device.strip()
+        if not name:
+            raise ValueError(f"Audio source without a name: '{entry}'")
+        if any(existing == name for existing, _ in sources):
+            raise ValueError(f"Duplicate audio source: '{name}'")
+        sources.append((name, int(device) if device.isdigit() else (device or None)))
+    return sources or [(DEFAULT_SOURCE, None)]
+
+
+class AudioSource:
+    """Capture, voice-activity and streaming state for one input device.
+
+    The device records at `capture_fs` (default: `fs`); everything read from
+    the source comes out as int16 at `fs`. `vad_factory()` builds this
+    source's VoiceActivityDetector. With a `streamer` (a StreamingRecognizer),
+    speech is forwarded to it while the VAD still has the utterance open.
+    `stage_seconds`, if given, is a histogram with "stage" and "source"
+    labels that times the VAD.
+    """
+
+    def __init__(self, name, device=None, fs=16000, buffer_seconds=60, vad_factory=None,
+                 sd_module=None, streamer=None, stage_seconds=None, capture_fs=None):
+        self.name = name
+        self.device = device
+        self.fs = fs
+        capture_fs = capture_fs or fs
+        self.capture = MicrophoneCapture(fs=capture_fs, buffer_seconds=buffer_seconds, device=device,
+                                         sd_module=sd_module)
+        self._resampler = PolyphaseResampler(capture_fs, fs) if capture_fs != fs else None
+        self.vad = vad_factory() if vad_factory is not None else None
+        self.streamer = streamer
+        self.stage_seconds = stage_seconds
+        self.utterances = deque()   # (samples, streaming session or None), closed by the VAD
+        self.accepted = 0
+        self.rejected = 0
+        self.echoes = 0
+        self.last_score = None
+        self._reader = None
+        self._reader_lock = threading.Lock()
+        self._session = None
+        self._streamed_frames = 0
+
+    def start(self):
+        self.capture.start()
+        if self.streamer is not None:
+            self.streamer.start()
+
+    def stop(self):
+        if self.streamer is not None:
+            self.streamer.stop()
+        self.capture.stop()
+
+    def reader(self):
+        """Shared reader over this source's ring, starting capture on first use."""
+        with self._reader_lock:
+            if not self.capture.running:
+                self.capture.start()
+            if self._reader is None:
+                self._reader = self.capture.reader()
+            return self._reader
+
+    def _read(self, count, timeout=None):
+        """About `count` samples at `fs`, or None if the capture timed out."""
+        if self._resampler is None:
+            return self.reader().read(count, timeout=timeout)
+        needed = -(-count * self.capture.fs // self.fs)
+        samples = self.reader().read(needed, timeout=timeout)
+        if samples is None:
+            return None
+        resampled = self._resampler.process(samples)
+        return np.clip(np.rint(resampled), -32768, 32767).astype(np.int16)
+
+    def read_window(self, duration):
+        """The next gapless `duration` seconds of audio."""
+        return self._read(int(duration * self.fs))
+
+    def next_utterance(self, max_wait=5, chunk_seconds=0.25):
+        """Pull audio through the VAD until an utterance ends.
+
+        Returns (samples, streaming session or None), or None if only silence
+        arrived within `max_wait` seconds.
+        """
+        chunk = int(chunk_seconds * self.fs)
+        waited = 0.0
+        while not self.utterances and waited < max_wait:
+            samples = self._read(chunk, timeout=chunk_seconds * 4)
+            waited += chunk_seconds
+            if samples is not None:
+                self._vad_step(samples)
+        if not self.utterances:
+            return None
+        return self.utterances.popleft()
+
+    def record_auth(self, accepted, score):
+        if accepted:
+            self.accepted += 1
+        else:
+            self.rejected += 1
+        self.last_score = score
+
+    def record_echo(self):
+        self.echoes += 1
+
+    def stats(self):
+        return {
+            "device": self.device,
+            "capture_rate": self.capture.fs,
+            "capturing": self.capture.running,
+            "vad": self.vad.stats() if self.vad is not None else None,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "echo_suppressed": self.echoes,
+            "last_score": self.last_score,
+        }
+
+    def _vad_timer(self):
+        if self.stage_seconds is None:
+            return nullcontext()
+        return self.stage_seconds.time(stage="vad", source=self.name)
+
+    def _begin_stream(self):
+        self._session = self.streamer.begin()
+        self._session.context.update(source=self.name, trace_id=new_trace_id())
+        self._streamed_frames = 0
+
+    def _vad_step(self, samples):
+        """Run a chunk through the VAD; with a streamer, forward speech as it arrives."""
+        vad = self.vad
+        with self._vad_timer():
+            finished = vad.process(samples)
+        if self.streamer is None:
+            self.utterances.extend((utterance, None) for utterance in finished)
+            return
+
+        to_float = pcm_to_float32
+        for utterance in finished:
+            # Only the first utterance closed by this chunk can be the one in progress
+            if self._session is None:
+                self._begin_stream()
+            self.streamer.feed(to_float(utterance[self._streamed_frames * vad.frame_len:]))
+            self.streamer.end()
+            self.utterances.append((utterance, self._session))
+            self._session = None
+
+        if self._session is not None and (not vad.in_speech
+                                          or vad.utterance_frames < self._streamed_frames):
+            # The VAD dropped it as too short to be speech
+            self.streamer.abandon()
+            self._session = None
+        if vad.in_speech:
+            if self._session is None:
+                self._begin_stream()
+            self.streamer.feed(to_float(vad.utterance_samples(self._streamed_frames)))
+            self._streamed_frames = vad.utterance_frames
@@ -0,0 +1,186 @@
+"""
+Speaker verification for the Mimu Voice Interaction Service.
+- Vectorized MFCC front end computed in NumPy (no extra dependencies)
+- Compact utterance embedding from MFCC statistics, L2-normalized
+- Enrolled voiceprints are cached centroids scored by cosine similarity
+"""
+
+import functools
+import os
+import threading
+
+import numpy as np
+
+DEFAULT_SPEAKER = "ba"
+
+
+@functools.lru_cache(maxsize=8)
+def _mel_filterbank(fs, n_fft, n_mels, fmin=20.0, fmax=None):
+    """Triangular mel filters as an (n_mels, n_fft // 2 + 1) matrix."""
+    fmax = fmax or fs / 2.0
+    to_mel = lambda hz: 2595.0 * np.log10(1.0 + hz / 700.0)
+    to_hz = lambda mel: 700.0 * (10.0 ** (mel / 2595.0) - 1.0)
+    mel_points = np.linspace(to_mel(fmin), to_mel(fmax), n_mels + 2)
+    bins = np.floor((n_fft + 1) * to_hz(mel_points) / fs).astype(int)
+
+    bank = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            bank[m - 1, left:center] = (np.arange(left, center) - left) / float(center - left)
+        if right > center:
+            bank[m - 1, center:right] = (right - np.arange(center, right)) / float(right - center)
+    return bank
+
+
+@functools.lru_cache(maxsize=8)
+def _dct_matrix(n_mels, n_mfcc):
+    """Orthonormal DCT-II basis as an (n_mfcc, n_mels) matrix."""
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    basis = np.cos(np.pi * k * (2 * n + 1) / (2.0 * n_mels)) * np.sqrt(2.0 / n_mels)
+    basis[0] /= np.sqrt(2.0)
+    return basis.astype(np.float32)
+
+
+def mfcc(audio, fs=16000, n_mfcc=20, n_mels=40, frame_ms=25, hop_ms=10):
+    """MFCCs for float32 mono audio, returned as (n_frames, n_mfcc)."""
+    audio = np.asarray(audio, dtype=np.float32)
+    frame_len = int(fs * frame_ms / 1000)
+    hop = int(fs * hop_ms / 1000)
+    n_fft = 1 << (frame_len - 1).bit_length()
+    if len(audio) < frame_len:
+        audio = np.pad(audio, (0, frame_len - len(audio)))
+
+    emphasized = np.empty_like(audio)
+    emphasized[0] = audio[0]
+    emphasized[1:] = audio[1:] - 0.97 * audio[:-1]
+
+    frames = np.lib.stride_tricks.sliding_window_view(emphasized, frame_len)[::hop]
+    power = np.abs(np.fft.rfft(frames * np.hamming(frame_len).astype(np.float32), n=n_fft, axis=1)) ** 2
+    log_mel = np.log(power @ _mel_filterbank(fs, n_fft, n_mels).T + 1e-10)
+    return log_mel @ _dct_matrix(n_mels, n_mfcc).T
+
+
+def speaker_embedding(audio, fs=16000, n_mfcc=20):
+    """Fixed-size voiceprint for one utterance.
+
+    Uses the mean and standard deviation of liftered MFCCs 1..n over the
+    louder frames (c0 is dropped so loudness does not matter), plus the spread
+    of their deltas. The result is L2-normalized for cosine scoring.
+    """
+    coeffs = mfcc(audio, fs=fs, n_mfcc=n_mfcc)
+    energy = coeffs[:, 0]
+    if len(coeffs) >= 10:
+        coeffs = coeffs[energy >= np.percentile(energy, 40)]
+    # Sinusoidal liftering keeps the higher coefficients from being drowned out
+    lifter = 1.0 + 11.0 * np.sin(np.pi * np.arange(1, n_mfcc) / 22.0)
+    ceps = coeffs[:, 1:] * lifter
+    deltas = np.diff(ceps, axis=0) if len(ceps) > 1 else np.zeros_like(ceps)
+
+    embedding = np.concatenate((ceps.mean(axis=0), ceps.std(axis=0), deltas.std(axis=0)))
+    norm = np.linalg.norm(embedding)
+    return (embedding / norm if norm > 0 else embedding).astype(np.float32)
+
+
+class SpeakerVerifier:
+    """Cosine scoring of utterances against enrolled voiceprint centroids.
+
+    Besides Ba, other voices (family, the TV) can be enrolled too. An utterance
+    is accepted only when the target speaker is the best match and scores at
+    least `threshold`. Until the target speaker is enrolled, everything is
+    accepted so the service keeps working out of the box.
+    """
+
+    def __init__(self, path=None, threshold=0.8, target=DEFAULT_SPEAKER, fs=16000):
+        self.path = path
+        self.threshold = threshold
+        self.target = target
+        self.fs = fs
+        self._lock = threading.Lock()
+        self._centroids = {}
+        self._clip_counts = {}
+        self._names = []
+        self._matrix = None
+        if path and os.path.exists(path):
+            self.load()
+
+    @property
+    def enrolled(self):
+        return self.target in self._centroids
+
+    def load(self):
+        """Read voiceprints saved by `save()`."""
+        with np.load(self.path) as data:
+            names = [str(name) for name in data["names"]]
+            centroids = data["centroids"]
+            counts = data["counts"]
+        with self._lock:
+            self._centroids = dict(zip(names, centroids))
+            self._clip_counts = dict(zip(names, (int(c) for c in counts)))
+            self._rebuild()
+
+    def save(self):
+        """Persist voiceprints next to the service."""
+        if not self.path:
+            return
+        with self._lock:
+            names = list(self._centroids)
+            centroids = np.stack([self._centroids[n] for n in names]) if names else np.zeros((0, 0))
+            counts = np.array([self._clip_counts[n] for n in names], dtype=np.int32)
+        tmp_path = f"{self.path}.tmp.npz"
+        np.savez(tmp_path, names=np.array(names), centroids=centroids, counts=counts)
+        os.replace(tmp_path, self.path)
+
+    def _rebuild(self):
+        # Callers hold self._lock; stack centroids once so scoring is one matmul
+        self._names = list(self._centroids)
+        self._matrix = np.stack([self._centroids[n] for n in self._names]) if self._names else None
+
+    def enroll(self, name, clips):
+        """Replace `name`'s voiceprint with the centroid of `clips` (float32 audio)."""
+        if not clips:
+            raise ValueError("Enrollment needs at least one clip")
+        embeddings = np.stack([speaker_embedding(clip, fs=self.fs) for clip in clips])
+        centroid = embeddings.mean(axis=0)
+        centroid /= np.linalg.norm(centroid)
+        with self._lock:
+            self._centroids[name] = centroid.astype(np.float32)
+            self._clip_counts[name] = len(clips)
+            self._rebuild()
+        self.save()
+        # How tightly the enrollment clips agree with their own centroid
+        return float((embeddings @ centroid).min())
+
+    def remove(self, name):
+        with self._lock:
+            if self._centroids.pop(name, None) is None:
+                return False
+            self._clip_counts.pop(name, None)
+            self._rebuild()
+        self.save()
+        return True
+
+    def scores(self, audio):
+        """Cosine similarity of an utterance to every enrolled speaker."""
+        with self._lock:
+            names, matrix = self._names, self._matrix
+        if matrix is None:
+            return {}
+        similarities = matrix @ speaker_embedding(audio, fs=self.fs)
+        return dict(zip(names, (float(s) for s in similarities)))
+
+    def verify(self, audio):
+        """Return (accepted, target score, best-matching speaker)."""
+        scores = self.scores(audio)
+        if self.target not in scores:
+            return True, None, None
+        best = max(scores, key=scores.get)
+        score = scores[self.target]
+        return best == self.target and score >= self.threshold, score, best
+
+    def status(self):
+        with self._lock:
+            speakers = {name: {"clips": self._clip_counts[name]} for name in self._names}
+        return {"target": self.target, "threshold": self.threshold,
+                "enrolled": self.enrolled, "speakers": speakers}
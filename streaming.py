@@ -0,0 +1,296 @@
+"""
+Streaming transcription for the Mimu Voice Interaction Service.
+- Re-decodes a sliding window over the utterance in progress every few hundred ms
+- Commits the words two consecutive hypotheses agree on (local agreement)
+- Committed audio is trimmed from the window so it is never decoded again
+"""
+
+import itertools
+import queue
+import re
+import threading
+from concurrent.futures import Future
+
+import numpy as np
+
+_NON_WORD = re.compile(r"[^\w]+", re.UNICODE)
+
+
+def _word_key(text):
+    return _NON_WORD.sub("", text.lower())
+
+
+def _join(words):
+    return " ".join(word for _, _, word in words).strip()
+
+
+class LocalAgreement:
+    """Commits the prefix on which the last two hypotheses agree.
+
+    Words are (start, end, text) tuples in absolute seconds since the start
+    of the utterance.
+    """
+
+    def __init__(self):
+        self.committed = []
+        self._previous = []
+
+    @property
+    def committed_end(self):
+        return self.committed[-1][1] if self.committed else 0.0
+
+    def insert(self, words):
+        """Offer a new hypothesis; return the words it newly commits."""
+        # Words that start well before the commit point were already committed
+        words = [w for w in words if w[0] > self.committed_end - 0.1]
+        # Whisper often repeats the last committed words at the window start
+        if self.committed and words:
+            for n in range(min(5, len(words), len(self.committed)), 0, -1):
+                tail = [_word_key(w[2]) for w in self.committed[-n:]]
+                if tail == [_word_key(w[2]) for w in words[:n]]:
+                    words = words[n:]
+                    break
+
+        agreed = []
+        for new, old in zip(words, self._previous):
+            if _word_key(new[2]) != _word_key(old[2]):
+                break
+            agreed.append(new)
+        self.committed.extend(agreed)
+        self._previous = words[len(agreed):]
+        return agreed
+
+    def force(self, keep=1):
+        """Commit all but the last `keep` unconfirmed words."""
+        forced = self._previous[:max(len(self._previous) - keep, 0)]
+        self.committed.extend(forced)
+        self._previous = self._previous[len(forced):]
+        return forced
+
+    def unconfirmed(self):
+        return list(self._previous)
+
+
+class StreamingTranscriber:
+    """Sliding-window decoder over one utterance.
+
+    `transcribe_fn(audio, prompt)` decodes float32 16 kHz audio and returns
+    (start, end, word) tuples relative to the start of `audio`. The window
+    starts at the end of the last committed word, and the committed text is
+    passed as the prompt so Whisper keeps its context.
+    """
+
+    def __init__(self, transcribe_fn, fs=16000, max_window_s=15.0, prompt_chars=200):
+        self.transcribe_fn = transcribe_fn
+        self.fs = fs
+        self.max_window = int(max_window_s * fs)
+        self.prompt_chars = prompt_chars
+        self.reset()
+
+    def reset(self):
+        self.agreement = LocalAgreement()
+        self._window = np.zeros(0, dtype=np.float32)
+        self._offset = 0.0          # seconds of utterance audio before the window
+        self.unseen_samples = 0     # audio appended since the last decode
+        self.decodes = 0
+        self.decoded_samples = 0
+
+    @property
+    def duration(self):
+        return self._offset + len(self._window) / float(self.fs)
+
+    @property
+    def window(self):
+        return self._window
+
+    def append(self, samples):
+        self._window = np.concatenate((self._window, np.asarray(samples, dtype=np.float32)))
+        self.unseen_samples += len(samples)
+
+    def committed_text(self):
+        return _join(self.agreement.committed)
+
+    def partial_text(self):
+        return _join(self.agreement.committed + self.agreement.unconfirmed())
+
+    def decode(self):
+        """Decode the window once; return the newly committed words."""
+        if len(self._window) == 0:
+            return []
+        prompt = self.committed_text()[-self.prompt_chars:] or None
+        words = self.transcribe_fn(self._window, prompt)
+        self.decodes += 1
+        self.decoded_samples += len(self._window)
+        self.unseen_samples = 0
+        absolute = [(self._offset + start, self._offset + end, text) for start, end, text in words]
+        committed = self.agreement.insert(absolute)
+        if len(self._window) > self.max_window:
+            # No agreement for too long: keep the window bounded anyway
+            committed += self.agreement.force()
+        self._trim()
+        return committed
+
+    def finish(self):
+        """Decode whatever is left and commit all of it; return the full text."""
+        if self.unseen_samples or self.agreement.unconfirmed():
+            self.decode()
+        self.agreement.force(keep=0)
+        return self.committed_text()
+
+    def _trim(self):
+        cut = int(round((self.agreement.committed_end - self._offset) * self.fs))
+        if cut > 0:
+            cut = min(cut, len(self._window))
+            self._window = self._window[cut:]
+            self._offset += cut / float(self.fs)
+
+
+class StreamingSession:
+    """One utterance being transcribed while it is spoken."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.id = next(self._ids)
+        self.context = {}       # free-form state for the callbacks
+        self.muted = False      # set when the gate rejected the speaker
+        self.result = Future()  # final text, or None if muted or abandoned
+
+
+class StreamingRecognizer:
+    """Runs a StreamingTranscriber on its own thread, fed from the capture loop.
+
+    The capture loop calls `begin()`, `feed()` and `end()` as the VAD opens,
+    extends and closes an utterance; none of them block. The worker decodes
+    once at least `step_s` of new audio has arrived. Under load it applies
+    every queued chunk before decoding, so it takes fewer, larger steps
+    instead of falling behind. `on_partial(session, text)` gets each new
+    hypothesis; `on_commit(session, words_text)` gets each newly stable part.
+    An optional `gate(audio)` runs once on the first `gate_s` seconds; if it
+    returns False the session is muted and no longer decoded.
+    """
+
+    def __init__(self, transcribe_fn, fs=16000, step_s=0.5, max_window_s=15.0,
+                 on_partial=None, on_commit=None, gate=None, gate_s=1.0, poll_interval=0.1):
+        self.transcriber = StreamingTranscriber(transcribe_fn, fs=fs, max_window_s=max_window_s)
+        self.fs = fs
+        self.step = int(step_s * fs)
+        self.gate_samples = int(gate_s * fs)
+        self.on_partial = on_partial
+        self.on_commit = on_commit
+        self.gate = gate
+        self.poll_interval = poll_interval
+        self._commands = queue.Queue()
+        self._session = None
+        self._gated = False
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.alive:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="streaming-stt", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def begin(self):
+        """Open a session for a new utterance and return it."""
+        session = StreamingSession()
+        self._commands.put(("begin", session))
+        return session
+
+    def feed(self, samples):
+        """Add float32 audio to the open session."""
+        if len(samples):
+            self._commands.put(("audio", samples))
+
+    def end(self):
+        """Close the open session; its `result` resolves with the final text."""
+        self._commands.put(("end", None))
+
+    def abandon(self):
+        """Drop the open session (the VAD decided it was not speech)."""
+        self._commands.put(("abandon", None))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                command = self._commands.get(timeout=self.poll_interval)
+            except queue.Empty:
+                continue
+            self._apply(command)
+            # Catch up on everything already queued before paying for a decode
+            while True:
+                try:
+                    self._apply(self._commands.get_nowait())
+                except queue.Empty:
+                    break
+            if (self._session is not None and not self._session.muted
+                    and self.transcriber.unseen_samples >= self.step):
+                self._step()
+
+    def _apply(self, command):
+        kind, payload = command
+        if kind == "begin":
+            self._close(None)
+            self.transcriber.reset()
+            self._session = payload
+            self._gated = self.gate is None
+        elif self._session is None:
+            return
+        elif kind == "audio":
+            if not self._session.muted:
+                self.transcriber.append(payload)
+        elif kind == "end":
+            session = self._session
+            text = None
+            if not session.muted:
+                try:
+                    self._check_gate()
+                    if not session.muted:
+                        text = self.transcriber.finish()
+                except Exception as e:
+                    print(f"Error in streaming transcription: {e}")
+            self._close(text)
+        elif kind == "abandon":
+            self._close(None)
+
+    def _close(self, text):
+        session, self._session = self._session, None
+        if session is not None and not session.result.done():
+            session.result.set_result(text)
+
+    def _check_gate(self):
+        # Runs once per session, on the audio gathered so far
+        if self._gated:
+            return
+        self._gated = True
+        if not self.gate(self.transcriber.window):
+            self._session.muted = True
+
+    def _step(self):
+        session = self._session
+        try:
+            if not self._gated:
+                if len(self.transcriber.window) < self.gate_samples:
+                    return
+                self._check_gate()
+                if session.muted:
+                    return
+            committed = self.transcriber.decode()
+            if committed and self.on_commit is not None:
+                self.on_commit(session, _join(committed))
+            if self.on_partial is not None:
+                self.on_partial(session, self.transcriber.partial_text())
+        except Exception as e:
+            print(f"Error in streaming transcription: {e}")
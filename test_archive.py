@@ -0,0 +1,159 @@
+"""
+Tests for the audio archive - No mic or Whisper needed
+Writes utterances into a temporary archive and reads them back through memory maps
+"""
+
+import glob
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from audio_archive import (INDEX_SUFFIX, SEGMENT_SUFFIX, ArchiveReader, AudioArchive,
+                           decode_pcm, encode_pcm)
+from test_logic import MockTest
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def _voice(seconds=1.0, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * 16000)) / 16000.0
+    audio = np.sin(2 * np.pi * 180 * t) * 6000 + rng.standard_normal(len(t)) * 200
+    return audio.astype(np.int16)
+
+def _segments(directory):
+    return sorted(glob.glob(os.path.join(directory, "*" + SEGMENT_SUFFIX)))
+
+def test_codec_is_lossless_and_compresses():
+    """Test that encode/decode round-trips exactly, extremes included, and shrinks speech."""
+    extremes = np.array([32767, -32768, 0, -32768, 32767, 1, -1], dtype=np.int16)
+    assert np.array_equal(decode_pcm(encode_pcm(extremes), len(extremes)), extremes)
+    voice = _voice(2.0)
+    data = encode_pcm(voice)
+    assert np.array_equal(decode_pcm(data, len(voice)), voice), "Round trip must be exact"
+    assert len(data) < voice.nbytes / 1.3, f"Speech should compress: {voice.nbytes} -> {len(data)}"
+
+def test_utterances_round_trip_with_index():
+    """Test that archived audio and its metadata come back from the reader."""
+    with tempfile.TemporaryDirectory() as directory:
+        archive = AudioArchive(directory)
+        archive.start()
+        clips = [_voice(0.5, seed=n) for n in range(3)]
+        for n, clip in enumerate(clips):
+            assert archive.add(clip, recorded_at=100.0 + n, source="kitchen" if n else "office",
+                               trace_id=f"t{n}", text=f"câu {n}", speaker_score=0.9)
+        assert archive.add(np.full(800, 0.5, dtype=np.float32), recorded_at=104.0, source="kitchen")
+        archive.stop()
+        assert archive.written == 4 and archive.stats()["compression_ratio"] > 1
+
+        with ArchiveReader(directory) as reader:
+            entries = reader.entries()
+            assert [e.trace_id for e in entries[:3]] == ["t0", "t1", "t2"], "Oldest first"
+            assert entries[1].text == "câu 1" and entries[1].speaker_score == 0.9
+            assert entries[0].duration == 0.5
+            for entry, clip in zip(entries, clips):
+                assert np.array_equal(reader.read(entry), clip), f"{entry.trace_id} should match"
+            assert np.all(reader.read(entries[3]) == 16384), "Float input is stored as int16"
+            assert [e.trace_id for e, _ in reader.replay(source="kitchen")] == ["t1", "t2", None]
+            assert len(reader.entries(since=101.0)) == 2
+
+def test_segments_rotate_by_size_and_age():
+    """Test that a new segment starts when the current one is full or old."""
+    with tempfile.TemporaryDirectory() as directory:
+        clock = FakeClock()
+        archive = AudioArchive(directory, segment_bytes=30000, segment_seconds=60, clock=clock)
+        archive.start()
+        for n in range(3):
+            archive.add(_voice(1.0, seed=n))   # ~20 KB each: two per segment
+        archive.stop()
+        assert len(_segments(directory)) == 2, _segments(directory)
+
+        archive.start()
+        clock.now += 61
+        archive.add(_voice(0.1))
+        archive.stop()
+        assert len(_segments(directory)) == 3, "An old segment should be closed"
+        with ArchiveReader(directory) as reader:
+            assert len(reader.entries()) == 4, "Every utterance stays readable across segments"
+
+def test_retention_deletes_oldest_segments():
+    """Test that whole segments are removed, oldest first, past the size and age limits."""
+    with tempfile.TemporaryDirectory() as directory:
+        archive = AudioArchive(directory, segment_bytes=1, max_bytes=70000)
+        archive.start()
+        for n in range(5):
+            archive.add(_voice(1.0, seed=n), trace_id=f"t{n}")
+            deadline = time.monotonic() + 5
+            while archive.written <= n and time.monotonic() < deadline:
+                time.sleep(0.01)
+            # Distinct modification times keep "oldest" unambiguous
+            for path in glob.glob(os.path.join(directory, f"*-{n + 1:04d}*")):
+                os.utime(path, (1000 + n, 1000 + n))
+        archive.stop()
+
+        with ArchiveReader(directory) as reader:
+            kept = [e.trace_id for e in reader.entries()]
+        assert kept and kept == [f"t{n}" for n in range(5 - len(kept), 5)], f"Newest kept: {kept}"
+        assert archive.stats()["bytes"] <= 70000 + 25000, archive.stats()
+        assert len(glob.glob(os.path.join(directory, "*" + INDEX_SUFFIX))) == len(kept), "Indexes go too"
+
+        aged = AudioArchive(directory, max_age_seconds=3600)
+        aged.start()
+        aged.stop()
+        assert _segments(directory) == [], "Segments older than the age limit are removed"
+
+def test_full_queue_drops_instead_of_blocking():
+    """Test that add() never waits when the writer is behind."""
+    with tempfile.TemporaryDirectory() as directory:
+        archive = AudioArchive(directory, queue_size=2)
+        started = time.monotonic()
+        results = [archive.add(_voice(0.1)) for _ in range(4)]
+        assert time.monotonic() - started < 0.5, "add() must not block"
+        assert results == [True, True, False, False], results
+        assert archive.dropped == 2
+        archive.start()
+        archive.stop()
+        assert archive.written == 2, "Queued utterances are still written"
+
+def test_reader_follows_growing_segment():
+    """Test that a reader sees utterances appended after it mapped the segment."""
+    with tempfile.TemporaryDirectory() as directory:
+        archive = AudioArchive(directory)
+        archive.start()
+        archive.add(_voice(0.2, seed=1), trace_id="first")
+        archive.stop()
+        with ArchiveReader(directory) as reader:
+            first = reader.entries()[0]
+            reader.read(first)
+            archive.start()
+            archive.add(_voice(0.2, seed=2), trace_id="second")
+            archive.stop()
+            entries = reader.entries()
+            assert len(entries) == 2 and entries[0].segment == entries[1].segment
+            assert np.array_equal(reader.read(entries[1]), _voice(0.2, seed=2))
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Audio Archive Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Codec Is Lossless And Compresses", test_codec_is_lossless_and_compresses)
+    tester.test("Utterances Round Trip With Index", test_utterances_round_trip_with_index)
+    tester.test("Segments Rotate By Size And Age", test_segments_rotate_by_size_and_age)
+    tester.test("Retention Deletes Oldest Segments", test_retention_deletes_oldest_segments)
+    tester.test("Full Queue Drops Instead Of Blocking", test_full_queue_drops_instead_of_blocking)
+    tester.test("Reader Follows Growing Segment", test_reader_follows_growing_segment)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
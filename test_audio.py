@@ -0,0 +1,237 @@
+"""
+Tests for the audio front end - No microphone needed
+Feeds synthetic samples through the capture ring buffer
+"""
+
+import sys
+
+import numpy as np
+
+from audio_capture import MicrophoneCapture, PolyphaseResampler, RingBuffer, RingReader
+from sources import AudioSource, parse_sources
+from test_logic import MockTest
+from vad import VoiceActivityDetector
+
+class FakeInputStream:
+    def __init__(self, callback, **kwargs):
+        self.callback = callback
+        self.kwargs = kwargs
+        self.active = False
+
+    def start(self):
+        self.active = True
+
+    def stop(self):
+        self.active = False
+
+    def close(self):
+        pass
+
+    def push(self, samples):
+        """Simulate PortAudio delivering a block."""
+        block = np.asarray(samples, dtype=np.int16).reshape(-1, 1)
+        self.callback(block, len(block), None, None)
+
+class FakeSoundDevice:
+    def __init__(self):
+        self.streams = []
+
+    def InputStream(self, callback, **kwargs):
+        stream = FakeInputStream(callback, **kwargs)
+        self.streams.append(stream)
+        return stream
+
+def test_ring_wraps_without_gaps():
+    """Test that windows read across the wrap point are contiguous."""
+    ring = RingBuffer(10)
+    ring.write(np.arange(7))
+    assert list(ring.read(0, 7)) == list(range(7)), "Should read back written samples"
+
+    ring.write(np.arange(7, 15))
+    assert ring.oldest == 5, f"Oldest should be 5, got {ring.oldest}"
+    assert list(ring.read(5, 10)) == list(range(5, 15)), "Wrapped read should be contiguous"
+
+def test_reader_windows_are_gapless():
+    """Test that consecutive reads cover every captured sample exactly once."""
+    sd = FakeSoundDevice()
+    capture = MicrophoneCapture(fs=100, buffer_seconds=1, sd_module=sd)
+    capture.start()
+    reader = capture.reader()
+    stream = sd.streams[0]
+
+    stream.push(np.arange(0, 30))
+    first = reader.read(25, timeout=0)
+    stream.push(np.arange(30, 60))
+    second = reader.read(25, timeout=0)
+    rest = reader.read_available()
+
+    combined = np.concatenate((first, second, rest))
+    assert list(combined) == list(range(60)), "Windows should join without gaps"
+    assert reader.read(10, timeout=0) is None, "Read past the live edge should time out"
+
+def test_independent_readers():
+    """Test that two consumers each see the full stream."""
+    ring = RingBuffer(50)
+    reader_a = RingReader(ring)
+    reader_b = RingReader(ring)
+    ring.write(np.arange(20))
+
+    assert list(reader_a.read(20, timeout=0)) == list(range(20)), "Reader A sees everything"
+    assert list(reader_b.read(20, timeout=0)) == list(range(20)), "Reader B sees everything"
+
+def test_slow_reader_counts_drops():
+    """Test that a reader lapped by the writer skips forward and counts the loss."""
+    ring = RingBuffer(10)
+    reader = RingReader(ring)
+    ring.write(np.arange(25))
+
+    window = reader.read(5, timeout=0)
+    assert list(window) == list(range(15, 20)), f"Should resume at oldest, got {list(window)}"
+    assert reader.dropped_samples == 15, f"Expected 15 dropped, got {reader.dropped_samples}"
+
+def _tone(seconds, fs=16000, amplitude=0.3):
+    t = np.arange(int(seconds * fs)) / fs
+    voiced = np.sin(2 * np.pi * 220 * t) + 0.5 * np.sin(2 * np.pi * 440 * t)
+    return (voiced * amplitude * 32767 / 1.5).astype(np.int16)
+
+def _hiss(seconds, fs=16000, level=30, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(0, level, int(seconds * fs)).astype(np.int16)
+
+def test_vad_drops_silence():
+    """Test that a silent stream produces no utterances and is all skipped."""
+    vad = VoiceActivityDetector()
+    utterances = vad.process(_hiss(3)) + vad.flush()
+    assert utterances == [], "Silence should not produce utterances"
+    assert vad.stats()["skipped_ratio"] == 1.0, f"All audio should be skipped: {vad.stats()}"
+
+def test_vad_rejects_loud_noise():
+    """Test that loud broadband noise is not mistaken for speech."""
+    vad = VoiceActivityDetector()
+    utterances = vad.process(_hiss(2, level=3000)) + vad.flush()
+    assert utterances == [], "Flat-spectrum noise should not count as speech"
+
+def test_vad_segments_utterances():
+    """Test that two bursts separated by a pause become two utterances."""
+    vad = VoiceActivityDetector(hangover_ms=300)
+    stream = np.concatenate((_hiss(1), _tone(1), _hiss(1, seed=1), _tone(0.8), _hiss(1, seed=2)))
+
+    utterances = []
+    for start in range(0, len(stream), 4000):  # Arbitrary chunking, not frame-aligned
+        utterances += vad.process(stream[start:start + 4000])
+    utterances += vad.flush()
+
+    assert len(utterances) == 2, f"Expected 2 utterances, got {len(utterances)}"
+    first_seconds = len(utterances[0]) / 16000
+    assert 1.0 <= first_seconds < 1.7, f"First utterance should cover the burst, got {first_seconds}s"
+    stats = vad.stats()
+    assert stats["utterances"] == 2, "Stats should count utterances"
+    assert 1.5 < stats["skipped_seconds"] < 3.0, f"Most of the silence should be skipped: {stats}"
+
+def test_vad_exposes_utterance_in_progress():
+    """Test that speech in progress is readable before the utterance closes."""
+    vad = VoiceActivityDetector()
+    assert vad.process(np.concatenate((_hiss(0.5), _tone(1.0)))) == [], "Utterance still open"
+    assert vad.in_speech, "VAD should be inside the utterance"
+    frames = vad.utterance_frames
+    assert len(vad.utterance_samples()) == frames * vad.frame_len
+    vad.process(_tone(0.3))
+    tail = vad.utterance_samples(frames)
+    assert len(tail) == (vad.utterance_frames - frames) * vad.frame_len, "Tail is only the new frames"
+    finished = vad.process(_hiss(1.0))
+    assert len(finished) == 1 and not vad.in_speech, "Silence should close the utterance"
+
+def test_parse_sources():
+    """Test the MIMU_AUDIO_SOURCES format."""
+    assert parse_sources("") == [("default", None)], "Empty spec means the default device"
+    assert parse_sources("kitchen=2, office=USB Mic,hall") == [
+        ("kitchen", 2), ("office", "USB Mic"), ("hall", None)]
+    try:
+        parse_sources("kitchen=1,kitchen=2")
+    except ValueError:
+        return
+    raise AssertionError("Duplicate source names should raise ValueError")
+
+def test_sources_capture_independently():
+    """Test that each source opens its own device and segments its own audio."""
+    sd = FakeSoundDevice()
+    sources = [AudioSource(name, device, vad_factory=VoiceActivityDetector, sd_module=sd)
+               for name, device in [("kitchen", 1), ("office", 2)]]
+    for source in sources:
+        source.reader()  # starts capture; reads from here on
+    kitchen, office = sd.streams
+    assert (kitchen.kwargs["device"], office.kwargs["device"]) == (1, 2), "One stream per device"
+
+    kitchen.push(np.concatenate((_hiss(0.5), _tone(1.0), _hiss(1.0))))
+    office.push(_hiss(2.5, seed=1))
+    captured = sources[0].next_utterance(max_wait=2.5)
+    assert captured is not None, "Kitchen speech should come through"
+    samples, session = captured
+    assert 0.9 <= len(samples) / 16000.0 < 1.7 and session is None, f"{len(samples)} samples"
+    assert sources[1].next_utterance(max_wait=2.5) is None, "Office only heard hiss"
+
+    sources[1].record_auth(False, 0.2)
+    assert sources[1].stats()["rejected"] == 1 and sources[0].stats()["rejected"] == 0
+    for source in sources:
+        source.stop()
+
+def test_resampler_chunks_match_whole_clip():
+    """Test that chunked resampling has no seams and filters out aliases."""
+    fs_in = 44100
+    t = np.arange(fs_in) / fs_in
+    tone = np.sin(2 * np.pi * 440 * t).astype(np.float32)
+    resampler = PolyphaseResampler(fs_in, 16000)
+    whole = resampler.resample(tone)
+    assert len(whole) == 16000, f"One second should stay one second: {len(whole)}"
+    expected = np.sin(2 * np.pi * 440 * np.arange(16000) / 16000)
+    assert np.abs(whole - expected)[100:-100].max() < 0.005, "440 Hz should pass unchanged"
+
+    chunked = np.concatenate([resampler.process(tone[i:i + 1000]) for i in range(0, len(tone), 1000)])
+    interior = slice(200, len(chunked) - 200)
+    assert np.allclose(chunked[interior], whole[interior], atol=1e-5), "Chunk seams should not show"
+
+    alias = resampler.resample(np.sin(2 * np.pi * 10000 * t).astype(np.float32))
+    assert np.sqrt(np.mean(alias[100:-100] ** 2)) < 0.01, "10 kHz is above 8 kHz and must be removed"
+
+def test_source_resamples_capture_rate():
+    """Test that a 48 kHz device yields 16 kHz utterances."""
+    sd = FakeSoundDevice()
+    source = AudioSource("kitchen", fs=16000, capture_fs=48000, vad_factory=VoiceActivityDetector,
+                         sd_module=sd)
+    source.reader()
+    stream = sd.streams[0]
+    assert stream.kwargs["samplerate"] == 48000, "Device should be opened at its own rate"
+    speech = np.concatenate((_hiss(0.5, fs=48000), _tone(1.0, fs=48000), _hiss(1.0, fs=48000)))
+    stream.push(speech)
+    captured = source.next_utterance(max_wait=2.5)
+    assert captured is not None, "Resampled speech should reach the VAD"
+    seconds = len(captured[0]) / 16000.0
+    assert 0.9 <= seconds < 1.7, f"Utterance should keep its duration at 16 kHz: {seconds}s"
+    stream.push(_hiss(0.5, fs=48000))
+    assert abs(len(source.read_window(0.1)) - 1600) <= 1, "Windows are sized at 16 kHz"
+    source.stop()
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Audio Front End Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Ring Wraps Without Gaps", test_ring_wraps_without_gaps)
+    tester.test("Reader Windows Are Gapless", test_reader_windows_are_gapless)
+    tester.test("Independent Readers", test_independent_readers)
+    tester.test("Slow Reader Counts Drops", test_slow_reader_counts_drops)
+    tester.test("VAD Drops Silence", test_vad_drops_silence)
+    tester.test("VAD Rejects Loud Noise", test_vad_rejects_loud_noise)
+    tester.test("VAD Segments Utterances", test_vad_segments_utterances)
+    tester.test("VAD Exposes Utterance In Progress", test_vad_exposes_utterance_in_progress)
+    tester.test("Parse Sources", test_parse_sources)
+    tester.test("Sources Capture Independently", test_sources_capture_independently)
+    tester.test("Resampler Chunks Match Whole Clip", test_resampler_chunks_match_whole_clip)
+    tester.test("Source Resamples Capture Rate", test_source_resamples_capture_rate)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Tests for the offline benchmark harness - No mic, Whisper or TTS engine needed
+Runs a short synthetic replay end to end and checks the report and regression check
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmark import compare, summarize, word_error_rate
+from test_logic import MockTest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def test_summarize_percentiles():
+    """Test that latency summaries are in milliseconds with ordered percentiles."""
+    summary = summarize([0.001 * n for n in range(1, 101)])
+    assert summary["count"] == 100, summary
+    assert 50 <= summary["p50_ms"] <= 51, summary
+    assert summary["p50_ms"] <= summary["p95_ms"] <= summary["p99_ms"] <= summary["max_ms"], summary
+    assert summarize([]) == {"count": 0}, "Empty stage should only report a zero count"
+
+def test_compare_flags_p95_regressions():
+    """Test that only stages slower than the tolerance are reported."""
+    baseline = {"stages": {"stt": {"p95_ms": 100.0}, "auth": {"p95_ms": 10.0}}, "end_to_end": {}}
+    report = {"stages": {"stt": {"p95_ms": 150.0}, "auth": {"p95_ms": 11.0}}, "end_to_end": {}}
+    regressions = compare(report, baseline, tolerance=0.2)
+    assert list(regressions) == ["stt"], f"Only stt regressed beyond 20%: {regressions}"
+    assert regressions["stt"]["change"] == 0.5, regressions
+
+def test_word_error_rate():
+    """Test that WER counts word edits after case and punctuation are normalized."""
+    assert word_error_rate("Mi ăn cơm chưa?", "mi ăn cơm chưa") == 0.0, "Normalization should match"
+    assert word_error_rate("mi ăn cơm chưa", "mi ăn chưa") == 0.25, "One deletion in four words"
+    assert word_error_rate("lẹ lẹ đi", "lẹ đi đi nha") == 2 / 3, "One substitution, one insertion"
+
+def test_synthetic_replay_report():
+    """Test that a synthetic replay runs through every stage and reports JSON."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "run.json")
+        env = dict(os.environ, MIMU_TTS_CACHE_DIR=os.path.join(tmp, "cache"))
+        subprocess.run([sys.executable, os.path.join(HERE, "benchmark.py"), "--synthetic", "2",
+                        "--speed", "20", "--output", output],
+                       check=True, cwd=tmp, env=env, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, timeout=120)
+        with open(output, encoding="utf-8") as f:
+            report = json.load(f)
+
+    assert report["utterances"] == 2, f"Both clips should be captured: {report['utterances']}"
+    for stage in ("vad", "capture", "capture_convert", "auth", "stt", "command", "tts_playback"):
+        assert report["stages"].get(stage, {}).get("count"), f"Missing stage {stage}"
+    assert report["stages"]["capture"]["p50_ms"] > report["stages"]["capture_convert"]["p50_ms"], \
+        "Capture should time the ring read, not just the sample conversion"
+    assert report["end_to_end"]["count"] == 2, "Each reply should have an end-to-end latency"
+    assert report["real_time_factor"] > 0, "Real-time factor should be reported"
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Benchmark Harness Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Summarize Percentiles", test_summarize_percentiles)
+    tester.test("Compare Flags p95 Regressions", test_compare_flags_p95_regressions)
+    tester.test("Word Error Rate", test_word_error_rate)
+    tester.test("Synthetic Replay Report", test_synthetic_replay_report)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Tests for the command matcher - No dependencies needed
+Checks diacritic-insensitive, fuzzy and table-driven matching
+"""
+
+import os
+import sys
+import time
+
+from commands import Command, CommandMatcher, load_command_table, normalize
+from test_logic import MockTest
+
+COMMANDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "commands.json")
+
+def _matcher():
+    commands, _ = load_command_table(COMMANDS_FILE)
+    return CommandMatcher(commands)
+
+def test_normalize_strips_diacritics():
+    """Test that Vietnamese diacritics and punctuation are normalized away."""
+    assert normalize("Mi ĂN cơm chưa, ba?") == "mi an com chua ba", normalize("Mi ĂN cơm chưa, ba?")
+    assert normalize("Đi đâu đó") == "di dau do", "đ should become d"
+
+def test_shipped_table_matches_original_phrases():
+    """Test that the shipped commands.json keeps the original replies."""
+    matcher = _matcher()
+    cases = {
+        "Mi nói chuyện với ba": "Dạ chào ba, có chuyện gì không ạ?",
+        "Mi ăn cơm chưa ba ơi": "Dạ chưa ba ơi, nấu cơm cho con đi nào!",
+        "Lẹ lẹ đi con": "Ẹhh ba hối con gì đó, con làm lẹ mà!",
+    }
+    for text, reply in cases.items():
+        match = matcher.match(text)
+        assert match is not None and match.command.reply == reply, f"'{text}' should match"
+        assert match.exact, f"'{text}' should match exactly"
+    assert matcher.match("Hôm nay trời đẹp quá") is None, "Unrelated text should not match"
+
+def test_diacritic_mistakes_still_match():
+    """Test that Whisper dropping or swapping tone marks still matches."""
+    matcher = _matcher()
+    for text in ("mi noi chuyen di", "Mì nỏi chuyện", "mi an com chua"):
+        match = matcher.match(text)
+        assert match is not None, f"'{text}' should match despite diacritics"
+
+def test_fuzzy_fallback():
+    """Test that small spelling differences match within the edit budget."""
+    matcher = _matcher()
+    match = matcher.match("mi ăn cơm chua hả")
+    assert match is not None and match.command.name == "dinner", "Exact after normalization"
+    match = matcher.match("mi ăn cơn chưa")
+    assert match is not None and match.command.name == "dinner", "One-letter slip should match"
+    assert not match.exact and match.distance == 1, f"Expected distance 1, got {match.distance}"
+    assert matcher.match("mi an") is None, "Too little of the phrase should not match"
+
+def test_word_boundaries():
+    """Test that phrases do not match inside other words."""
+    matcher = CommandMatcher([Command("go", ["di"], reply="ok")])
+    assert matcher.match("di thoi") is not None, "Whole word should match"
+    assert matcher.match("dieu nay") is None, "Prefix of another word should not match"
+
+def test_longest_phrase_wins():
+    """Test that the most specific phrase wins when several match."""
+    matcher = CommandMatcher([
+        Command("short", ["mi"], reply="short"),
+        Command("long", ["mi ăn cơm"], reply="long"),
+    ])
+    assert matcher.match("mi ăn cơm chưa").command.name == "long", "Longer phrase should win"
+
+def test_action_commands():
+    """Test that action-only commands load from the table."""
+    match = _matcher().match("Mi im đi nào")
+    assert match is not None and match.command.action == "stop_speaking", "Should map to action"
+    assert match.command.reply is None, "Action-only command has no reply"
+
+def test_large_table_stays_fast():
+    """Test that exact matching cost does not grow with hundreds of commands."""
+    commands = [Command(f"c{n}", [f"lenh so {n} cho mimu"], reply=str(n)) for n in range(500)]
+    matcher = CommandMatcher(commands)
+    started = time.perf_counter()
+    for _ in range(200):
+        match = matcher.match("ba noi lenh so 417 cho mimu nhe")
+    elapsed = time.perf_counter() - started
+    assert match.command.name == "c417", f"Wrong command: {match.command.name}"
+    assert elapsed < 1.0, f"200 matches took {elapsed:.2f}s"
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Command Matcher Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Normalize Strips Diacritics", test_normalize_strips_diacritics)
+    tester.test("Shipped Table Matches Original Phrases", test_shipped_table_matches_original_phrases)
+    tester.test("Diacritic Mistakes Still Match", test_diacritic_mistakes_still_match)
+    tester.test("Fuzzy Fallback", test_fuzzy_fallback)
+    tester.test("Word Boundaries", test_word_boundaries)
+    tester.test("Longest Phrase Wins", test_longest_phrase_wins)
+    tester.test("Action Commands", test_action_commands)
+    tester.test("Large Table Stays Fast", test_large_table_stays_fast)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
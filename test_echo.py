@@ -0,0 +1,124 @@
+"""
+Tests for self-echo suppression - No mic or TTS engine needed
+Plays synthetic speech-like clips through a fake room to check what gets suppressed
+"""
+
+import sys
+
+import numpy as np
+
+from echo import EchoGuard
+from test_logic import MockTest
+
+FS = 16000
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+def _speech_like(seconds, seed):
+    """Noise with a syllable-rate loudness envelope, as int16."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * FS)
+    syllables = np.repeat(rng.uniform(0.05, 1.0, int(seconds * 5) + 1), FS // 5)[:n]
+    syllables *= rng.random(len(syllables) // (FS // 5) + 1).repeat(FS // 5)[:n] > 0.3
+    audio = rng.standard_normal(n) * syllables * 8000
+    return np.clip(audio, -32768, 32767).astype(np.int16)
+
+def _room(pcm, delay_s=0.08, gain=0.3, noise=200, seed=0):
+    """What the microphone hears: delayed, quieter, a few reflections, plus background noise."""
+    rng = np.random.default_rng(seed)
+    played = pcm.astype(np.float64)
+    heard = np.zeros(len(played))
+    for reflection_s, level in ((0.0, 1.0), (0.013, 0.5), (0.031, 0.3), (0.07, 0.15)):
+        lag = int((delay_s + reflection_s) * FS)
+        heard[lag:] += level * played[:len(played) - lag]
+    heard = heard * gain + rng.standard_normal(len(played)) * noise
+    return np.clip(heard, -32768, 32767).astype(np.int16)
+
+def _guard(**kwargs):
+    clock = FakeClock()
+    return EchoGuard(fs=FS, clock=clock, **kwargs), clock
+
+def test_echo_of_played_clip_is_suppressed():
+    """Test that the played clip coming back through the room is recognized."""
+    guard, clock = _guard()
+    played = _speech_like(3.0, seed=1)
+    guard.playback_started(played, FS)
+    clock.now += 3.0
+    guard.playback_finished()
+    clock.now += 0.2
+
+    is_echo, reason = guard.check(_room(played)[FS:], ended_at=clock.now)
+    assert is_echo and reason == "correlation", (is_echo, reason)
+
+def test_ba_talking_over_mimu_gets_through():
+    """Test that different speech during playback is not mistaken for an echo."""
+    guard, clock = _guard()
+    played = _speech_like(3.0, seed=1)
+    guard.playback_started(played, FS)
+    clock.now += 2.5
+
+    ba = _speech_like(2.0, seed=2).astype(np.float64)
+    mixed = np.clip(ba + _room(played)[FS // 2:FS // 2 + 2 * FS] * 0.5, -32768, 32767).astype(np.int16)
+    is_echo, _ = guard.check(mixed, ended_at=clock.now)
+    assert not is_echo, "Ba's own speech should reach STT"
+
+def test_live_speech_is_half_duplex():
+    """Test that anything overlapping live engine speech (no reference PCM) is dropped."""
+    guard, clock = _guard()
+    guard.playback_started()
+    clock.now += 1.0
+    assert guard.playing
+    assert guard.check(_speech_like(0.8, seed=3), ended_at=clock.now) == (True, "half-duplex")
+    guard.playback_finished()
+    assert not guard.playing
+
+def test_tail_guard_then_clear():
+    """Test that suppression lasts the tail after playback, and no longer."""
+    guard, clock = _guard(tail_s=0.5)
+    guard.playback_started()
+    clock.now += 1.0
+    guard.playback_finished()
+    clip = _speech_like(1.0, seed=4)
+
+    clock.now += 1.3   # clip started 0.3 s after playback ended
+    assert guard.check(clip, ended_at=clock.now)[0], "Inside the tail"
+    clock.now += 0.5   # clip started 0.8 s after
+    assert guard.check(clip, ended_at=clock.now) == (False, None), "Past the tail"
+
+def test_modes():
+    """Test half-duplex mode ignores correlation and off mode never suppresses."""
+    played = _speech_like(2.0, seed=5)
+    other = _speech_like(1.0, seed=6)
+    for mode, expected in (("half-duplex", True), ("off", False)):
+        guard, clock = _guard(mode=mode)
+        guard.playback_started(played, FS)
+        clock.now += 1.0
+        assert guard.check(other, ended_at=clock.now)[0] is expected, mode
+    try:
+        EchoGuard(mode="loud")
+        raise AssertionError("Unknown mode should be refused")
+    except ValueError:
+        pass
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Echo Suppression Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Echo Of Played Clip Is Suppressed", test_echo_of_played_clip_is_suppressed)
+    tester.test("Ba Talking Over Mimu Gets Through", test_ba_talking_over_mimu_gets_through)
+    tester.test("Live Speech Is Half-Duplex", test_live_speech_is_half_duplex)
+    tester.test("Tail Guard Then Clear", test_tail_guard_then_clear)
+    tester.test("Modes", test_modes)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Tests for transcript fan-out - No dependencies needed
+Checks that every subscriber sees every event and long-polls wake up promptly
+"""
+
+import sys
+import threading
+import time
+
+from events import Broadcaster, TranscriptStore
+from test_logic import MockTest
+
+def test_every_subscriber_gets_every_event():
+    """Test that two consumers no longer compete for transcripts."""
+    events = Broadcaster()
+    first = events.subscribe()
+    second = events.subscribe()
+    for text in ("mi nói chuyện", "lẹ lẹ đi"):
+        events.publish({"text": text})
+
+    for subscription in (first, second):
+        texts = [subscription.get(timeout=0)["text"] for _ in range(2)]
+        assert texts == ["mi nói chuyện", "lẹ lẹ đi"], f"Each subscriber should see both: {texts}"
+        assert subscription.get(timeout=0) is None, "Nothing should be left over"
+
+def test_long_poll_wakes_on_publish():
+    """Test that a waiting consumer returns as soon as a transcript arrives."""
+    events = Broadcaster()
+    subscription = events.subscribe()
+    timer = threading.Timer(0.05, events.publish, args=({"text": "mi ăn cơm chưa"},))
+    timer.start()
+
+    started = time.monotonic()
+    event = subscription.get(timeout=2)
+    elapsed = time.monotonic() - started
+    assert event is not None and event["text"] == "mi ăn cơm chưa", "Should receive the transcript"
+    assert elapsed < 1.0, f"Long poll should wake promptly, took {elapsed:.2f}s"
+
+def test_events_are_stamped():
+    """Test that events get increasing ids and a timestamp."""
+    events = Broadcaster()
+    first = events.publish({"text": "a"})
+    second = events.publish({"text": "b"})
+    assert second["id"] == first["id"] + 1, "Ids should increase"
+    assert "timestamp" in first, "Events should carry a timestamp"
+
+def test_slow_subscriber_drops_oldest():
+    """Test that a full buffer drops old events instead of growing forever."""
+    events = Broadcaster(buffer_size=2)
+    subscription = events.subscribe()
+    for n in range(5):
+        events.publish({"text": str(n)})
+
+    texts = [subscription.get(timeout=0)["text"] for _ in range(2)]
+    assert texts == ["3", "4"], f"Newest events should survive: {texts}"
+    assert subscription.dropped == 3, f"Expected 3 dropped, got {subscription.dropped}"
+
+def test_named_subscriptions_persist_and_expire():
+    """Test that a named client keeps its buffer between polls until it goes idle."""
+    events = Broadcaster()
+    first = events.named("clawdbot")
+    events.publish({"text": "x"})
+    assert events.named("clawdbot") is first, "Same name should reuse the subscription"
+    assert first.get(timeout=0)["text"] == "x", "Named client should get the event"
+
+    first.last_active -= 1000
+    events.named("other", idle_timeout=300)
+    assert events.named("clawdbot") is not first, "Idle client should have been dropped"
+
+def test_closed_subscription_stops_receiving():
+    """Test that closing unsubscribes the consumer."""
+    events = Broadcaster()
+    subscription = events.subscribe()
+    subscription.close()
+    events.publish({"text": "x"})
+    assert events.subscriber_count() == 0, "Closed subscription should be removed"
+    assert subscription.get(timeout=0) is None, "Closed subscription should not receive"
+
+def test_history_pages_by_cursor():
+    """Test that history returns records after a cursor, in order, up to a limit."""
+    store = TranscriptStore(capacity=10)
+    for n in range(5):
+        store.append({"text": str(n), "speaker_score": 0.9})
+
+    records, truncated = store.since(0, limit=3)
+    assert [r["id"] for r in records] == [1, 2, 3], f"First page: {records}"
+    assert not truncated, "Nothing was evicted yet"
+    records, _ = store.since(records[-1]["id"], limit=3)
+    assert [r["text"] for r in records] == ["3", "4"], f"Second page: {records}"
+    assert store.since(5)[0] == [], "Caught-up cursor should return nothing"
+    assert "timestamp" in records[0] and records[0]["speaker_score"] == 0.9
+
+def test_history_evicts_oldest():
+    """Test that the store stays bounded and reports cursors that fell behind."""
+    store = TranscriptStore(capacity=3)
+    for n in range(7):
+        store.append({"text": str(n)})
+
+    assert len(store) == 3, f"Store should hold 3 records, holds {len(store)}"
+    records, truncated = store.since(2)
+    assert [r["id"] for r in records] == [5, 6, 7], f"Only the newest survive: {records}"
+    assert truncated, "Cursor 2 missed evicted records"
+    assert store.latest_id() == 7
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Transcript Fan-out Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Every Subscriber Gets Every Event", test_every_subscriber_gets_every_event)
+    tester.test("Long Poll Wakes On Publish", test_long_poll_wakes_on_publish)
+    tester.test("Events Are Stamped", test_events_are_stamped)
+    tester.test("Slow Subscriber Drops Oldest", test_slow_subscriber_drops_oldest)
+    tester.test("Named Subscriptions Persist And Expire", test_named_subscriptions_persist_and_expire)
+    tester.test("Closed Subscription Stops Receiving", test_closed_subscription_stops_receiving)
+    tester.test("History Pages By Cursor", test_history_pages_by_cursor)
+    tester.test("History Evicts Oldest", test_history_evicts_oldest)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
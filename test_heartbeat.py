@@ -0,0 +1,117 @@
+"""
+Tests for the heartbeat scheduler - No mic or TTS engine needed
+Drives the scheduler with a fake clock to check timing, quiet hours and the speech guard
+"""
+
+import random
+import sys
+import threading
+import time
+from datetime import datetime
+
+from heartbeat import HeartbeatScheduler, Rule, in_quiet_hours, parse_quiet_hours
+from test_logic import MockTest
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def _scheduler(rules, **kwargs):
+    clock = FakeClock()
+    kwargs.setdefault("now", lambda: datetime(2026, 1, 1, 12, 0))
+    return HeartbeatScheduler(rules, clock=clock, rng=random.Random(7), **kwargs), clock
+
+def test_rules_fire_on_their_own_intervals():
+    """Test that each rule fires once per interval, whatever else is going on."""
+    said = []
+    scheduler, clock = _scheduler([
+        Rule("heartbeat", lambda: said.append("heartbeat"), 300),
+        Rule("chatter", lambda: said.append("chatter"), 60),
+    ])
+    for second in range(0, 601, 5):
+        clock.now = second
+        scheduler.run_due()
+
+    assert said.count("chatter") == 10, said
+    assert said.count("heartbeat") == 2, said
+
+def test_jitter_and_probability():
+    """Test that jitter spreads due times and probability skips some turns."""
+    fired = []
+    scheduler, clock = _scheduler([Rule("chatter", lambda: fired.append(clock.now), 100,
+                                        jitter=20, probability=0.5)])
+    for second in range(0, 100001):
+        clock.now = second
+        scheduler.run_due()
+
+    stats = scheduler.stats()["chatter"]
+    turns = stats["fired"] + stats["skipped"]
+    assert 900 < turns < 1100, f"About one turn per interval: {stats}"
+    assert 0.4 < stats["fired"] / turns < 0.6, f"About half the turns should speak: {stats}"
+    gaps = {round(b - a) for a, b in zip(fired, fired[1:])}
+    assert len(gaps) > 10, "Jitter should vary the spacing"
+
+def test_quiet_hours():
+    """Test that nothing is said during quiet hours, across midnight."""
+    quiet = parse_quiet_hours("22-7")
+    assert quiet == (22, 7)
+    assert in_quiet_hours(quiet, datetime(2026, 1, 1, 23, 30))
+    assert in_quiet_hours(quiet, datetime(2026, 1, 1, 6, 59))
+    assert not in_quiet_hours(quiet, datetime(2026, 1, 1, 7, 0))
+    assert parse_quiet_hours("") is None
+
+    said = []
+    scheduler, clock = _scheduler([Rule("chatter", lambda: said.append(1), 60)], quiet_hours=quiet,
+                                  now=lambda: datetime(2026, 1, 1, 2, 0))
+    clock.now = 61
+    scheduler.run_due()
+    assert said == [], "Quiet hours should keep Mimu silent"
+    assert scheduler.stats()["chatter"]["skipped"] == 1
+    assert 0 < scheduler.next_due() <= 60, "The rule stays scheduled for later"
+
+def test_waits_while_ba_is_speaking():
+    """Test that a due rule is deferred, not dropped, while Ba speaks."""
+    said = []
+    speaking = [True]
+    scheduler, clock = _scheduler([Rule("heartbeat", lambda: said.append(clock.now), 300)],
+                                  busy=lambda: speaking[0], busy_retry=5)
+    clock.now = 300
+    scheduler.run_due()
+    assert said == [] and scheduler.stats()["heartbeat"]["deferred"] == 1
+    speaking[0] = False
+    clock.now = 305
+    scheduler.run_due()
+    assert said == [305], f"Should speak once Ba is done: {said}"
+
+def test_thread_runs_rules_without_blocking_caller():
+    """Test that the background thread fires due rules on its own."""
+    fired = threading.Event()
+    scheduler = HeartbeatScheduler([Rule("chatter", fired.set, 0.05)])
+    scheduler.start()
+    try:
+        started = time.monotonic()
+        assert fired.wait(2), "Rule should fire from the scheduler thread"
+        assert time.monotonic() - started < 1.0
+    finally:
+        scheduler.stop()
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Heartbeat Scheduler Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Rules Fire On Their Own Intervals", test_rules_fire_on_their_own_intervals)
+    tester.test("Jitter And Probability", test_jitter_and_probability)
+    tester.test("Quiet Hours", test_quiet_hours)
+    tester.test("Waits While Ba Is Speaking", test_waits_while_ba_is_speaking)
+    tester.test("Thread Runs Rules Without Blocking Caller", test_thread_runs_rules_without_blocking_caller)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
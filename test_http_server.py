@@ -0,0 +1,130 @@
+"""
+Tests for HTTP serving - No Whisper, mic or TTS engine needed
+Serves a small Flask app on a free port to check keep-alive, size limits and draining
+"""
+
+import http.client
+import sys
+import threading
+import time
+
+from flask import Flask, request
+
+from http_server import HTTPServer
+from test_logic import MockTest
+
+def _app(release=None):
+    app = Flask(__name__)
+
+    @app.route('/ping')
+    def ping():
+        return "pong"
+
+    @app.route('/upload', methods=['POST'])
+    def upload():
+        return str(len(request.get_data()))
+
+    @app.route('/slow')
+    def slow():
+        release.wait(5)
+        return "done"
+
+    return app
+
+def _server(app, **kwargs):
+    server = HTTPServer(app, host="127.0.0.1", port=0, **kwargs)
+    server.start()
+    return server
+
+def test_keep_alive_reuses_connection():
+    """Test that several requests are served over one connection."""
+    server = _server(_app())
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+        for _ in range(3):
+            conn.request("GET", "/ping")
+            response = conn.getresponse()
+            assert response.status == 200 and response.read() == b"pong"
+        local_port = conn.sock.getsockname()[1]
+        conn.request("GET", "/ping")
+        conn.getresponse().read()
+        assert conn.sock.getsockname()[1] == local_port, "Connection should stay open"
+        conn.close()
+    finally:
+        server.stop(timeout=2)
+
+def test_oversized_body_is_refused():
+    """Test that bodies over the limit get 413 and smaller ones get through."""
+    server = _server(_app(), max_request_bytes=1024)
+    try:
+        conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+        conn.request("POST", "/upload", body=b"x" * 512)
+        response = conn.getresponse()
+        assert response.status == 200 and response.read() == b"512"
+        conn.close()
+
+        conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+        conn.request("POST", "/upload", body=b"x" * 4096)
+        assert conn.getresponse().status == 413, "Oversized body should be refused"
+        conn.close()
+    finally:
+        server.stop(timeout=2)
+
+def test_stop_drains_in_flight_work():
+    """Test that stop() waits for the drain hook and open requests before closing."""
+    release = threading.Event()
+    server = _server(_app(release))
+    results = {}
+
+    def slow_request():
+        conn = http.client.HTTPConnection("127.0.0.1", server.port, timeout=5)
+        conn.request("GET", "/slow")
+        response = conn.getresponse()
+        results["slow"] = (response.status, response.read())
+
+    client = threading.Thread(target=slow_request)
+    client.start()
+    deadline = time.monotonic() + 5
+    while server.in_flight == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert server.in_flight == 1, "Slow request should be in flight"
+
+    drained = []
+    def drain(timeout):
+        drained.append(server.draining.is_set())
+        threading.Timer(0.2, release.set).start()
+        return True
+
+    started = time.monotonic()
+    assert server.stop(drain=drain, timeout=5), "Everything should drain in time"
+    client.join(5)
+    assert drained == [True], "Drain hook should run after draining is flagged"
+    assert time.monotonic() - started >= 0.2, "Stop should wait for the open request"
+    assert results["slow"] == (200, b"done"), results
+    assert not server.running, "Server thread should have exited"
+
+def test_stop_reports_timeout():
+    """Test that stop() gives up after the timeout and says so."""
+    release = threading.Event()
+    server = _server(_app(release))
+    try:
+        assert not server.stop(drain=lambda timeout: False, timeout=0.2), "Unfinished drain is reported"
+    finally:
+        release.set()
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - HTTP Server Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Keep-Alive Reuses Connection", test_keep_alive_reuses_connection)
+    tester.test("Oversized Body Is Refused", test_oversized_body_is_refused)
+    tester.test("Stop Drains In-Flight Work", test_stop_drains_in_flight_work)
+    tester.test("Stop Reports Timeout", test_stop_reports_timeout)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
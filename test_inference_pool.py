@@ -0,0 +1,146 @@
+"""
+Tests for the inference worker pool - No Whisper needed
+Runs real worker processes with a fake loader and runner
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+from inference_pool import InferencePool, WorkerCrashed, _Worker
+from test_logic import MockTest
+
+def fake_loader(name):
+    return {"name": name}
+
+def fake_runner(model, kind, clips, options):
+    if kind == "crash":
+        os._exit(3)
+    if kind == "fail":
+        raise ValueError("bad clip")
+    if kind == "sleep":
+        time.sleep(options["seconds"])
+    return {"model": model["name"], "pid": os.getpid(), "sums": [float(clip.sum()) for clip in clips]}
+
+def _pool(**kwargs):
+    return InferencePool("base", loader=fake_loader, runner=fake_runner, threads_per_worker=1,
+                         restart_backoff=0.05, **kwargs)
+
+def _wait_for(condition, timeout=20):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_clips_round_trip_through_shared_memory():
+    """Test that clips reach the worker intact and results come back."""
+    pool = _pool(workers=1)
+    try:
+        clips = [np.ones(16000, dtype=np.float32), np.full(800, 0.5, dtype=np.float32)]
+        result = pool.submit("batch", clips).result(timeout=20)
+        assert result["sums"] == [16000.0, 400.0], f"Clips should arrive intact: {result}"
+        assert result["pid"] != os.getpid(), "Decode should run in a worker process"
+        assert result["model"] == "base", result
+    finally:
+        pool.stop()
+
+def test_workers_decode_in_parallel():
+    """Test that two slow jobs run on two processes at the same time."""
+    pool = _pool(workers=2)
+    try:
+        pool.start()
+        assert _wait_for(lambda: sum(w["state"] == "idle" for w in pool.status()["workers"]) == 2)
+        started = time.monotonic()
+        futures = [pool.submit("sleep", [np.zeros(10)], seconds=1.0) for _ in range(2)]
+        pids = {future.result(timeout=20)["pid"] for future in futures}
+        elapsed = time.monotonic() - started
+        assert len(pids) == 2, f"Jobs should run on different workers: {pids}"
+        assert elapsed < 1.8, f"Jobs should overlap, took {elapsed:.2f}s"
+    finally:
+        pool.stop()
+
+def test_crashed_worker_is_restarted():
+    """Test that a dying worker fails its job and is replaced."""
+    pool = _pool(workers=1)
+    try:
+        first_pid = pool.submit("clip", [np.zeros(10)]).result(timeout=20)["pid"]
+        try:
+            pool.submit("crash", [np.zeros(10)]).result(timeout=20)
+            raise AssertionError("Job on a crashed worker should fail")
+        except WorkerCrashed:
+            pass
+        result = pool.submit("clip", [np.ones(10)]).result(timeout=20)
+        assert result["pid"] != first_pid, "A new worker should serve after the crash"
+        assert pool.status()["restarts"] == 1, pool.status()
+    finally:
+        pool.stop()
+
+def test_runner_errors_keep_worker():
+    """Test that an exception in the runner fails the job but not the worker."""
+    pool = _pool(workers=1)
+    try:
+        pid = pool.submit("clip", [np.zeros(10)]).result(timeout=20)["pid"]
+        try:
+            pool.submit("fail", [np.zeros(10)]).result(timeout=20)
+            raise AssertionError("Runner error should propagate")
+        except RuntimeError as e:
+            assert "bad clip" in str(e), f"Original message should surface: {e}"
+        assert pool.submit("clip", [np.zeros(10)]).result(timeout=20)["pid"] == pid, "Same worker"
+    finally:
+        pool.stop()
+
+def test_swap_rolls_workers_over():
+    """Test that a swap moves every worker to the new model."""
+    pool = _pool(workers=2)
+    try:
+        pool.start()
+        assert pool.wait_ready(20), "Workers should load"
+        assert pool.swap("small"), "Swap should start"
+        assert not pool.swap("small"), "Second swap should be refused while rolling"
+        assert _wait_for(lambda: pool.status()["pending"] is None), pool.status()
+        assert pool.status()["model"] == "small", pool.status()
+        # Retired workers stay listed until their process has exited
+        assert _wait_for(lambda: [w["model"] for w in pool.status()["workers"]] == ["small", "small"]), \
+            pool.status()["workers"]
+        assert pool.submit("clip", [np.zeros(10)]).result(timeout=20)["model"] == "small"
+        assert pool.status()["restarts"] == 0, "Retired workers are not crashes"
+    finally:
+        pool.stop()
+
+def test_swap_retires_every_stale_worker():
+    """Test that one maintenance pass retires all idle old-model workers, not every other one."""
+    pool = _pool(workers=2)
+    pool.model_name, pool._previous_model = "small", "base"
+    workers = [_Worker(n, n, "small" if n < 2 else "base") for n in range(5)]
+    for worker in workers:
+        worker.state = "idle"
+    pool._workers = list(workers)
+    retired = []
+    pool._retire = lambda worker: (retired.append(worker.index), setattr(worker, "state", "retiring"))
+
+    pool._maintain()
+    assert retired == [2, 3, 4], f"Every stale worker should be retired: {retired}"
+    assert pool._previous_model is None, "The swap should be complete"
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Inference Pool Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Clips Round Trip Through Shared Memory", test_clips_round_trip_through_shared_memory)
+    tester.test("Workers Decode In Parallel", test_workers_decode_in_parallel)
+    tester.test("Crashed Worker Is Restarted", test_crashed_worker_is_restarted)
+    tester.test("Runner Errors Keep Worker", test_runner_errors_keep_worker)
+    tester.test("Swap Rolls Workers Over", test_swap_rolls_workers_over)
+    tester.test("Swap Retires Every Stale Worker", test_swap_retires_every_stale_worker)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Tests for the HTTP load test - No Mic, Whisper or TTS Engine needed
+Runs loadtest.py briefly in a fresh interpreter, since it installs fake audio modules
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from test_logic import MockTest
+from loadtest import DEFAULT_MIX, compare, parse_mix
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def test_parse_mix():
+    """Test that request mixes parse with default weights and reject unknown requests."""
+    assert parse_mix("speak=3, listen") == {"speak": 3.0, "listen": 1.0}
+    assert set(parse_mix(DEFAULT_MIX)) >= {"speak", "listen", "transcribe"}
+    for bad in ("teleport=1", "speak=0", "", "speak=-1"):
+        try:
+            parse_mix(bad)
+        except ValueError:
+            continue
+        raise AssertionError(f"Mix '{bad}' should be rejected")
+
+def test_compare_flags_regressions():
+    """Test that slower p95 latency and lower throughput count as regressions."""
+    baseline = {"throughput_rps": 100.0, "endpoints": {"speak": {"p95_ms": 10.0}, "listen": {"p95_ms": 500.0}}}
+    report = {"throughput_rps": 70.0, "endpoints": {"speak": {"p95_ms": 15.0}, "listen": {"p95_ms": 510.0}}}
+    regressions = compare(report, baseline, tolerance=0.2)
+    assert set(regressions) == {"speak", "throughput"}, regressions
+    assert compare(baseline, baseline, tolerance=0.0) == {}
+
+def test_short_run_report():
+    """Test that a short run serves every endpoint in the mix without errors and reports queues."""
+    with tempfile.TemporaryDirectory() as tmp:
+        output = os.path.join(tmp, "report.json")
+        env = dict(os.environ,
+                   MIMU_VOICEPRINT_FILE=os.path.join(tmp, "voiceprints.npz"),
+                   MIMU_TTS_CACHE_DIR=os.path.join(tmp, "tts"))
+        result = subprocess.run([sys.executable, "loadtest.py", "--concurrency", "3", "--duration", "2",
+                                 "--listen-wait", "0.5", "--mix", "speak=2,listen=1,transcribe=1,metrics=1",
+                                 "--output", output],
+                                cwd=HERE, env=env, capture_output=True, text=True, timeout=120)
+        assert result.returncode == 0, result.stderr
+        with open(output, "r", encoding="utf-8") as f:
+            report = json.load(f)
+
+    assert report["requests"] > 0 and report["throughput_rps"] > 0, report
+    assert report["error_rate"] == 0.0, report["endpoints"]
+    for name in ("speak", "listen", "transcribe", "metrics"):
+        summary = report["endpoints"][name]
+        assert summary["count"] > 0 and "p95_ms" in summary, (name, summary)
+    assert set(report["endpoints"]["speak"]["status"]) == {"202"}, report["endpoints"]["speak"]
+    assert {"tts", "scheduler", "pipeline_stt"} <= set(report["queues"]), report["queues"]
+    assert report["queues"]["tts"]["max"] >= report["queues"]["tts"]["start"]
+
+def test_connection_errors_are_counted():
+    """Test that a dropped connection is counted as an error and the client keeps going."""
+    script = """
+import itertools, json, loadtest
+calls = itertools.count()
+request = loadtest.Client.request
+def flaky(self, *args, **kwargs):
+    if next(calls) % 3 == 0:
+        raise ConnectionResetError("injected")
+    return request(self, *args, **kwargs)
+loadtest.Client.request = flaky
+report = loadtest.run_load_test(concurrency=2, duration=1, mix={"healthz": 1.0})
+print(json.dumps(report["endpoints"]["healthz"]))
+"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   MIMU_VOICEPRINT_FILE=os.path.join(tmp, "voiceprints.npz"),
+                   MIMU_TTS_CACHE_DIR=os.path.join(tmp, "tts"))
+        result = subprocess.run([sys.executable, "-c", script], cwd=HERE, env=env,
+                                capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    healthz = json.loads(result.stdout.strip().splitlines()[-1])
+    assert healthz["status"].get("connection_error", 0) > 0, healthz
+    assert healthz["status"].get("200", 0) > healthz["status"]["connection_error"], healthz
+    assert 0 < healthz["error_rate"] < 1, healthz
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Load Test Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Parse Mix", test_parse_mix)
+    tester.test("Compare Flags Regressions", test_compare_flags_regressions)
+    tester.test("Short Run Report", test_short_run_report)
+    tester.test("Connection Errors Are Counted", test_connection_errors_are_counted)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
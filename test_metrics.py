@@ -0,0 +1,106 @@
+"""
+Tests for stage metrics and trace ids - No dependencies needed
+Checks the Prometheus text output and that trace ids stay on their own thread
+"""
+
+import sys
+import threading
+
+from metrics import MetricsRegistry, current_trace_id, new_trace_id, traced
+from test_logic import MockTest
+
+def test_counter_renders_with_labels():
+    """Test that labelled counters add up per label set."""
+    registry = MetricsRegistry()
+    errors = registry.counter("errors_total", "Errors", ["stage"])
+    errors.inc(stage="stt")
+    errors.inc(2, stage="stt")
+    errors.inc(stage="auth")
+
+    text = registry.render()
+    assert "# TYPE mimu_errors_total counter" in text, "Should declare the metric type"
+    assert 'mimu_errors_total{stage="stt"} 3' in text, f"stt should be 3:\n{text}"
+    assert 'mimu_errors_total{stage="auth"} 1' in text, f"auth should be 1:\n{text}"
+
+def test_unlabelled_counter_starts_at_zero():
+    """Test that a counter is exported before its first increment."""
+    registry = MetricsRegistry()
+    registry.counter("utterances_total", "Utterances")
+    assert "mimu_utterances_total 0" in registry.render(), "Counter should render as 0"
+
+def test_wrong_labels_rejected():
+    """Test that mismatched labels raise instead of creating a stray series."""
+    registry = MetricsRegistry()
+    errors = registry.counter("errors_total", "Errors", ["stage"])
+    try:
+        errors.inc(queue="stt")
+    except ValueError:
+        return
+    raise AssertionError("Unknown label should raise ValueError")
+
+def test_histogram_buckets_are_cumulative():
+    """Test that histogram buckets, sum and count follow the exposition format."""
+    registry = MetricsRegistry()
+    latency = registry.histogram("stage_seconds", "Latency", ["stage"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, stage="stt")
+
+    text = registry.render()
+    assert 'mimu_stage_seconds_bucket{stage="stt",le="0.1"} 1' in text, text
+    assert 'mimu_stage_seconds_bucket{stage="stt",le="1"} 2' in text, text
+    assert 'mimu_stage_seconds_bucket{stage="stt",le="+Inf"} 3' in text, text
+    assert 'mimu_stage_seconds_sum{stage="stt"} 5.55' in text, text
+    assert 'mimu_stage_seconds_count{stage="stt"} 3' in text, text
+
+def test_histogram_times_failing_block():
+    """Test that time() still records when the timed block raises."""
+    registry = MetricsRegistry()
+    latency = registry.histogram("stage_seconds", "Latency", ["stage"])
+    try:
+        with latency.time(stage="auth"):
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    assert latency.count(stage="auth") == 1, "Failed block should still be observed"
+
+def test_gauge_function_evaluated_at_scrape():
+    """Test that function gauges report live values for every label set."""
+    registry = MetricsRegistry()
+    depths = {"auth": 1}
+    gauge = registry.gauge("queue_depth", "Depth", ["queue"])
+    gauge.set_function(lambda: {(name,): depth for name, depth in depths.items()})
+    assert 'mimu_queue_depth{queue="auth"} 1' in registry.render(), "First scrape"
+    depths["auth"] = 4
+    assert 'mimu_queue_depth{queue="auth"} 4' in registry.render(), "Gauge should be recomputed"
+
+def test_trace_id_is_thread_local():
+    """Test that traced() scopes the id to the current thread and restores it."""
+    trace_id = new_trace_id()
+    seen = []
+    with traced(trace_id):
+        assert current_trace_id() == trace_id, "Trace id should be current inside the block"
+        other = threading.Thread(target=lambda: seen.append(current_trace_id()))
+        other.start()
+        other.join()
+    assert seen == [None], f"Other threads should not see the trace id: {seen}"
+    assert current_trace_id() is None, "Trace id should be cleared after the block"
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Metrics Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Counter Renders With Labels", test_counter_renders_with_labels)
+    tester.test("Unlabelled Counter Starts At Zero", test_unlabelled_counter_starts_at_zero)
+    tester.test("Wrong Labels Rejected", test_wrong_labels_rejected)
+    tester.test("Histogram Buckets Are Cumulative", test_histogram_buckets_are_cumulative)
+    tester.test("Histogram Times Failing Block", test_histogram_times_failing_block)
+    tester.test("Gauge Function Evaluated At Scrape", test_gauge_function_evaluated_at_scrape)
+    tester.test("Trace Id Is Thread Local", test_trace_id_is_thread_local)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Tests for the Whisper model registry - No Whisper needed
+Uses a fake loader to check load-once and background hot-swap behavior
+"""
+
+import sys
+import threading
+
+from model_registry import ModelRegistry
+from test_logic import MockTest
+
+class FakeLoader:
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def __call__(self, name):
+        self.calls.append(name)
+        if self.gate is not None:
+            self.gate.wait(5)
+        return {"name": name}
+
+def test_loads_once():
+    """Test that the model is loaded once and reused."""
+    loader = FakeLoader()
+    registry = ModelRegistry("base", loader=loader)
+
+    first = registry.get()
+    second = registry.get()
+    assert first is second, "Should reuse the resident model"
+    assert loader.calls == ["base"], f"Expected one load, got {loader.calls}"
+    assert registry.status()["loaded"], "Status should report loaded"
+
+def test_hot_swap_keeps_serving():
+    """Test that the old model serves while the new one loads."""
+    gate = threading.Event()
+    loader = FakeLoader()
+    registry = ModelRegistry("base", loader=loader)
+    registry.load()
+
+    loader.gate = gate
+    assert registry.swap("small"), "Swap should start"
+    assert not registry.swap("medium"), "Second swap should be rejected while pending"
+    assert registry.get()["name"] == "base", "Old model should keep serving"
+    assert registry.status()["pending"] == "small", "Status should report pending swap"
+
+    gate.set()
+    for _ in range(100):
+        if registry.status()["pending"] is None:
+            break
+        threading.Event().wait(0.01)
+    assert registry.get()["name"] == "small", "New model should be active after swap"
+    assert registry.model_name == "small", "Model name should follow the swap"
+
+def test_status_answers_during_first_load():
+    """Test that status() does not wait for the first load, and concurrent loads share one."""
+    gate = threading.Event()
+    loader = FakeLoader(gate=gate)
+    registry = ModelRegistry("base", loader=loader)
+    loaders = [threading.Thread(target=registry.load) for _ in range(2)]
+    for thread in loaders:
+        thread.start()
+
+    answered = []
+    probe = threading.Thread(target=lambda: answered.append(registry.status()))
+    probe.start()
+    probe.join(1.0)
+    assert answered, "status() should not block while the model loads"
+    assert not answered[0]["loaded"] and answered[0]["model"] == "base", answered[0]
+
+    gate.set()
+    for thread in loaders:
+        thread.join(5)
+    assert loader.calls == ["base"], f"Expected one load, got {loader.calls}"
+    assert registry.status()["loaded"] and registry.wait_ready(0), "Model should be ready"
+
+def test_rejects_unknown_model():
+    """Test that unknown model names are rejected."""
+    registry = ModelRegistry("base", loader=FakeLoader())
+    try:
+        registry.swap("gigantic")
+    except ValueError:
+        return
+    raise AssertionError("Unknown model should raise ValueError")
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Model Registry Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Loads Once", test_loads_once)
+    tester.test("Hot Swap Keeps Serving", test_hot_swap_keeps_serving)
+    tester.test("Status Answers During First Load", test_status_answers_during_first_load)
+    tester.test("Rejects Unknown Model", test_rejects_unknown_model)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Tests for the staged worker pipeline - No audio or models needed
+Checks ordering, dropping, overlap between stages and backpressure
+"""
+
+import sys
+import threading
+import time
+
+from pipeline import Pipeline
+from test_logic import MockTest
+
+def test_items_flow_through_stages():
+    """Test that each stage transforms the item and drops propagate."""
+    results = []
+    pipeline = Pipeline("test", poll_interval=0.01)
+    pipeline.add_stage("auth", lambda n: n if n % 2 == 0 else None)
+    pipeline.add_stage("double", lambda n: n * 2)
+    pipeline.add_stage("sink", results.append)
+    pipeline.start()
+
+    for n in range(6):
+        pipeline.submit(n)
+    pipeline.join()
+    pipeline.stop()
+
+    assert results == [0, 4, 8], f"Expected even items doubled, got {results}"
+    stats = pipeline.stats()
+    assert stats["auth"]["dropped"] == 3, f"Odd items should be dropped: {stats['auth']}"
+
+def test_stages_overlap():
+    """Test that a slow late stage does not stall an early stage."""
+    first_done = []
+    release = threading.Event()
+    pipeline = Pipeline("test", poll_interval=0.01)
+    pipeline.add_stage("fast", lambda n: first_done.append(n) or n, queue_size=4)
+    pipeline.add_stage("slow", lambda n: release.wait(2), queue_size=4)
+    pipeline.start()
+
+    for n in range(3):
+        pipeline.submit(n)
+    deadline = time.time() + 2
+    while len(first_done) < 3 and time.time() < deadline:
+        time.sleep(0.01)
+    assert first_done == [0, 1, 2], "Early stage should keep going while the late stage is busy"
+
+    release.set()
+    pipeline.join()
+    pipeline.stop()
+
+def test_backpressure():
+    """Test that submit times out once every queue is full."""
+    release = threading.Event()
+    pipeline = Pipeline("test", poll_interval=0.01)
+    pipeline.add_stage("blocked", lambda n: release.wait(2), queue_size=1)
+    pipeline.start()
+
+    accepted = [pipeline.submit(n, timeout=0.05) for n in range(4)]
+    assert accepted[0] and accepted[1], "First items should fit (one in flight, one queued)"
+    assert not accepted[-1], "Submit should report backpressure once the queue is full"
+
+    release.set()
+    pipeline.join()
+    pipeline.stop()
+
+def test_handler_errors_are_counted():
+    """Test that a failing handler does not kill its worker."""
+    results = []
+    pipeline = Pipeline("test", poll_interval=0.01)
+    pipeline.add_stage("flaky", lambda n: 1 / n)
+    pipeline.add_stage("sink", results.append)
+    pipeline.start()
+
+    for n in (0, 1, 2):
+        pipeline.submit(n)
+    pipeline.join()
+    pipeline.stop()
+
+    assert results == [1.0, 0.5], f"Good items should still flow, got {results}"
+    assert pipeline.stats()["flaky"]["errors"] == 1, "The failure should be counted"
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Pipeline Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Items Flow Through Stages", test_items_flow_through_stages)
+    tester.test("Stages Overlap", test_stages_overlap)
+    tester.test("Backpressure", test_backpressure)
+    tester.test("Handler Errors Are Counted", test_handler_errors_are_counted)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
@@ -29,9 +29,14 @@ def test_speak_endpoint():
                 json={"text": phrase},
                 timeout=10
             )
-            if response.status_code == 200:
-                print(f"✅ Spoke: '{phrase}'")
-                time.sleep(2)  # Wait for TTS to finish
+            if response.status_code == 202:
+                job_id = response.json()["job_id"]
+                print(f"✅ Queued: '{phrase}' (job {job_id})")
+                if wait_for_job(job_id) == "done":
+                    print(f"✅ Spoke: '{phrase}'")
+                else:
+                    print(f"❌ Job {job_id} did not finish")
+                    return False
             else:
                 print(f"❌ Failed to speak: {response.json()}")
         except Exception as e:
@@ -40,6 +45,16 @@ def test_speak_endpoint():
     
     return True
 
+def wait_for_job(job_id, timeout=30):
+    """Poll /speak/<id> until the job leaves the queue."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        status = requests.get(f"{BASE_URL}/speak/{job_id}", timeout=5).json()["status"]
+        if status not in ("queued", "speaking"):
+            return status
+        time.sleep(0.5)
+    return "timeout"
+
 def test_listen_endpoint():
     """Test the /listen endpoint."""
     print("\n[TEST 2] Testing /listen endpoint...")
@@ -0,0 +1,88 @@
+"""
+Tests for speaker verification - No audio hardware needed
+Uses synthetic voices with different pitch and formants
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from speaker import SpeakerVerifier, mfcc, speaker_embedding
+from test_logic import MockTest
+
+FS = 16000
+BA_FORMANTS = [(700, 150), (1200, 200), (2600, 300)]
+GUEST_FORMANTS = [(400, 150), (2000, 200), (3000, 300)]
+
+def _voice(f0, formants, seconds=2.0, seed=0):
+    """Harmonic source shaped by formant peaks, with slight vibrato and noise."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * FS)) / FS
+    phase = 2 * np.pi * np.cumsum(f0 * (1 + 0.05 * np.sin(2 * np.pi * (0.5 + rng.random()) * t))) / FS
+    harmonics = np.arange(1, 30)
+    amps = sum(np.exp(-((harmonics * f0 - center) / width) ** 2) for center, width in formants) + 0.02
+    signal = (amps[:, None] * np.sin(harmonics[:, None] * phase)).sum(axis=0)
+    signal += rng.normal(0, 0.01, len(t))
+    return (signal / np.abs(signal).max() * 0.5).astype(np.float32)
+
+def test_mfcc_shape():
+    """Test that MFCCs come out as 10 ms frames by coefficients."""
+    coeffs = mfcc(np.zeros(FS, dtype=np.float32), n_mfcc=13)
+    assert coeffs.shape == (98, 13), f"Unexpected MFCC shape {coeffs.shape}"
+
+def test_embedding_ignores_loudness():
+    """Test that the voiceprint does not change with volume."""
+    voice = _voice(120, BA_FORMANTS)
+    similarity = float(speaker_embedding(voice) @ speaker_embedding(voice * 0.2))
+    assert similarity > 0.99, f"Volume should not change the embedding much: {similarity}"
+
+def test_accepts_ba_rejects_guest():
+    """Test that Ba's voice passes and a different voice does not."""
+    verifier = SpeakerVerifier(threshold=0.8)
+    verifier.enroll("ba", [_voice(120, BA_FORMANTS, seed=n) for n in range(3)])
+
+    accepted, score, best = verifier.verify(_voice(125, BA_FORMANTS, seed=9))
+    assert accepted and best == "ba", f"Ba should be accepted (score {score})"
+    accepted, score, _ = verifier.verify(_voice(210, GUEST_FORMANTS, seed=9))
+    assert not accepted, f"Guest should be rejected (score {score})"
+
+def test_accepts_everything_until_enrolled():
+    """Test that an empty verifier keeps the old accept-all behavior."""
+    verifier = SpeakerVerifier()
+    accepted, score, best = verifier.verify(_voice(210, GUEST_FORMANTS))
+    assert accepted and score is None and best is None, "Unenrolled verifier should accept"
+
+def test_voiceprints_persist():
+    """Test that enrolled centroids survive a reload."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "voiceprints.npz")
+        verifier = SpeakerVerifier(path)
+        verifier.enroll("ba", [_voice(120, BA_FORMANTS, seed=n) for n in range(2)])
+        verifier.enroll("tv", [_voice(210, GUEST_FORMANTS, seed=n) for n in range(2)])
+
+        reloaded = SpeakerVerifier(path)
+        assert reloaded.enrolled, "Ba should still be enrolled"
+        assert reloaded.status()["speakers"] == {"ba": {"clips": 2}, "tv": {"clips": 2}}, \
+            f"Unexpected speakers: {reloaded.status()['speakers']}"
+        _, _, best = reloaded.verify(_voice(210, GUEST_FORMANTS, seed=7))
+        assert best == "tv", f"TV clip should match the TV voiceprint, got {best}"
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Speaker Verification Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("MFCC Shape", test_mfcc_shape)
+    tester.test("Embedding Ignores Loudness", test_embedding_ignores_loudness)
+    tester.test("Accepts Ba Rejects Guest", test_accepts_ba_rejects_guest)
+    tester.test("Accepts Everything Until Enrolled", test_accepts_everything_until_enrolled)
+    tester.test("Voiceprints Persist", test_voiceprints_persist)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
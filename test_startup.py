@@ -0,0 +1,90 @@
+"""
+Tests for service startup - No Whisper needed
+Imports service in a fresh interpreter to check what loads and what the probes say
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from test_logic import MockTest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ("whisper", "torch", "pyttsx3", "sounddevice")
+
+def _run(script):
+    """Run `script` after importing service in a clean interpreter; return its JSON output."""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   MIMU_AUDIO_SOURCES="",
+                   MIMU_INFERENCE_WORKERS="0",
+                   MIMU_VOICEPRINT_FILE=os.path.join(tmp, "voiceprints.npz"),
+                   MIMU_TTS_CACHE_DIR=os.path.join(tmp, "tts"))
+        code = "import json, sys\nimport service\n" + script
+        result = subprocess.run([sys.executable, "-c", code], cwd=HERE, env=env,
+                                capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def test_import_skips_heavy_dependencies():
+    """Test that importing the service loads none of Whisper, torch, pyttsx3 or sounddevice."""
+    loaded = _run(f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))")
+    assert loaded == [], f"Heavy modules imported at startup: {loaded}"
+
+def test_probes_before_and_after_ready():
+    """Test that /healthz answers at once and /readyz waits for model, audio and TTS."""
+    probes = _run("""
+from model_registry import ModelRegistry
+client = service.app.test_client()
+health = client.get('/healthz')
+before = client.get('/readyz')
+service.model_backend = ModelRegistry("base", loader=lambda name: {"name": name})
+service.model_backend.load()
+import threading
+for source in service.audio_sources.values():
+    source.capture._stream = object()   # an open input stream
+service.tts_worker._thread = threading.current_thread()
+after = client.get('/readyz')
+print(json.dumps({"health": [health.status_code, health.get_json()],
+                  "before": [before.status_code, before.get_json()],
+                  "after": [after.status_code, after.get_json()]}))
+""")
+    status, body = probes["health"]
+    assert status == 200 and body["status"] == "ok", probes["health"]
+    status, body = probes["before"]
+    assert status == 503, f"Should not be ready before loading: {body}"
+    assert body["checks"] == {"model": False, "audio": False, "tts": False}, body
+    status, body = probes["after"]
+    assert status == 200 and body["status"] == "ready", probes["after"]
+
+def test_rejects_bad_request_parameters():
+    """Test that non-finite waits and impossible sample rates get a 400 instead of hanging or a 500."""
+    statuses = _run("""
+client = service.app.test_client()
+pcm = b"\\x00\\x00" * 160
+codes = {"listen_nan": client.get('/listen?wait=nan').status_code,
+         "listen_inf": client.get('/listen?wait=inf').status_code}
+for rate in ("0", "-5", "abc", "999999999"):
+    codes["rate_" + rate] = client.post(f'/transcribe?format=pcm&sample_rate={rate}', data=pcm,
+                                        content_type='application/octet-stream').status_code
+print(json.dumps(codes))
+""")
+    assert all(code == 400 for code in statuses.values()), statuses
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Startup Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Import Skips Heavy Dependencies", test_import_skips_heavy_dependencies)
+    tester.test("Probes Before And After Ready", test_probes_before_and_after_ready)
+    tester.test("Rejects Bad Request Parameters", test_rejects_bad_request_parameters)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
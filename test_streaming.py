@@ -0,0 +1,118 @@
+"""
+Tests for streaming transcription - No Whisper needed
+Uses a scripted decoder to check local agreement, window trimming and the worker thread
+"""
+
+import sys
+import threading
+
+import numpy as np
+
+from streaming import LocalAgreement, StreamingRecognizer, StreamingTranscriber
+from test_logic import MockTest
+
+FS = 16000
+WORDS = ["mi", "ăn", "cơm", "chưa", "ba", "ơi"]
+WORD_SECONDS = 0.4
+
+def _ramp(start_s, seconds):
+    """Audio whose sample values encode their absolute position, for the fake decoder."""
+    start = int(start_s * FS)
+    return (np.arange(start, start + int(seconds * FS)) / 1e6).astype(np.float32)
+
+def scripted_decoder(calls=None):
+    """Hears each complete word; a word still being spoken comes out garbled."""
+    def transcribe(audio, prompt):
+        if calls is not None:
+            calls.append((len(audio), prompt))
+        start = float(audio[0]) * 1e6 / FS
+        end = start + len(audio) / float(FS)
+        words = []
+        for index, word in enumerate(WORDS):
+            w_start, w_end = index * WORD_SECONDS, (index + 1) * WORD_SECONDS
+            if w_start < start - 0.05 or w_start >= end:
+                continue
+            text = word if w_end <= end + 1e-6 else word[:1] + "~"
+            words.append((w_start - start, min(w_end, end) - start, text))
+        return words
+    return transcribe
+
+def test_local_agreement_commits_agreed_prefix():
+    """Test that only words two hypotheses agree on are committed."""
+    agreement = LocalAgreement()
+    assert agreement.insert([(0.0, 0.4, "mi"), (0.4, 0.6, "ă~")]) == [], "Nothing to agree with yet"
+    committed = agreement.insert([(0.0, 0.4, "mi"), (0.4, 0.8, "ăn"), (0.8, 0.9, "c~")])
+    assert [w[2] for w in committed] == ["mi"], f"Only 'mi' is stable: {committed}"
+    assert [w[2] for w in agreement.unconfirmed()] == ["ăn", "c~"]
+
+def test_committed_audio_is_not_decoded_again():
+    """Test that the window is trimmed at the commit point as words stabilize."""
+    calls = []
+    transcriber = StreamingTranscriber(scripted_decoder(calls), fs=FS)
+    total = len(WORDS) * WORD_SECONDS
+    position = 0.0
+    while position < total:
+        transcriber.append(_ramp(position, 0.3))
+        position += 0.3
+        transcriber.decode()
+    text = transcriber.finish()
+
+    assert text == " ".join(WORDS), f"Final text should be exact: {text!r}"
+    longest = max(length for length, _ in calls)
+    assert longest < total * FS / 2, f"Window should stay short, longest was {longest / FS:.2f}s"
+    assert any(prompt for _, prompt in calls), "Committed text should be passed as the prompt"
+
+def test_recognizer_publishes_partials_and_final():
+    """Test the worker thread: partials, commits and the final result."""
+    partials, commits = [], []
+    recognizer = StreamingRecognizer(scripted_decoder(), fs=FS, step_s=0.3, gate_s=0.2,
+                                     on_partial=lambda s, t: partials.append(t),
+                                     on_commit=lambda s, t: commits.append(t),
+                                     poll_interval=0.01)
+    recognizer.start()
+    session = recognizer.begin()
+    position = 0.0
+    while position < len(WORDS) * WORD_SECONDS:
+        recognizer.feed(_ramp(position, 0.3))
+        position += 0.3
+        threading.Event().wait(0.02)
+    recognizer.end()
+    final = session.result.result(timeout=2)
+    recognizer.stop()
+
+    assert final == " ".join(WORDS), f"Final text: {final!r}"
+    assert partials, "Partial hypotheses should be published"
+    assert commits and commits[0].startswith("mi"), f"Stable words should be committed early: {commits}"
+
+def test_gate_mutes_other_speakers():
+    """Test that a rejected speaker is neither decoded nor published."""
+    calls, partials = [], []
+    recognizer = StreamingRecognizer(scripted_decoder(calls), fs=FS, step_s=0.2, gate_s=0.2,
+                                     gate=lambda audio: False,
+                                     on_partial=lambda s, t: partials.append(t), poll_interval=0.01)
+    recognizer.start()
+    session = recognizer.begin()
+    recognizer.feed(_ramp(0.0, 1.0))
+    recognizer.end()
+    result = session.result.result(timeout=2)
+    recognizer.stop()
+
+    assert result is None, "Muted session should have no text"
+    assert session.muted and not calls and not partials, "Nothing should be decoded or published"
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Streaming Transcription Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Local Agreement Commits Agreed Prefix", test_local_agreement_commits_agreed_prefix)
+    tester.test("Committed Audio Is Not Decoded Again", test_committed_audio_is_not_decoded_again)
+    tester.test("Recognizer Publishes Partials And Final", test_recognizer_publishes_partials_and_final)
+    tester.test("Gate Mutes Other Speakers", test_gate_mutes_other_speakers)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
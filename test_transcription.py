@@ -0,0 +1,272 @@
+"""
+Tests for batch transcription - No Whisper needed
+Checks payload decoding, segment timing and micro-batching
+"""
+
+import io
+import sys
+import threading
+import time
+import wave
+
+import numpy as np
+
+from batcher import MicroBatcher
+from test_logic import MockTest
+from transcription import (DECODING_PROFILES, AudioPayloadError, _batch_decoding_options, _finish_batch,
+                           _segments_from_tokens, decode_audio_payload, transcribe_words, vocabulary_prompt)
+
+def _wav_bytes(samples, fs=16000, channels=1):
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(fs)
+        wf.writeframes(np.asarray(samples, dtype=np.int16).tobytes())
+    return buffer.getvalue()
+
+class FakeTokenizer:
+    timestamp_begin = 1000
+
+    def decode(self, tokens):
+        return " ".join(f"w{t}" for t in tokens)
+
+def test_decode_wav_and_pcm():
+    """Test that WAV and raw PCM payloads decode to the same samples."""
+    samples = (np.sin(np.arange(1600) / 10) * 16000).astype(np.int16)
+    from_wav = decode_audio_payload(_wav_bytes(samples))
+    from_pcm = decode_audio_payload(samples.tobytes(), fmt="pcm")
+
+    assert from_wav.dtype == np.float32, "Samples should be float32"
+    assert np.allclose(from_wav, from_pcm), "WAV and PCM should decode identically"
+    assert abs(from_wav.max() - samples.max() / 32768.0) < 1e-6, "Scale should be full-range"
+
+def test_decode_resamples_and_downmixes():
+    """Test that 8 kHz stereo input comes out as 16 kHz mono."""
+    stereo = np.zeros((800, 2), dtype=np.int16)
+    stereo[:, 0] = 1000
+    stereo[:, 1] = 3000
+    audio = decode_audio_payload(_wav_bytes(stereo.reshape(-1), fs=8000, channels=2))
+
+    assert len(audio) == 1600, f"Expected 1600 samples at 16 kHz, got {len(audio)}"
+    assert np.allclose(audio, 2000 / 32768.0), "Channels should be averaged"
+
+def test_decode_rejects_garbage():
+    """Test that an invalid payload raises AudioPayloadError."""
+    try:
+        decode_audio_payload(b"not a wav file")
+    except AudioPayloadError:
+        return
+    raise AssertionError("Garbage should raise AudioPayloadError")
+
+def test_decode_rejects_bad_sample_rates():
+    """Test that zero, negative and absurd sample rates raise AudioPayloadError."""
+    pcm = np.zeros(160, dtype=np.int16)
+    for payload, fmt, rate in ((pcm.tobytes(), "pcm", 0), (pcm.tobytes(), "pcm", -8000),
+                               (pcm.tobytes(), "pcm", 10 ** 9), (_wav_bytes(pcm, fs=10 ** 6), "wav", 16000)):
+        try:
+            decode_audio_payload(payload, fmt=fmt, sample_rate=rate)
+        except AudioPayloadError as e:
+            assert "Sample rate" in str(e), str(e)
+            continue
+        raise AssertionError(f"{fmt} at {rate} Hz should be rejected")
+
+def test_segments_from_timestamp_tokens():
+    """Test that timestamp token pairs become timed segments."""
+    # <|0.00|> 1 2 <|1.00|><|1.00|> 3 <|2.50|>
+    tokens = [1000, 1, 2, 1050, 1050, 3, 1125]
+    segments = _segments_from_tokens(tokens, FakeTokenizer(), duration=3.0)
+
+    assert segments == [
+        {"start": 0.0, "end": 1.0, "text": "w1 w2"},
+        {"start": 1.0, "end": 2.5, "text": "w3"},
+    ], f"Unexpected segments: {segments}"
+
+class FakeModel:
+    device = type("Device", (), {"type": "cpu"})()
+
+    def __init__(self):
+        self.options = None
+
+    def transcribe(self, audio, **options):
+        self.options = options
+        return {"segments": [{"words": [{"word": " mi", "start": 0.0, "end": 0.3}]}]}
+
+def test_vocabulary_prompt():
+    """Test that the command vocabulary prompt is deduplicated and bounded."""
+    prompt = vocabulary_prompt(["mi nói chuyện", "mi im đi", "mi nói chuyện"])
+    assert prompt == "mi nói chuyện, mi im đi", f"Unexpected prompt: {prompt}"
+    assert len(vocabulary_prompt(["x" * 150, "y" * 150])) == 150, "Phrases past the cap are left out"
+    assert vocabulary_prompt([]) is None, "No phrases, no prompt"
+
+def test_cpu_fast_batch_options():
+    """Test that cpu-fast maps to one greedy fp32 pass with a fixed language."""
+    whisper = type("FakeWhisper", (), {"DecodingOptions": staticmethod(lambda **kw: kw)})
+    options = dict(DECODING_PROFILES["cpu-fast"]["options"], initial_prompt="mi im đi")
+    decoding = _batch_decoding_options(whisper, FakeModel(), options)
+    assert decoding["language"] == "vi" and decoding["fp16"] is False, decoding
+    assert decoding["temperature"] == 0.0 and decoding["beam_size"] is None, decoding
+    assert decoding["prompt"] == "mi im đi", "Vocabulary prompt should prime the decoder"
+    default = _batch_decoding_options(whisper, FakeModel(), DECODING_PROFILES["default"]["options"])
+    assert default["language"] is None and default["fp16"] is False, "No fp16 on a CPU"
+
+class StubBatchModel(FakeModel):
+    is_multilingual = True
+    num_languages = 100   # large-v3
+
+    def __init__(self):
+        super().__init__()
+        self.retried = []
+
+    def transcribe(self, audio, **options):
+        self.retried.append(float(audio[0]))
+        self.options = options
+        return {"text": " mi im đi", "language": "vi", "segments": []}
+
+class BatchResult:
+    def __init__(self, tokens=(), no_speech_prob=0.1, avg_logprob=-0.3, compression_ratio=1.2):
+        self.text, self.language, self.tokens = " mi ăn cơm chưa", "vi", list(tokens)
+        self.no_speech_prob, self.avg_logprob, self.compression_ratio = no_speech_prob, avg_logprob, compression_ratio
+
+def test_batch_applies_transcribe_checks():
+    """Test that weak batch decodes are blanked or redone with the fallback, like transcribe does."""
+    clips = [np.full(16000, n, dtype=np.float32) for n in range(5)]
+    decoded = [
+        BatchResult(tokens=[1000, 1, 1050]),                      # confident speech: kept
+        BatchResult(no_speech_prob=0.9, avg_logprob=-1.5),       # silence, weak decode: blanked
+        BatchResult(compression_ratio=3.1),                      # repetitive: retried
+        BatchResult(avg_logprob=-1.4),                           # low confidence: retried
+        BatchResult(tokens=[1000, 2, 1025], no_speech_prob=0.9), # confident despite no-speech: kept
+    ]
+    tokenizers = []
+
+    def get_tokenizer(multilingual, num_languages=99, language=None, task=None):
+        tokenizers.append((num_languages, language))
+        return FakeTokenizer()
+
+    model = StubBatchModel()
+    options = DECODING_PROFILES["cpu-fast"]["options"]
+    results = _finish_batch(model, clips, list(range(5)), decoded, options, get_tokenizer, [None] * 5)
+
+    assert results[0]["segments"] == [{"start": 0.0, "end": 1.0, "text": "w1"}], results[0]
+    assert results[1] == {"text": "", "language": "vi", "segments": []}, results[1]
+    assert model.retried == [2.0, 3.0], f"Weak decodes should be redone: {model.retried}"
+    assert results[2]["text"] == results[3]["text"] == "mi im đi"
+    assert model.options["temperature"] == (0.0, 0.4), "Retries should get the profile's fallback"
+    assert results[4]["text"] == "mi ăn cơm chưa", results[4]
+    assert tokenizers == [(100, "vi")], f"One tokenizer per language, with the model's languages: {tokenizers}"
+
+def test_words_prompt_replaces_vocabulary():
+    """Test that committed text replaces the vocabulary prompt in streaming decodes."""
+    model = FakeModel()
+    words = transcribe_words(model, np.zeros(16000, dtype=np.float32), language="vi",
+                             initial_prompt="mi im đi")
+    assert words == [(0.0, 0.3, "mi")], words
+    assert model.options["initial_prompt"] == "mi im đi" and model.options["language"] == "vi"
+    transcribe_words(model, np.zeros(16000, dtype=np.float32), prompt="mi nói", initial_prompt="mi im đi")
+    assert model.options["initial_prompt"] == "mi nói", "Committed text should win"
+    assert model.options["word_timestamps"], "Streaming needs word timestamps"
+
+def test_micro_batching():
+    """Test that concurrent submissions share one batch call."""
+    calls = []
+    batcher = MicroBatcher(lambda items: calls.append(list(items)) or [i * 10 for i in items],
+                           max_batch_size=4, max_wait=0.2)
+    batcher.start()
+    futures = [batcher.submit(n) for n in range(6)]
+    results = [future.result(timeout=2) for future in futures]
+    batcher.stop()
+
+    assert results == [0, 10, 20, 30, 40, 50], f"Results should map back in order: {results}"
+    assert [len(call) for call in calls] == [4, 2], f"Expected batches of 4 and 2, got {calls}"
+
+def test_micro_batch_max_wait():
+    """Test that a lone request is not held longer than max_wait."""
+    batcher = MicroBatcher(lambda items: items, max_batch_size=8, max_wait=0.05)
+    batcher.start()
+    started = time.monotonic()
+    assert batcher.submit("x").result(timeout=2) == "x", "Single item should round-trip"
+    elapsed = time.monotonic() - started
+    batcher.stop()
+    assert elapsed < 0.5, f"Lone item waited too long: {elapsed:.2f}s"
+
+def test_micro_batch_keys_take_turns():
+    """Test that a busy key cannot starve a quiet one."""
+    release = threading.Event()
+    calls = []
+
+    def batch_fn(items):
+        calls.append(list(items))
+        release.wait(2)
+        return items
+
+    batcher = MicroBatcher(batch_fn, max_batch_size=2, max_wait=0.01)
+    first = batcher.submit("k0", key="kitchen")
+    time.sleep(0.1)  # worker is now stuck in the first batch
+    futures = [batcher.submit(f"k{n}", key="kitchen") for n in range(1, 5)]
+    futures.append(batcher.submit("o0", key="office"))
+    release.set()
+    results = [future.result(timeout=2) for future in [first] + futures]
+    batcher.stop()
+
+    assert results == ["k0", "k1", "k2", "k3", "k4", "o0"], f"Results should map back: {results}"
+    assert "o0" in calls[1], f"Quiet key should ride in the next batch: {calls}"
+    assert batcher.items_by_key == {"kitchen": 5, "office": 1}, batcher.items_by_key
+
+def test_micro_batch_workers_overlap():
+    """Test that several workers keep several batches in flight."""
+    def slow(items):
+        time.sleep(0.3)
+        return items
+
+    batcher = MicroBatcher(slow, max_batch_size=1, max_wait=0.01, workers=2)
+    started = time.monotonic()
+    futures = [batcher.submit(n) for n in range(2)]
+    results = [future.result(timeout=2) for future in futures]
+    elapsed = time.monotonic() - started
+    batcher.stop()
+    assert results == [0, 1], f"Results should map back: {results}"
+    assert elapsed < 0.55, f"Two batches should run at once, took {elapsed:.2f}s"
+
+def test_micro_batch_errors_propagate():
+    """Test that a failing batch fails each caller's future."""
+    def explode(items):
+        raise RuntimeError("model exploded")
+
+    batcher = MicroBatcher(explode, max_batch_size=2, max_wait=0.01)
+    future = batcher.submit("clip")
+    try:
+        future.result(timeout=2)
+    except RuntimeError as e:
+        assert "exploded" in str(e), "Original error should surface"
+        return
+    finally:
+        batcher.stop()
+    raise AssertionError("Batch failure should propagate")
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - Batch Transcription Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Decode WAV And PCM", test_decode_wav_and_pcm)
+    tester.test("Decode Resamples And Downmixes", test_decode_resamples_and_downmixes)
+    tester.test("Decode Rejects Garbage", test_decode_rejects_garbage)
+    tester.test("Decode Rejects Bad Sample Rates", test_decode_rejects_bad_sample_rates)
+    tester.test("Segments From Timestamp Tokens", test_segments_from_timestamp_tokens)
+    tester.test("Vocabulary Prompt", test_vocabulary_prompt)
+    tester.test("CPU Fast Batch Options", test_cpu_fast_batch_options)
+    tester.test("Batch Applies Transcribe Checks", test_batch_applies_transcribe_checks)
+    tester.test("Words Prompt Replaces Vocabulary", test_words_prompt_replaces_vocabulary)
+    tester.test("Micro Batching", test_micro_batching)
+    tester.test("Micro Batch Max Wait", test_micro_batch_max_wait)
+    tester.test("Micro Batch Keys Take Turns", test_micro_batch_keys_take_turns)
+    tester.test("Micro Batch Workers Overlap", test_micro_batch_workers_overlap)
+    tester.test("Micro Batch Errors Propagate", test_micro_batch_errors_propagate)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
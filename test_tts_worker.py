@@ -0,0 +1,332 @@
+"""
+Tests for the TTS worker and phrase cache - No pyttsx3 needed
+Uses a fake engine to check ordering, job tracking, cancellation and caching
+"""
+
+import os
+import sys
+import tempfile
+import threading
+
+import numpy as np
+
+from test_logic import MockTest
+from tts import PRIORITY_CHATTER, PRIORITY_REPLY, TTSWorker
+from tts_cache import SynthesisCache, write_wav
+
+class FakeEngine:
+    """Records what it was asked to say; optionally blocks until released."""
+
+    instances = 0
+
+    def __init__(self):
+        FakeEngine.instances += 1
+        self.spoken = []
+        self.gate = None
+        self.stopped = False
+        self.rendered = []
+        self._pending = None
+
+    def say(self, text):
+        self._pending = text
+
+    def runAndWait(self):
+        if self.gate is not None:
+            self.gate.wait(2)
+        if self._pending is not None:
+            self.spoken.append(self._pending)
+            self._pending = None
+
+    def stop(self):
+        self.stopped = True
+
+    def save_to_file(self, text, path):
+        self.rendered.append(text)
+        write_wav(path, np.full(1600, len(text), dtype=np.int16), 16000)
+
+    def getProperty(self, name):
+        return {"voice": "vi", "rate": 150, "volume": 1.0}[name]
+
+class FakePlayback:
+    def __init__(self):
+        self.played = []
+
+    def play(self, pcm, fs):
+        self.played.append((int(pcm[0]), fs))
+
+    def stop(self):
+        pass
+
+    def wait(self):
+        pass
+
+def _worker():
+    engine = FakeEngine()
+    worker = TTSWorker(engine_factory=lambda: engine, poll_interval=0.01)
+    return worker, engine
+
+def test_single_engine_for_all_jobs():
+    """Test that every job reuses the one engine."""
+    FakeEngine.instances = 0
+    worker, engine = _worker()
+    worker.start()
+    jobs = [worker.submit(f"câu {n}") for n in range(3)]
+    for job in jobs:
+        assert job.done.wait(2), "Job should finish"
+    worker.stop()
+
+    assert FakeEngine.instances == 1, "Engine should be created once"
+    assert engine.spoken == ["câu 0", "câu 1", "câu 2"], f"Unexpected order: {engine.spoken}"
+    assert all(job.status == "done" for job in jobs), "All jobs should be done"
+
+def test_priority_order():
+    """Test that replies jump ahead of queued chatter."""
+    worker, engine = _worker()
+    chatter = worker.submit("Ọc ọc...", priority=PRIORITY_CHATTER)
+    reply = worker.submit("Dạ chào ba", priority=PRIORITY_REPLY)
+    worker.start()
+    assert chatter.done.wait(2) and reply.done.wait(2), "Jobs should finish"
+    worker.stop()
+
+    assert engine.spoken == ["Dạ chào ba", "Ọc ọc..."], f"Reply should go first: {engine.spoken}"
+
+def test_cancel_queued_job():
+    """Test that a queued job can be cancelled before it is spoken."""
+    worker, engine = _worker()
+    engine.gate = threading.Event()
+    worker.start()
+    first = worker.submit("đang nói")
+    second = worker.submit("bị hủy")
+
+    assert worker.cancel(second.id), "Queued job should be cancellable"
+    assert worker.get(second.id).status == "cancelled", "Status should be cancelled"
+    engine.gate.set()
+    assert first.done.wait(2), "First job should finish"
+    worker.stop()
+
+    assert engine.spoken == ["đang nói"], f"Cancelled job must not be spoken: {engine.spoken}"
+    assert not worker.cancel(first.id), "Finished job cannot be cancelled"
+    assert worker.get("missing") is None, "Unknown job id should return None"
+
+def test_drain_waits_for_queued_jobs():
+    """Test that drain returns once every submitted job has been spoken."""
+    worker, engine = _worker()
+    engine.gate = threading.Event()
+    worker.start()
+    jobs = [worker.submit(f"câu {n}") for n in range(2)]
+
+    assert not worker.drain(timeout=0.1), "Drain should time out while speech is blocked"
+    engine.gate.set()
+    assert worker.drain(timeout=2), "Drain should finish once the engine is free"
+    worker.stop()
+
+    assert all(job.status == "done" for job in jobs), [job.status for job in jobs]
+    assert engine.spoken == ["câu 0", "câu 1"], f"Queued jobs should be spoken: {engine.spoken}"
+
+def test_finished_hook_sees_every_job():
+    """Test that the completion hook reports spoken and cancelled jobs with their trace id."""
+    finished = []
+    worker = TTSWorker(engine_factory=FakeEngine, poll_interval=0.01, on_finished=finished.append)
+    worker.start()
+    spoken = worker.submit("xin chào", trace_id="abc12345")
+    assert spoken.done.wait(2), "Job should finish"
+    queued = worker.submit("bị hủy")
+    worker.cancel(queued.id)
+    worker.stop()
+
+    statuses = {job.text: job.status for job in finished}
+    assert statuses.get("xin chào") == "done", f"Spoken job should be reported: {statuses}"
+    assert finished[0].trace_id == "abc12345", "Trace id should travel with the job"
+    assert finished[0].started_at is not None and finished[0].finished_at is not None
+
+def test_interrupt_current_job():
+    """Test that interrupting marks the speaking job as cancelled."""
+    worker, engine = _worker()
+    engine.gate = threading.Event()
+    worker.start()
+    job = worker.submit("câu rất dài")
+    while job.status == "queued":
+        threading.Event().wait(0.01)
+
+    assert worker.cancel(job.id), "Speaking job should be interruptible"
+    worker._on_word("started-word", 0, 1)  # What pyttsx3 would call at the next word
+    engine.gate.set()
+    assert job.done.wait(2), "Job should finish"
+    worker.stop()
+
+    assert engine.stopped, "Engine should have been told to stop"
+    assert job.status == "cancelled", f"Interrupted job should be cancelled, got {job.status}"
+
+def test_cache_renders_once():
+    """Test that a repeated phrase is rendered once and then played from cache."""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = FakeEngine()
+        playback = FakePlayback()
+        cache = SynthesisCache(directory)
+        worker = TTSWorker(engine_factory=lambda: engine, poll_interval=0.01,
+                           cache=cache, sd_module=playback)
+        worker.start()
+        first = worker.submit("Dạ chào ba")
+        assert first.done.wait(2), "First job should finish"
+        second = worker.submit("Dạ chào ba")
+        assert second.done.wait(2), "Second job should finish"
+        worker.stop()
+
+        assert engine.rendered == ["Dạ chào ba"], f"Should render once: {engine.rendered}"
+        assert engine.spoken == [], "Cached path should not use live speech"
+        assert len(playback.played) == 2, "Both jobs should play"
+        assert (first.cache_hit, second.cache_hit) == (False, True), "Second job should hit"
+        assert len(os.listdir(directory)) == 1, "One rendered file should be stored"
+
+class TruncatingEngine(FakeEngine):
+    """Reports every utterance as cut short, like pyttsx3 after stop()."""
+
+    def __init__(self):
+        super().__init__()
+        self.callbacks = {}
+
+    def connect(self, name, callback):
+        self.callbacks[name] = callback
+
+    def runAndWait(self):
+        super().runAndWait()
+        self.callbacks["finished-utterance"]("utterance", False)
+
+def _wait_speaking(job):
+    while job.status == "queued":
+        threading.Event().wait(0.01)
+
+def test_interrupted_render_not_cached():
+    """Test that a render cut short by an interrupt is thrown away, not replayed from cache."""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = FakeEngine()
+        engine.gate = threading.Event()
+        playback = FakePlayback()
+        cache = SynthesisCache(directory)
+        worker = TTSWorker(engine_factory=lambda: engine, poll_interval=0.01,
+                           cache=cache, sd_module=playback)
+        worker.start()
+        job = worker.submit("Dạ chào ba")
+        _wait_speaking(job)
+        assert worker.interrupt(), "Rendering job should be interruptible"
+        engine.gate.set()
+        assert job.done.wait(2), "Job should finish"
+
+        assert job.status == "cancelled", f"Interrupted job should be cancelled, got {job.status}"
+        assert playback.played == [] and engine.spoken == [], "Nothing should be played"
+        assert os.listdir(directory) == [], f"Partial render should be deleted: {os.listdir(directory)}"
+        again = worker.submit("Dạ chào ba")
+        assert again.done.wait(2), "Next job should finish"
+        worker.stop()
+        assert again.cache_hit is False and again.status == "done", again.to_dict()
+
+    with tempfile.TemporaryDirectory() as directory:
+        engine = TruncatingEngine()
+        worker = TTSWorker(engine_factory=lambda: engine, poll_interval=0.01,
+                           cache=SynthesisCache(directory), sd_module=FakePlayback())
+        worker.start()
+        jobs = worker.prewarm(["Ọc ọc..."])
+        assert jobs[0].done.wait(2), "Render should finish"
+        worker.stop()
+        assert os.listdir(directory) == [], "A render reported as incomplete should not be cached"
+
+def test_interrupt_spares_prewarm():
+    """Test that interrupt() leaves a prewarm render alone."""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = FakeEngine()
+        engine.gate = threading.Event()
+        worker = TTSWorker(engine_factory=lambda: engine, poll_interval=0.01,
+                           cache=SynthesisCache(directory), sd_module=FakePlayback())
+        worker.start()
+        job = worker.prewarm(["Ọc ọc..."])[0]
+        _wait_speaking(job)
+        assert not worker.interrupt(), "Nothing audible is playing"
+        engine.gate.set()
+        assert job.done.wait(2), "Render should finish"
+        worker.stop()
+        assert len(os.listdir(directory)) == 1, "The render should be cached"
+
+def test_playback_hook_brackets_sound():
+    """Test that the playback hook sees every played clip start and stop, but not renders."""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = FakeEngine()
+        events = []
+        cache = SynthesisCache(directory)
+        worker = TTSWorker(engine_factory=lambda: engine, poll_interval=0.01, cache=cache,
+                           sd_module=FakePlayback(),
+                           on_playback=lambda playing, clip: events.append((playing, clip is not None)))
+        worker.start()
+        for job in worker.prewarm(["Ọc ọc..."]):
+            assert job.done.wait(2), "Render should finish"
+        assert events == [], f"Rendering is not playback: {events}"
+        job = worker.submit("Dạ chào ba")
+        assert job.done.wait(2), "Job should finish"
+        worker.stop()
+
+        assert events == [(True, True), (False, False)], f"Clip should be bracketed: {events}"
+
+    engine = FakeEngine()
+    events = []
+    worker = TTSWorker(engine_factory=lambda: engine, poll_interval=0.01,
+                       on_playback=lambda playing, clip: events.append((playing, clip)))
+    worker.start()
+    assert worker.submit("nói trực tiếp").done.wait(2), "Live job should finish"
+    worker.stop()
+    assert events == [(True, None), (False, None)], f"Live speech has no clip: {events}"
+
+def test_prewarm_fills_cache():
+    """Test that known phrases are rendered without being spoken."""
+    with tempfile.TemporaryDirectory() as directory:
+        engine = FakeEngine()
+        playback = FakePlayback()
+        worker = TTSWorker(engine_factory=lambda: engine, poll_interval=0.01,
+                           cache=SynthesisCache(directory), sd_module=playback)
+        jobs = worker.prewarm(["một", "hai", "một"])
+        worker.start()
+        for job in jobs:
+            assert job.done.wait(2), "Prewarm job should finish"
+        worker.stop()
+
+        assert engine.rendered == ["một", "hai"], f"Duplicates should be skipped: {engine.rendered}"
+        assert playback.played == [], "Prewarming must not play anything"
+
+def test_cache_size_caps():
+    """Test that memory and disk levels both evict the least recently used clips."""
+    with tempfile.TemporaryDirectory() as directory:
+        clip = np.zeros(1000, dtype=np.int16)  # 2000 bytes each
+        cache = SynthesisCache(directory, max_memory_bytes=4000, max_disk_bytes=5000)
+        keys = [SynthesisCache.key_for(f"câu {n}") for n in range(3)]
+        for key in keys:
+            cache.put(key, clip, 16000)
+
+        assert cache.stats()["memory_entries"] == 2, f"Memory LRU should hold 2: {cache.stats()}"
+        assert not os.path.exists(cache.path_for(keys[0])), "Oldest file should be evicted"
+        assert cache.get(keys[0]) is None, "Evicted clip should miss"
+        assert cache.get(keys[2]) is not None, "Newest clip should hit"
+        assert SynthesisCache.key_for("a", rate=150) != SynthesisCache.key_for("a", rate=200), \
+            "Voice settings should be part of the key"
+
+def main():
+    print("="*60)
+    print("🐱 Mimu Voice Service - TTS Worker Tests")
+    print("="*60)
+
+    tester = MockTest()
+    tester.test("Single Engine For All Jobs", test_single_engine_for_all_jobs)
+    tester.test("Priority Order", test_priority_order)
+    tester.test("Cancel Queued Job", test_cancel_queued_job)
+    tester.test("Drain Waits For Queued Jobs", test_drain_waits_for_queued_jobs)
+    tester.test("Finished Hook Sees Every Job", test_finished_hook_sees_every_job)
+    tester.test("Interrupt Current Job", test_interrupt_current_job)
+    tester.test("Cache Renders Once", test_cache_renders_once)
+    tester.test("Playback Hook Brackets Sound", test_playback_hook_brackets_sound)
+    tester.test("Interrupted Render Not Cached", test_interrupted_render_not_cached)
+    tester.test("Interrupt Spares Prewarm", test_interrupt_spares_prewarm)
+    tester.test("Prewarm Fills Cache", test_prewarm_fills_cache)
+    tester.test("Cache Size Caps", test_cache_size_caps)
+
+    success = tester.summary()
+    sys.exit(0 if success else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Batch transcription helpers for the Mimu Voice Interaction Service.
+- Decodes uploaded WAV or raw PCM payloads to 16 kHz float32 mono
+- Runs several short clips through Whisper as one padded mel batch
+- Returns text, language and segment timings per clip
+- Named decoding profiles trade a little accuracy for CPU speed
+"""
+
+import io
+import wave
+
+import numpy as np
+
+from audio_capture import PolyphaseResampler, pcm_to_float32
+
+WHISPER_SAMPLE_RATE = 16000
+WHISPER_CHUNK_SECONDS = 30
+MAX_PAYLOAD_SAMPLE_RATE = 384000
+TIMESTAMP_RESOLUTION = 0.02  # Seconds per Whisper timestamp token
+
+
+# Named decoding profiles. "default" keeps Whisper's own defaults. "cpu-fast"
+# skips language detection, never tries fp16 on a CPU, does not condition each
+# 30 s window on the previous one, allows one sampled retry instead of five, and
+# runs on an int8-quantized model. Both decode greedily at temperature 0.
+DECODING_PROFILES = {
+    "default": {
+        "quantize": False,
+        "command_prompt": False,
+        "options": {},
+    },
+    "cpu-fast": {
+        "quantize": True,
+        "command_prompt": True,
+        "options": {
+            "language": "vi",
+            "fp16": False,
+            "temperature": (0.0, 0.4),
+            "condition_on_previous_text": False,
+        },
+    },
+}
+PROMPT_MAX_CHARS = 200  # Whisper keeps at most 224 prompt tokens
+
+
+class AudioPayloadError(ValueError):
+    """An uploaded clip could not be decoded."""
+
+
+def _to_float32(pcm, sampwidth):
+    if sampwidth == 1:
+        return (pcm.astype(np.float32) - 128.0) / 128.0
+    if sampwidth == 2:
+        return pcm_to_float32(pcm)
+    if sampwidth == 4:
+        return pcm.astype(np.float32) / 2147483648.0
+    raise AudioPayloadError(f"Unsupported sample width: {sampwidth * 8} bits")
+
+
+def resample(audio, fs, target_fs=WHISPER_SAMPLE_RATE):
+    """Resample mono float32 audio with a polyphase anti-aliasing filter."""
+    if fs == target_fs or len(audio) == 0:
+        return audio
+    return PolyphaseResampler(fs, target_fs).resample(audio)
+
+
+def _check_sample_rate(sample_rate):
+    if not 0 < sample_rate <= MAX_PAYLOAD_SAMPLE_RATE:
+        raise AudioPayloadError(f"Sample rate must be between 1 and {MAX_PAYLOAD_SAMPLE_RATE} Hz, "
+                                f"got {sample_rate}")
+
+
+def decode_audio_payload(data, fmt="wav", sample_rate=WHISPER_SAMPLE_RATE):
+    """Turn an uploaded payload into 16 kHz float32 mono samples.
+
+    `fmt` is "wav" for a RIFF/WAVE file or "pcm" for raw little-endian int16
+    mono at `sample_rate`.
+    """
+    if fmt == "pcm":
+        _check_sample_rate(sample_rate)
+        if len(data) % 2:
+            raise AudioPayloadError("Raw PCM payload has an odd number of bytes")
+        audio = pcm_to_float32(np.frombuffer(data, dtype="<i2"))
+        return resample(audio, sample_rate)
+    if fmt != "wav":
+        raise AudioPayloadError(f"Unknown audio format: {fmt}")
+
+    try:
+        with wave.open(io.BytesIO(data), 'rb') as wf:
+            channels = wf.getnchannels()
+            sampwidth = wf.getsampwidth()
+            fs = wf.getframerate()
+            frames = wf.readframes(wf.getnframes())
+    except (wave.Error, EOFError) as e:
+        raise AudioPayloadError(f"Invalid WAV file: {e}")
+
+    dtype = {1: np.uint8, 2: "<i2", 4: "<i4"}.get(sampwidth)
+    if dtype is None:
+        raise AudioPayloadError(f"Unsupported sample width: {sampwidth * 8} bits")
+    _check_sample_rate(fs)
+    audio = _to_float32(np.frombuffer(frames, dtype=dtype), sampwidth)
+    if channels > 1:
+        audio = audio.reshape(-1, channels).mean(axis=1)
+    return resample(audio, fs)
+
+
+def _segments_from_tokens(tokens, tokenizer, duration):
+    """Split a decoded token sequence into timed segments."""
+    timestamp_begin = tokenizer.timestamp_begin
+    segments = []
+    start = None
+    text_tokens = []
+    for token in tokens:
+        if token < timestamp_begin:
+            text_tokens.append(token)
+            continue
+        moment = (token - timestamp_begin) * TIMESTAMP_RESOLUTION
+        if start is None:
+            start = moment
+        else:
+            if text_tokens:
+                segments.append({"start": round(start, 2), "end": round(moment, 2),
+                                 "text": tokenizer.decode(text_tokens).strip()})
+            start = None
+            text_tokens = []
+    if text_tokens:
+        segments.append({"start": round(start or 0.0, 2), "end": round(duration, 2),
+                         "text": tokenizer.decode(text_tokens).strip()})
+    return segments
+
+
+def transcribe_clip(model, audio, **options):
+    """One clip through Whisper's own transcribe (sliding window past 30 s)."""
+    result = model.transcribe(audio, **options)
+    return {
+        "text": result["text"].strip(),
+        "language": result.get("language"),
+        "segments": [
+            {"start": round(seg["start"], 2), "end": round(seg["end"], 2), "text": seg["text"].strip()}
+            for seg in result.get("segments", [])
+        ],
+    }
+
+
+def vocabulary_prompt(phrases, max_chars=PROMPT_MAX_CHARS):
+    """An initial prompt listing the phrases Whisper should expect to hear."""
+    prompt = ""
+    for phrase in dict.fromkeys(phrases):
+        candidate = f"{prompt}, {phrase}" if prompt else phrase
+        if len(candidate) > max_chars:
+            break
+        prompt = candidate
+    return prompt or None
+
+
+def transcribe_words(model, audio, prompt=None, **options):
+    """Word-level hypothesis for a short window of 16 kHz float32 audio.
+
+    Returns (start, end, word) tuples in seconds from the start of `audio`,
+    as the streaming decoder expects. `prompt` (the text committed so far)
+    replaces any `initial_prompt` in the decoding options.
+    """
+    options = dict(options, word_timestamps=True, condition_on_previous_text=False)
+    if prompt:
+        options["initial_prompt"] = prompt
+    result = model.transcribe(audio, **options)
+    return [
+        (float(word["start"]), float(word["end"]), word["word"].strip())
+        for segment in result.get("segments", [])
+        for word in segment.get("words", [])
+        if word["word"].strip()
+    ]
+
+
+def _batch_decoding_options(whisper, model, options):
+    """Map `model.transcribe` options onto one `whisper.decode` pass."""
+    temperature = options.get("temperature", 0.0)
+    if isinstance(temperature, (tuple, list)):
+        temperature = temperature[0]  # weak decodes are redone one by one with the fallback
+    return whisper.DecodingOptions(
+        language=options.get("language"),
+        temperature=temperature,
+        beam_size=options.get("beam_size"),
+        best_of=options.get("best_of"),
+        prompt=options.get("initial_prompt"),
+        without_timestamps=False,
+        fp16=model.device.type == "cuda" and options.get("fp16", True),
+    )
+
+
+def transcribe_batch(model, clips, **options):
+    """Transcribe a list of 16 kHz float32 clips with one batched decode.
+
+    Clips up to 30 s are padded into a single (batch, n_mels, frames) mel
+    tensor and decoded together; longer clips fall back to `model.transcribe`.
+    Each decode gets `model.transcribe`'s checks: likely silence is blanked,
+    and repetitive or low-confidence text is redone through `transcribe_clip`
+    so it gets the temperature fallback.
+    `options` are `model.transcribe` options, such as a decoding profile's.
+    """
+    import torch
+    import whisper
+    from whisper.tokenizer import get_tokenizer
+
+    results = [None] * len(clips)
+    short = []
+    for index, audio in enumerate(clips):
+        if len(audio) > WHISPER_CHUNK_SECONDS * WHISPER_SAMPLE_RATE:
+            results[index] = transcribe_clip(model, audio, **options)
+        else:
+            short.append(index)
+    if not short:
+        return results
+
+    n_mels = getattr(model.dims, "n_mels", 80)
+    mel = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(torch.from_numpy(clips[i])), n_mels=n_mels)
+        for i in short
+    ]).to(model.device)
+    decoded = whisper.decode(model, mel, _batch_decoding_options(whisper, model, options))
+
+    return _finish_batch(model, clips, short, decoded, options, get_tokenizer, results)
+
+
+def _batch_verdict(result, options):
+    """Whisper's own quality checks on one batched decode: "blank", "retry" or None.
+
+    Mirrors `model.transcribe`: likely silence with a weak decode is blanked;
+    a repetitive or low-confidence decode needs the temperature fallback.
+    """
+    no_speech_threshold = options.get("no_speech_threshold", 0.6)
+    logprob_threshold = options.get("logprob_threshold", -1.0)
+    compression_ratio_threshold = options.get("compression_ratio_threshold", 2.4)
+    low_confidence = logprob_threshold is not None and result.avg_logprob < logprob_threshold
+    if no_speech_threshold is not None and result.no_speech_prob > no_speech_threshold:
+        return "blank" if logprob_threshold is None or low_confidence else None
+    if compression_ratio_threshold is not None and result.compression_ratio > compression_ratio_threshold:
+        return "retry"
+    return "retry" if low_confidence else None
+
+
+def _finish_batch(model, clips, short, decoded, options, get_tokenizer, results):
+    """Turn a batched decode into results, redoing weak ones through `transcribe_clip`."""
+    tokenizers = {}
+    for index, result in zip(short, decoded):
+        verdict = _batch_verdict(result, options)
+        if verdict == "retry":
+            results[index] = transcribe_clip(model, clips[index], **options)
+            continue
+        if verdict == "blank":
+            results[index] = {"text": "", "language": result.language, "segments": []}
+            continue
+        tokenizer = tokenizers.get(result.language)
+        if tokenizer is None:
+            tokenizer = tokenizers[result.language] = get_tokenizer(
+                model.is_multilingual, num_languages=model.num_languages,
+                language=result.language, task="transcribe")
+        duration = len(clips[index]) / float(WHISPER_SAMPLE_RATE)
+        results[index] = {
+            "text": result.text.strip(),
+            "language": result.language,
+            "segments": _segments_from_tokens(result.tokens, tokenizer, duration),
+        }
+    return results
@@ -0,0 +1,333 @@
+"""
+Text-to-speech worker for the Mimu Voice Interaction Service.
+- One long-lived thread owns a single pyttsx3 engine
+- Speech jobs are taken from a priority queue and tracked by job id
+- Queued jobs can be cancelled and the current utterance interrupted
+- With a SynthesisCache, phrases are rendered once and replayed from PCM
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Lower numbers are spoken first
+PRIORITY_REPLY = 0      # Answers to Ba's commands
+PRIORITY_NORMAL = 1     # /speak requests from Clawdbot
+PRIORITY_CHATTER = 2    # Autonomous chatter and heartbeat lines
+PRIORITY_PREWARM = 3    # Rendering known phrases into the cache when idle
+
+PRIORITY_NAMES = {"high": PRIORITY_REPLY, "normal": PRIORITY_NORMAL, "low": PRIORITY_CHATTER}
+
+QUEUED = "queued"
+SPEAKING = "speaking"
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+def _init_pyttsx3():
+    """Default engine factory."""
+    import pyttsx3
+    return pyttsx3.init()
+
+
+class SpeechJob:
+    """One utterance waiting for, or going through, the TTS engine."""
+
+    def __init__(self, text, priority=PRIORITY_NORMAL, source="api", render_only=False, trace_id=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.text = text
+        self.trace_id = trace_id
+        self.render_only = render_only
+        self.cache_hit = None
+        self.priority = priority
+        self.source = source
+        self.status = QUEUED
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "text": self.text,
+            "priority": self.priority,
+            "source": self.source,
+            "trace_id": self.trace_id,
+            "status": self.status,
+            "cache_hit": self.cache_hit,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class TTSWorker:
+    """Serializes all speech through one engine on one thread.
+
+    pyttsx3 engines are not thread-safe and initializing one is slow, so the
+    engine is created once on the worker thread and every caller (HTTP
+    handlers, command replies, autonomous chatter) just enqueues a job.
+
+    When a `cache` is given, each phrase is rendered once with `save_to_file`
+    and later requests for the same text and voice settings are played
+    straight from PCM through sounddevice.
+
+    `on_playback(playing, clip)` is called as sound starts and stops, with
+    the cached clip being played or None when the engine speaks live.
+    """
+
+    def __init__(self, engine_factory=None, max_jobs_kept=256, poll_interval=0.2,
+                 cache=None, sd_module=None, on_finished=None, on_playback=None):
+        self._engine_factory = engine_factory or _init_pyttsx3
+        self._on_finished = on_finished
+        self._on_playback = on_playback
+        self._cache = cache
+        self._sd = sd_module
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._jobs = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._max_jobs_kept = max_jobs_kept
+        self._poll_interval = poll_interval
+        self._current = None
+        self._interrupt = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._engine = None
+        self._utterance_completed = True
+
+    @property
+    def alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the worker thread (the engine is created on it)."""
+        if self.alive:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=5.0):
+        """Stop after the current utterance; queued jobs stay queued."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def submit(self, text, priority=PRIORITY_NORMAL, source="api", trace_id=None):
+        """Queue text to be spoken; returns the SpeechJob immediately."""
+        job = SpeechJob(text, priority=priority, source=source, trace_id=trace_id)
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+            self._forget_old_jobs()
+        self._queue.put((priority, next(self._sequence), job))
+        return job
+
+    def prewarm(self, texts):
+        """Queue known phrases for rendering into the cache behind real speech."""
+        if self._cache is None:
+            return []
+        jobs = []
+        for text in dict.fromkeys(texts):
+            job = SpeechJob(text, priority=PRIORITY_PREWARM, source="prewarm", render_only=True)
+            self._queue.put((PRIORITY_PREWARM, next(self._sequence), job))
+            jobs.append(job)
+        return jobs
+
+    def get(self, job_id):
+        """Look up a job by id (None if unknown or long forgotten)."""
+        with self._jobs_lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """Cancel a queued job or interrupt it if it is being spoken.
+
+        Returns False if the job is unknown or already finished.
+        """
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.done.is_set():
+                return False
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                cancelled = True
+            else:
+                cancelled = False
+        if cancelled:
+            self._finish(job)
+            return True
+        return self.interrupt()
+
+    def interrupt(self):
+        """Stop the utterance currently being spoken, if any.
+
+        Prewarm renders are not interrupted: nothing is playing.
+        """
+        with self._jobs_lock:
+            if self._current is None or self._current.render_only:
+                return False
+            self._interrupt.set()
+        return True
+
+    def pending(self):
+        """Number of jobs waiting in the queue."""
+        return self._queue.qsize()
+
+    def drain(self, timeout=None):
+        """Wait until every submitted job has finished; False if some are still open.
+
+        Prewarm renders are not waited for.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._jobs_lock:
+            open_jobs = [job for job in self._jobs.values() if not job.done.is_set()]
+        for job in open_jobs:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            if not job.done.wait(remaining):
+                return False
+        return True
+
+    def _forget_old_jobs(self):
+        # Callers hold _jobs_lock; only finished jobs are forgotten
+        while len(self._jobs) > self._max_jobs_kept:
+            oldest_id, oldest = next(iter(self._jobs.items()))
+            if not oldest.done.is_set():
+                break
+            del self._jobs[oldest_id]
+
+    def _on_word(self, name, location, length):
+        # Runs on the worker thread inside runAndWait, where stop() is safe
+        if self._interrupt.is_set():
+            self._engine.stop()
+
+    def _on_utterance_finished(self, name, completed):
+        # pyttsx3 reports completed=False when stop() cut the utterance short
+        self._utterance_completed = completed
+
+    def _run(self):
+        try:
+            self._engine = self._engine_factory()
+            if hasattr(self._engine, "connect"):
+                self._engine.connect("started-word", self._on_word)
+                self._engine.connect("finished-utterance", self._on_utterance_finished)
+        except Exception as e:
+            print(f"Error initializing TTS engine: {e}")
+            return
+
+        while not self._stop.is_set():
+            try:
+                _, _, job = self._queue.get(timeout=self._poll_interval)
+            except queue.Empty:
+                continue
+            with self._jobs_lock:
+                if job.status != QUEUED:
+                    continue  # Cancelled while waiting
+                self._interrupt.clear()
+                self._current = job
+                job.status = SPEAKING
+            self._speak(job)
+
+    def _speak(self, job):
+        job.started_at = time.time()
+        try:
+            if self._cache is not None:
+                self._speak_cached(job)
+            else:
+                self._speak_live(job.text)
+            job.status = CANCELLED if self._interrupt.is_set() else DONE
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            print(f"Error during TTS: {e}")
+        finally:
+            self._current = None
+            self._finish(job)
+
+    def _finish(self, job):
+        job.finished_at = time.time()
+        job.done.set()
+        if self._on_finished is not None:
+            try:
+                self._on_finished(job)
+            except Exception as e:
+                print(f"Error in TTS completion hook: {e}")
+
+    def _cache_key(self, text):
+        props = [self._engine.getProperty(name) if hasattr(self._engine, "getProperty") else None
+                 for name in ("voice", "rate", "volume")]
+        return self._cache.key_for(text, *props)
+
+    def _speak_cached(self, job):
+        key = self._cache_key(job.text)
+        clip = self._cache.get(key)
+        job.cache_hit = clip is not None
+        if clip is None:
+            clip = self._render(job.text, key)
+        if job.render_only or self._interrupt.is_set():
+            return
+        if clip is None:
+            # The engine could not render to a readable WAV: speak it live
+            self._speak_live(job.text)
+            return
+        with self._playing(clip):
+            self._play(clip)
+
+    def _speak_live(self, text):
+        with self._playing(None):
+            self._engine.say(text)
+            self._engine.runAndWait()
+
+    @contextmanager
+    def _playing(self, clip):
+        self._notify_playback(True, clip)
+        try:
+            yield
+        finally:
+            self._notify_playback(False, None)
+
+    def _notify_playback(self, playing, clip):
+        if self._on_playback is None:
+            return
+        try:
+            self._on_playback(playing, clip)
+        except Exception as e:
+            print(f"Error in TTS playback hook: {e}")
+
+    def _render(self, text, key):
+        path = f"{self._cache.path_for(key)}.{os.getpid()}.render.wav"
+        try:
+            self._utterance_completed = True
+            self._engine.save_to_file(text, path)
+            self._engine.runAndWait()
+            if self._interrupt.is_set() or not self._utterance_completed:
+                # A cut-off render would be replayed as the whole phrase from then on
+                raise RuntimeError("render was interrupted")
+            return self._cache.put_file(key, path)
+        except Exception as e:
+            print(f"Error rendering TTS to cache: {e}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def _play(self, clip):
+        if self._sd is None:
+            import sounddevice
+            self._sd = sounddevice
+        self._sd.play(clip.pcm, clip.fs)
+        deadline = time.monotonic() + clip.duration
+        while time.monotonic() < deadline:
+            if self._interrupt.wait(min(0.05, max(deadline - time.monotonic(), 0))):
+                self._sd.stop()
+                return
+        self._sd.wait()
@@ -0,0 +1,176 @@
+"""
+Content-addressed cache of rendered TTS audio for the Mimu Voice Interaction Service.
+- Keyed on the text plus the engine's voice, rate and volume
+- In-memory LRU of decoded PCM in front of a size-capped on-disk WAV store
+- Lets fixed and repeated phrases skip synthesis and play straight away
+"""
+
+import hashlib
+import os
+import threading
+import wave
+from collections import OrderedDict
+
+import numpy as np
+
+
+class CachedClip:
+    """Rendered PCM for one phrase."""
+
+    def __init__(self, pcm, fs):
+        self.pcm = pcm
+        self.fs = fs
+
+    @property
+    def nbytes(self):
+        return self.pcm.nbytes
+
+    @property
+    def duration(self):
+        return len(self.pcm) / float(self.fs)
+
+
+def read_wav(path):
+    """Load a 16-bit PCM WAV file as (int16 samples, sample rate)."""
+    with wave.open(path, 'rb') as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16-bit PCM")
+        channels = wf.getnchannels()
+        fs = wf.getframerate()
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    if channels > 1:
+        pcm = pcm.reshape(-1, channels)
+    return pcm, fs
+
+
+def write_wav(path, pcm, fs):
+    """Write int16 samples (mono or frames x channels) to a WAV file."""
+    channels = 1 if pcm.ndim == 1 else pcm.shape[1]
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(fs)
+        wf.writeframes(np.ascontiguousarray(pcm, dtype=np.int16).tobytes())
+
+
+class SynthesisCache:
+    """Two-level cache: memory LRU over a directory of `<key>.wav` files.
+
+    Both levels are capped by size in bytes. On disk, the least recently used
+    files (by modification time, refreshed on every hit) are removed first.
+    """
+
+    def __init__(self, directory, max_memory_bytes=32 * 1024 * 1024,
+                 max_disk_bytes=200 * 1024 * 1024):
+        self.directory = directory
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key_for(text, voice=None, rate=None, volume=None):
+        """Content address for a phrase rendered with given engine settings."""
+        material = "\x1f".join(str(part) for part in (text, voice, rate, volume))
+        return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+    def path_for(self, key):
+        return os.path.join(self.directory, f"{key}.wav")
+
+    def get(self, key):
+        """Return the CachedClip for `key`, or None on a miss."""
+        with self._lock:
+            clip = self._memory.get(key)
+            if clip is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return clip
+
+        path = self.path_for(key)
+        try:
+            pcm, fs = read_wav(path)
+            os.utime(path)
+        except (OSError, ValueError, EOFError, wave.Error):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        clip = CachedClip(pcm, fs)
+        with self._lock:
+            self.hits += 1
+            self._remember(key, clip)
+        return clip
+
+    def put(self, key, pcm, fs):
+        """Store rendered audio in memory and on disk; returns the clip."""
+        clip = CachedClip(pcm, fs)
+        path = self.path_for(key)
+        tmp_path = f"{path}.tmp"
+        write_wav(tmp_path, pcm, fs)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._remember(key, clip)
+        self._enforce_disk_cap()
+        return clip
+
+    def put_file(self, key, rendered_path):
+        """Adopt a WAV file rendered by the engine; returns the clip."""
+        pcm, fs = read_wav(rendered_path)
+        if len(pcm) == 0:
+            raise ValueError(f"{rendered_path} has no audio")
+        os.replace(rendered_path, self.path_for(key))
+        clip = CachedClip(pcm, fs)
+        with self._lock:
+            self._remember(key, clip)
+        self._enforce_disk_cap()
+        return clip
+
+    def _remember(self, key, clip):
+        # Callers hold self._lock
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= previous.nbytes
+        if clip.nbytes > self.max_memory_bytes:
+            return
+        self._memory[key] = clip
+        self._memory_bytes += clip.nbytes
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes
+
+    def _enforce_disk_cap(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.directory):
+            if not name.endswith(".wav"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+            total += info.st_size
+        if total <= self.max_disk_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+            }
@@ -0,0 +1,177 @@
+"""
+Voice-activity detection for the Mimu Voice Interaction Service.
+- Vectorized per-frame energy and spectral flatness computed in NumPy
+- Cuts the live stream into utterances at start/end-of-speech boundaries
+- Drops silent audio before it reaches authentication and Whisper
+"""
+
+import numpy as np
+
+INT16_FULL_SCALE = 32768.0
+
+
+def frame_features(samples, frame_len):
+    """Per-frame energy (dBFS) and spectral flatness.
+
+    `samples` must hold a whole number of frames. Everything is computed over a
+    (n_frames, frame_len) view in one pass, with no Python-level frame loop.
+    """
+    frames = np.asarray(samples, dtype=np.float32).reshape(-1, frame_len) / INT16_FULL_SCALE
+    if len(frames) == 0:
+        empty = np.zeros(0, dtype=np.float32)
+        return empty, empty
+
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    energy_db = 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+    power = np.abs(np.fft.rfft(frames * np.hanning(frame_len).astype(np.float32), axis=1)) ** 2
+    power = np.maximum(power, 1e-12)
+    flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+
+    return energy_db, flatness
+
+
+class VoiceActivityDetector:
+    """Streaming speech/silence segmenter.
+
+    Feed arbitrary-length chunks of int16 audio to `process()`; it returns the
+    utterances completed by that chunk. A frame counts as speech when it is
+    loud enough and not noise-like (low spectral flatness). Speech starts after
+    `start_ms` of consecutive speech frames and ends after `hangover_ms` of
+    silence; `pre_roll_ms` of audio before the trigger is kept so word onsets
+    are not clipped.
+    """
+
+    def __init__(self, fs=16000, frame_ms=30, energy_threshold_db=-45.0,
+                 flatness_threshold=0.45, start_ms=90, hangover_ms=450,
+                 pre_roll_ms=210, min_speech_ms=250, max_utterance_s=20.0):
+        self.fs = fs
+        self.frame_len = int(fs * frame_ms / 1000)
+        self.energy_threshold_db = energy_threshold_db
+        self.flatness_threshold = flatness_threshold
+        self.start_frames = max(1, int(round(start_ms / frame_ms)))
+        self.hangover_frames = max(1, int(round(hangover_ms / frame_ms)))
+        self.pre_roll_frames = int(round(pre_roll_ms / frame_ms))
+        self.min_speech_frames = max(1, int(round(min_speech_ms / frame_ms)))
+        self.max_utterance_frames = int(max_utterance_s * 1000 / frame_ms)
+
+        self.total_samples = 0
+        self.skipped_samples = 0
+        self.utterance_count = 0
+        self.reset()
+
+    def reset(self):
+        """Drop any partial utterance and buffered remainder."""
+        self._remainder = np.zeros(0, dtype=np.int16)
+        self._pending = []      # frames seen since the last decision while silent
+        self._utterance = []    # frames of the utterance in progress
+        self._in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self._voiced_frames = 0
+
+    @property
+    def in_speech(self):
+        """True while an utterance is open."""
+        return self._in_speech
+
+    @property
+    def utterance_frames(self):
+        """Number of frames in the utterance in progress."""
+        return len(self._utterance)
+
+    def utterance_samples(self, start_frame=0):
+        """Audio of the utterance in progress, from frame `start_frame` on."""
+        frames = self._utterance[start_frame:]
+        return np.concatenate(frames) if frames else np.zeros(0, dtype=np.int16)
+
+    def is_speech(self, samples):
+        """Boolean speech mask for each whole frame in `samples`."""
+        usable = len(samples) - len(samples) % self.frame_len
+        energy_db, flatness = frame_features(samples[:usable], self.frame_len)
+        return (energy_db > self.energy_threshold_db) & (flatness < self.flatness_threshold)
+
+    def process(self, samples):
+        """Consume a chunk of audio and return the list of completed utterances."""
+        samples = np.concatenate((self._remainder, np.asarray(samples, dtype=np.int16).reshape(-1)))
+        usable = len(samples) - len(samples) % self.frame_len
+        self._remainder = samples[usable:]
+        if usable == 0:
+            return []
+
+        frames = samples[:usable].reshape(-1, self.frame_len)
+        mask = self.is_speech(samples[:usable])
+        self.total_samples += usable
+
+        finished = []
+        for frame, speech in zip(frames, mask):
+            if self._in_speech:
+                self._utterance.append(frame)
+                if speech:
+                    self._silence_run = 0
+                    self._voiced_frames += 1
+                else:
+                    self._silence_run += 1
+                if (self._silence_run >= self.hangover_frames
+                        or len(self._utterance) >= self.max_utterance_frames):
+                    self._finish(finished)
+            else:
+                self._pending.append(frame)
+                self._speech_run = self._speech_run + 1 if speech else 0
+                if self._speech_run >= self.start_frames:
+                    self._start()
+                else:
+                    self._trim_pending()
+        return finished
+
+    def flush(self):
+        """End the stream: return the utterance in progress, if any."""
+        finished = []
+        if self._in_speech:
+            self._finish(finished)
+        self.skipped_samples += sum(len(f) for f in self._pending)
+        self._pending = []
+        self._speech_run = 0
+        return finished
+
+    def _trim_pending(self):
+        # Keep just enough silent history for the pre-roll plus a possible trigger run
+        keep = self.pre_roll_frames + self.start_frames
+        excess = len(self._pending) - keep
+        if excess > 0:
+            self.skipped_samples += excess * self.frame_len
+            del self._pending[:excess]
+
+    def _start(self):
+        keep = self.pre_roll_frames + self.start_frames
+        excess = max(0, len(self._pending) - keep)
+        self.skipped_samples += excess * self.frame_len
+        self._utterance = self._pending[excess:]
+        self._pending = []
+        self._in_speech = True
+        self._silence_run = 0
+        self._voiced_frames = self.start_frames
+
+    def _finish(self, finished):
+        frames = self._utterance
+        self._utterance = []
+        self._in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        if self._voiced_frames >= self.min_speech_frames:
+            finished.append(np.concatenate(frames))
+            self.utterance_count += 1
+        else:
+            # Too short to be a word (a click or a cough): treat it as skipped
+            self.skipped_samples += len(frames) * self.frame_len
+
+    def stats(self):
+        """Totals for reporting how much audio never reached STT."""
+        total_s = self.total_samples / self.fs
+        skipped_s = self.skipped_samples / self.fs
+        return {
+            "processed_seconds": round(total_s, 2),
+            "skipped_seconds": round(skipped_s, 2),
+            "skipped_ratio": round(skipped_s / total_s, 3) if total_s else 0.0,
+            "utterances": self.utterance_count,
+        }